@@ -6,14 +6,25 @@ from typing import Optional
 
 from src.config.settings import settings
 
+# Set once setup_logging has run, so repeated imports don't rebuild handlers
+_CONFIGURED = False
 
-def setup_logging(log_level: Optional[str] = None) -> None:
+
+def setup_logging(log_level: Optional[str] = None, force: bool = False) -> None:
     """
     Configure application-wide logging.
 
+    Subsequent calls are no-ops unless force=True.
+
     Args:
         log_level: Optional log level override. If not provided, uses settings.log_level
+        force: Reconfigure even if logging was already set up
     """
+    global _CONFIGURED
+    if _CONFIGURED and not force:
+        return
+    _CONFIGURED = True
+
     level_str = (log_level or settings.log_level).upper()
 
     # Map string to logging level
@@ -1,7 +1,7 @@
 """Application settings loaded from environment variables via Pydantic."""
 
-from functools import lru_cache
-from typing import Optional
+from functools import cached_property, lru_cache
+from typing import FrozenSet, Literal, Optional
 
 from pydantic import Field, computed_field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -29,6 +29,9 @@ class Settings(BaseSettings):
         default=100, description="Maximum concurrent requests"
     )
     request_timeout: int = Field(default=300, description="Request timeout in seconds")
+    extraction_timeout_seconds: int = Field(
+        default=120, description="Maximum time for a single extraction request"
+    )
 
     # CORS Configuration
     allowed_origins: str = Field(
@@ -52,6 +55,13 @@ class Settings(BaseSettings):
     redis_socket_connect_timeout: int = Field(
         default=5, description="Redis connection timeout"
     )
+    local_cache_max_entries: int = Field(
+        default=500,
+        description="Size of the in-process LRU in front of Redis (0 disables it)",
+    )
+    local_cache_ttl_seconds: int = Field(
+        default=60, description="Maximum age of in-process LRU entries"
+    )
 
     # OpenAI LLM Configuration
     openai_api_key: Optional[str] = Field(
@@ -66,12 +76,20 @@ class Settings(BaseSettings):
     )
     openai_timeout: int = Field(default=60, description="OpenAI API timeout in seconds")
     openai_max_retries: int = Field(default=3, description="OpenAI API max retries")
+    openai_rpm: int = Field(
+        default=500,
+        description="OpenAI requests per minute for async calls (0 disables limiting)",
+    )
 
     # File Configuration
     pdf_base_path: Optional[str] = Field(
         default=None,
         description="Base directory for locating PDF files when requests provide relative paths.",
     )
+    extractor_engine: Literal["pdfplumber", "pymupdf"] = Field(
+        default="pdfplumber",
+        description="PDF extraction backend (pymupdf is faster but optional)",
+    )
 
     # Batch Processing Configuration
     max_concurrent_extractions: int = Field(
@@ -82,6 +100,14 @@ class Settings(BaseSettings):
         default=100000,
         description="Maximum number of items allowed in a single batch request",
     )
+    batch_llm_retries: int = Field(
+        default=2,
+        description="Extra attempts for batch items whose OpenAI call failed",
+    )
+    marshal_batch: int = Field(
+        default=8,
+        description="Documents packed into one LLM prompt by run_extraction_marshaled",
+    )
 
     # Monitoring & Observability
     sentry_dsn: Optional[str] = Field(
@@ -117,6 +143,11 @@ class Settings(BaseSettings):
         """True when running in development mode."""
         return self.env.lower() == "development"
 
+    @cached_property
+    def allowed_origins_set(self) -> FrozenSet[str]:
+        """Parsed CORS origins, computed once for O(1) membership checks."""
+        return frozenset(self.allowed_origins.split(","))
+
     @field_validator("allowed_origins")
     @classmethod
     def validate_origins(cls, v: str) -> str:
@@ -7,7 +7,7 @@ with configurable concurrency limits and streaming results.
 
 import asyncio
 import logging
-from typing import List
+from typing import Dict, List, Tuple
 
 from src.config.settings import get_settings
 from src.core.pipeline import run_extraction
@@ -40,32 +40,49 @@ async def process_batch_parallel(
         - Each item runs independently in a threadpool to avoid blocking
         - Results yielded immediately as they complete (true streaming)
         - Errors in individual items don't stop other items from processing
+        - Duplicate items within the batch reuse the first item's extraction
         - Respects max_concurrent_extractions to avoid overwhelming OpenAI API
     """
     settings = get_settings()
 
-    async def process_one(index: int, item: BatchExtractionItem) -> BatchItemResult:
-        """Process a single extraction item and return result."""
-        try:
-            logger.info(
-                f"Starting extraction for item {index}: {item.label} - {item.pdf_path}"
-            )
-
-            # Convert BatchExtractionItem to ExtractionRequest
-            request = ExtractionRequest(
+    # Identical items (same label, path and schema) share a single extraction
+    inflight: Dict[Tuple, asyncio.Future] = {}
+
+    def extract_once(item: BatchExtractionItem) -> asyncio.Future:
+        """Return the pending extraction for an item, starting it if needed."""
+        key = (
+            item.label,
+            item.pdf_path,
+            tuple(sorted(item.extraction_schema.items())),
+        )
+        future = inflight.get(key)
+        if future is None:
+            # Convert BatchExtractionItem to ExtractionRequest; the item was
+            # validated by FastAPI and always has a pdf_path, so skip
+            # re-validation
+            request = ExtractionRequest.model_construct(
                 label=item.label,
                 extraction_schema=item.extraction_schema,
                 pdf_path=item.pdf_path,
             )
 
             # Run extraction in threadpool to avoid blocking event loop
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None, run_extraction, request, use_cache
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(None, run_extraction, request, use_cache)
+            inflight[key] = future
+        return future
+
+    async def process_one(index: int, item: BatchExtractionItem) -> BatchItemResult:
+        """Process a single extraction item and return result."""
+        try:
+            logger.info(
+                f"Starting extraction for item {index}: {item.label} - {item.pdf_path}"
             )
 
-            # Create success result
-            batch_result = BatchItemResult(
+            result = await extract_once(item)
+
+            # Create success result (trusted data, no re-validation needed)
+            batch_result = BatchItemResult.model_construct(
                 index=index,
                 status="completed",
                 label=item.label,
@@ -78,7 +95,7 @@ async def process_batch_parallel(
         except Exception as e:
             # Create error result
             error_msg = f"{type(e).__name__}: {str(e)}"
-            batch_result = BatchItemResult(
+            batch_result = BatchItemResult.model_construct(
                 index=index,
                 status="error",
                 label=item.label,
@@ -116,12 +133,9 @@ async def process_batch_parallel(
         logger.info(f"Yielding result {completed_count}/{len(items)}: index={result.index}, status={result.status}")
         logger.info(f"Result details: {result}")
         yield result
-        await asyncio.sleep(0.250)
-
-    # await asyncio.sleep(5)  # Allow event loop to process any remaining tasks
 
     # After all items processed, yield summary
-    summary = BatchSummary(
+    summary = BatchSummary.model_construct(
         status="done",
         total=len(items),
         successful=successful_count,
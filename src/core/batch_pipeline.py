@@ -0,0 +1,315 @@
+"""
+Offline bulk extraction through the OpenAI Batch API.
+
+Trades latency for throughput and cost: instead of one Responses API call per
+PDF, every prompt is uploaded as a single JSONL file and processed by OpenAI
+within the completion window, at half the token price and outside the
+per-request rate limits.
+
+Runs the same steps as the synchronous pipeline, split in two:
+1. submit_batch: cache lookup, PDF extraction and prompt rendering for each
+   request, then upload of the JSONL file and batch creation
+2. poll_batch: batch status check and, once finished, result assembly and
+   cache population
+
+The handle returned by submit_batch only holds plain data (see to_dict and
+from_dict), so it can be stored and polled from another process; documents
+are rebuilt from the layout cache at poll time.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from src.config.settings import settings
+from src.core import llm_orchestrator
+from src.core.cache import CacheClient
+from src.core.extractor import ExtractedDocument
+from src.core.pipeline import (
+    LAYOUT_CACHE_TTL_SECONDS,
+    _build_cache_key,
+    _build_result,
+    _llm_call_failed,
+    _load_document,
+    _result_from_cache,
+)
+from src.models.schema import ExtractionRequest, ExtractionResult
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/responses"
+COMPLETION_WINDOW = "24h"
+
+# Submitted layouts are read back at poll time, so they must outlive the
+# completion window plus the delay before the finished batch is polled
+BATCH_LAYOUT_TTL_SECONDS = 2 * LAYOUT_CACHE_TTL_SECONDS
+
+# Statuses after which the batch will not produce any more output
+_FINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+@dataclass(slots=True)
+class PendingExtraction:
+    """A request whose PDF is extracted and whose LLM call is queued."""
+
+    label: str
+    extraction_schema: Dict[str, str]
+    pdf_hash: str
+    schema_hash: str
+    extract_seconds: float
+    pdf_path: Optional[str] = None  # None for uploaded bytes
+
+
+@dataclass(slots=True)
+class SubmittedBatch:
+    """Handle returned by submit_batch and passed to poll_batch."""
+
+    batch_id: Optional[str]  # None when every request was served from cache
+    custom_ids: List[str]  # Cache key of each submitted request, in input order
+    pending: Dict[str, PendingExtraction] = field(default_factory=dict)
+    cached: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # Payloads
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the handle as JSON-serializable data."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> SubmittedBatch:
+        """Rebuild a handle from the output of to_dict."""
+        return cls(
+            batch_id=data["batch_id"],
+            custom_ids=list(data["custom_ids"]),
+            pending={
+                custom_id: PendingExtraction(**item)
+                for custom_id, item in data.get("pending", {}).items()
+            },
+            cached=dict(data.get("cached", {})),
+        )
+
+
+def _get_client() -> OpenAI:
+    """Create an OpenAI client, failing early when no key is configured."""
+    if not settings.openai_api_key:
+        raise ValueError("OPENAI_API_KEY not configured")
+    return llm_orchestrator._sdk_class("OpenAI")(**llm_orchestrator._client_kwargs())
+
+
+def _pending_document(
+    request: ExtractionRequest, pdf_hash: str, cache_client: CacheClient
+) -> Optional[ExtractedDocument]:
+    """
+    Rebuild a pending item's document from the layout cache.
+
+    Path requests are re-extracted when the layout has expired. Uploaded
+    bytes are not kept, so those return None and the item is marked failed.
+    """
+    try:
+        return _load_document(request, pdf_hash, cache_client)
+    except (FileNotFoundError, ValueError) as exc:
+        logger.warning(f"Layout for {pdf_hash} unavailable at poll time: {exc}")
+        return None
+
+
+def submit_batch(
+    requests: Sequence[ExtractionRequest],
+    use_cache: bool = True,
+    client: Optional[OpenAI] = None,
+) -> SubmittedBatch:
+    """
+    Extract every PDF and submit the LLM calls as one OpenAI batch.
+
+    Each batch line uses the request's cache key as its custom_id, so
+    identical requests are only sent once.
+
+    Args:
+        requests: Extraction requests to run
+        use_cache: Whether to serve cached results instead of submitting them
+        client: OpenAI client to use (created from settings when omitted)
+
+    Returns:
+        SubmittedBatch to pass to poll_batch
+
+    Raises:
+        FileNotFoundError when a PDF is missing.
+        ValueError for invalid inputs or a missing OpenAI key.
+    """
+    cache_client = CacheClient()
+    submitted = SubmittedBatch(batch_id=None, custom_ids=[])
+    lines: List[str] = []
+
+    # Hash every PDF first so the cache is checked in a single round trip.
+    # custom_id must be unique within a batch, so duplicates are dropped here.
+    unique: Dict[str, Tuple[ExtractionRequest, str, str]] = {}
+    for request in requests:
+        cache_key, pdf_hash, schema_hash = _build_cache_key(request)
+        submitted.custom_ids.append(cache_key)
+        unique.setdefault(cache_key, (request, pdf_hash, schema_hash))
+
+    cache_keys = list(unique)
+    if use_cache:
+        cached_payloads = cache_client.get_json_many(cache_keys)
+    else:
+        cached_payloads = [None] * len(cache_keys)
+
+    for cache_key, cached_payload in zip(cache_keys, cached_payloads):
+        request, pdf_hash, schema_hash = unique[cache_key]
+        if cached_payload:
+            submitted.cached[cache_key] = cached_payload
+            continue
+
+        # Always stores the layout, which poll_batch reads back
+        extract_start = perf_counter()
+        doc = _load_document(
+            request, pdf_hash, cache_client, use_cache, BATCH_LAYOUT_TTL_SECONDS
+        )
+        submitted.pending[cache_key] = PendingExtraction(
+            label=request.label,
+            extraction_schema=request.extraction_schema,
+            pdf_hash=pdf_hash,
+            schema_hash=schema_hash,
+            extract_seconds=perf_counter() - extract_start,
+            pdf_path=request.pdf_path,
+        )
+
+        body = llm_orchestrator.build_batch_request_body(
+            label=request.label,
+            extraction_schema=request.extraction_schema,
+            doc_layout=doc.layout_text,
+        )
+        line = {
+            "custom_id": cache_key,
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": body,
+        }
+        lines.append(json.dumps(line, ensure_ascii=False))
+
+    if not lines:
+        logger.info("All batch requests served from cache; nothing to submit")
+        return submitted
+
+    client = client or _get_client()
+    batch_file = client.files.create(
+        file=("batch.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window=COMPLETION_WINDOW,
+    )
+    submitted.batch_id = batch.id
+
+    logger.info(
+        f"Submitted OpenAI batch {batch.id} with {len(lines)} requests "
+        f"({len(submitted.cached)} served from cache)"
+    )
+    return submitted
+
+
+def _read_output_lines(client: OpenAI, file_id: str) -> Dict[str, Dict[str, Any]]:
+    """Download a batch output/error file and index its lines by custom_id."""
+    content = client.files.content(file_id)
+    lines = (json.loads(raw) for raw in content.text.splitlines() if raw.strip())
+    return {line["custom_id"]: line for line in lines}
+
+
+def poll_batch(
+    submitted: SubmittedBatch,
+    client: Optional[OpenAI] = None,
+) -> Optional[Dict[str, ExtractionResult]]:
+    """
+    Collect the results of a submitted batch once OpenAI has finished it.
+
+    The handle may come from another process (via SubmittedBatch.from_dict):
+    documents are rebuilt from the layout cache rather than kept in memory.
+    Successful results are written to the cache; failed items get null fields
+    (as in the synchronous pipeline) but are not cached, so resubmitting
+    retries them. Uploaded-bytes items whose layout is no longer cached are
+    failed the same way.
+
+    Args:
+        submitted: Handle returned by submit_batch
+        client: OpenAI client to use (created from settings when omitted)
+
+    Returns:
+        Dict mapping custom_id (cache key) to ExtractionResult, or None while
+        the batch is still running
+    """
+    results: Dict[str, ExtractionResult] = {
+        custom_id: _result_from_cache(dict(payload), custom_id)
+        for custom_id, payload in submitted.cached.items()
+    }
+    if submitted.batch_id is None:
+        return results
+
+    client = client or _get_client()
+    batch = client.batches.retrieve(submitted.batch_id)
+    if batch.status not in _FINAL_STATUSES:
+        logger.info(f"OpenAI batch {batch.id} is {batch.status}")
+        return None
+
+    # Successful lines land in the output file, failed ones in the error file
+    output_lines: Dict[str, Dict[str, Any]] = {}
+    for file_id in (batch.error_file_id, batch.output_file_id):
+        if file_id:
+            output_lines.update(_read_output_lines(client, file_id))
+
+    llm_seconds = (
+        float(batch.completed_at - batch.created_at) if batch.completed_at else 0.0
+    )
+    cache_client = CacheClient()
+    to_cache: Dict[str, Dict[str, Any]] = {}
+
+    for custom_id, item in submitted.pending.items():
+        # The request carries no PDF bytes: only the path survives the handle
+        request = ExtractionRequest.model_construct(
+            label=item.label,
+            extraction_schema=item.extraction_schema,
+            pdf_path=item.pdf_path,
+            pdf_bytes=None,
+        )
+        doc = _pending_document(request, item.pdf_hash, cache_client)
+        if doc is None:
+            # Without its document the item cannot be traced back to the PDF
+            doc = ExtractedDocument(layout_text="", words=[], meta={})
+            llm_results = llm_orchestrator._fallback_error(
+                item.extraction_schema, "layout_unavailable"
+            )
+        else:
+            llm_results = llm_orchestrator.parse_batch_output_line(
+                output_lines.get(custom_id), item.extraction_schema
+            )
+        timings = {
+            "extract": item.extract_seconds,
+            "llm": llm_seconds,
+            "total": item.extract_seconds + llm_seconds,
+        }
+        result = _build_result(
+            request,
+            doc,
+            llm_results,
+            timings,
+            custom_id,
+            item.pdf_hash,
+            item.schema_hash,
+        )
+        result.meta["batch_id"] = batch.id
+
+        if not _llm_call_failed(llm_results):
+            to_cache[custom_id] = result.model_dump()
+
+        results[custom_id] = result
+
+    if to_cache:
+        cache_client.set_json_many(to_cache)
+
+    logger.info(f"OpenAI batch {batch.id} {batch.status}: {len(results)} results")
+    return results
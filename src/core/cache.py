@@ -2,10 +2,13 @@
 Production-ready Redis cache client with connection pooling and retry logic.
 """
 
-import json
 import logging
-from typing import Optional
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, List, Mapping, Optional, Sequence, Tuple, Union
 
+import orjson
 import redis  # type: ignore
 from redis.backoff import ExponentialBackoff
 from redis.retry import Retry
@@ -14,6 +17,20 @@ from src.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# zstandard for compressing large payloads (stored uncompressed without it)
+try:
+    import zstandard as zstd
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Compressed payloads are tagged so plain JSON entries still decode
+ZSTD_MAGIC = b"zstd1:"
+ZSTD_LEVEL = 3
+# Below this size compression saves too little to be worth the CPU
+COMPRESSION_MIN_BYTES = 1024
+
 # Global connection pool (shared across all CacheClient instances)
 _connection_pool: Optional[redis.ConnectionPool] = None
 
@@ -31,7 +48,8 @@ def get_connection_pool() -> redis.ConnectionPool:
         pool_kwargs = {
             "host": settings.redis_host,
             "port": settings.redis_port,
-            "decode_responses": True,
+            # Payloads may be zstd-compressed, so keep raw bytes
+            "decode_responses": False,
             "max_connections": settings.redis_max_connections,
             "socket_timeout": settings.redis_socket_timeout,
             "socket_connect_timeout": settings.redis_socket_connect_timeout,
@@ -53,11 +71,68 @@ def get_connection_pool() -> redis.ConnectionPool:
     return _connection_pool
 
 
+# In-process LRU of encoded payloads in front of Redis (shared across all
+# CacheClient instances). Entries hold the raw JSON, so every hit decodes a
+# fresh object that callers are free to mutate. Entries expire no later than
+# their Redis key; keys deleted from Redis by hand can still be served for
+# up to settings.local_cache_ttl_seconds.
+_local_cache: "OrderedDict[str, Tuple[float, Union[str, bytes]]]" = OrderedDict()
+_local_cache_lock = threading.Lock()
+
+
+def _local_get(key: str) -> Optional[Union[str, bytes]]:
+    """Return the raw payload for a key from the in-process LRU, if fresh."""
+    with _local_cache_lock:
+        entry = _local_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, raw = entry
+        if expires_at <= monotonic():
+            del _local_cache[key]
+            return None
+        _local_cache.move_to_end(key)
+        return raw
+
+
+def _local_set(key: str, raw: Union[str, bytes], ttl_seconds: float) -> None:
+    """Store a raw payload in the in-process LRU, evicting the oldest entries."""
+    max_entries = settings.local_cache_max_entries
+    if max_entries <= 0:
+        return
+
+    # Never outlive the Redis entry (ttl_seconds <= 0: it does not expire)
+    local_ttl = settings.local_cache_ttl_seconds
+    if ttl_seconds > 0:
+        local_ttl = min(local_ttl, ttl_seconds)
+
+    with _local_cache_lock:
+        _local_cache[key] = (monotonic() + local_ttl, raw)
+        _local_cache.move_to_end(key)
+        while len(_local_cache) > max_entries:
+            _local_cache.popitem(last=False)
+
+
+def _local_evict(key: str) -> None:
+    """Drop a key from the in-process LRU, if present."""
+    with _local_cache_lock:
+        _local_cache.pop(key, None)
+
+
+def clear_local_cache() -> None:
+    """Drop every entry from the in-process LRU."""
+    with _local_cache_lock:
+        _local_cache.clear()
+
+
 class CacheClient:
     """Production-ready Redis cache wrapper with connection pooling and JSON serialization."""
 
     def __init__(self) -> None:
         """Initialize Redis client with connection pool."""
+        # zstd contexts are not thread-safe, so each client gets its own
+        self._cctx = zstd.ZstdCompressor(level=ZSTD_LEVEL) if ZSTD_AVAILABLE else None
+        self._dctx = zstd.ZstdDecompressor() if ZSTD_AVAILABLE else None
+
         try:
             pool = get_connection_pool()
             self._client = redis.Redis(connection_pool=pool)
@@ -80,9 +155,20 @@ class CacheClient:
             return False
 
     def get(self, key: str) -> Optional[str]:
-        """Return cached string payload, or None when missing."""
+        """
+        Return cached string payload, or None when missing.
+
+        The pool keeps raw bytes (see decode_responses), so values are
+        decompressed and decoded here to keep returning str.
+        """
         try:
-            return self._client.get(key)
+            raw = self._client.get(key)
+            if raw is None:
+                return None
+            payload = self._decompress(key, raw)
+            if isinstance(payload, bytes):
+                return payload.decode("utf-8")
+            return payload
         except redis.ConnectionError as e:
             logger.error(f"Redis connection error on get({key}): {e}")
             return None
@@ -93,8 +179,10 @@ class CacheClient:
             logger.error(f"Unexpected error on get({key}): {e}")
             return None
 
-    def set(self, key: str, value: str, ttl_seconds: int = 600) -> bool:
+    def set(self, key: str, value: Union[str, bytes], ttl_seconds: int = 600) -> bool:
         """Set a cache entry with an optional TTL."""
+        # The raw value bypasses the LRU, so never serve an older local copy
+        _local_evict(key)
         try:
             if ttl_seconds > 0:
                 return bool(self._client.setex(key, ttl_seconds, value))
@@ -111,25 +199,173 @@ class CacheClient:
 
     def get_json(self, key: str):
         """Convenience: fetch and decode JSON, or None."""
-        raw = self.get(key)
+        raw = _local_get(key)
+        if raw is not None:
+            return self._decode_json(key, raw)
+
+        fetched = self._get_with_ttl([key], "get_json")
+        if not fetched:
+            return None
+        raw, redis_ttl = fetched[0]
         if raw is None:
             return None
+        return self._decode_json(key, raw, redis_ttl=redis_ttl)
+
+    def set_json(self, key: str, obj, ttl_seconds: int = 600) -> bool:
+        """Convenience: encode JSON and store."""
+        raw = self._encode_json(key, obj)
+        if raw is None:
+            return False
+        stored = self.set(key, raw, ttl_seconds)
+        if stored:
+            _local_set(key, raw, ttl_seconds)
+        return stored
+
+    def get_json_many(self, keys: Sequence[str]) -> List[Optional[Any]]:
+        """
+        Fetch and decode many JSON payloads in a single Redis round trip.
+
+        Returns one decoded object (or None when missing/invalid) per key, in
+        the same order as keys.
+        """
+        raws: List[Optional[Union[str, bytes]]] = [_local_get(key) for key in keys]
+        results = [
+            None if raw is None else self._decode_json(key, raw)
+            for key, raw in zip(keys, raws)
+        ]
+
+        missing = [index for index, raw in enumerate(raws) if raw is None]
+        if not missing:
+            return results
+
+        fetched = self._get_with_ttl(
+            [keys[index] for index in missing], "get_json_many"
+        )
+        for index, (raw, redis_ttl) in zip(missing, fetched):
+            if raw is not None:
+                results[index] = self._decode_json(keys[index], raw, redis_ttl)
+        return results
+
+    def set_json_many(self, items: Mapping[str, Any], ttl_seconds: int = 600) -> bool:
+        """
+        Encode and store many JSON payloads in a single Redis round trip.
+
+        Returns True only if every item was stored.
+        """
+        encoded = {key: self._encode_json(key, obj) for key, obj in items.items()}
+        encoded = {key: raw for key, raw in encoded.items() if raw is not None}
+        if not encoded:
+            return not items
+
         try:
-            return json.loads(raw)
-        except json.JSONDecodeError as e:
+            with self._client.pipeline(transaction=False) as pipe:
+                for key, raw in encoded.items():
+                    if ttl_seconds > 0:
+                        pipe.setex(key, ttl_seconds, raw)
+                    else:
+                        pipe.set(key, raw)
+                stored = pipe.execute()
+        except redis.ConnectionError as e:
+            logger.error(f"Redis connection error on set_json_many: {e}")
+            return False
+        except redis.TimeoutError as e:
+            logger.error(f"Redis timeout on set_json_many: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"Unexpected error on set_json_many: {e}")
+            return False
+
+        for (key, raw), ok in zip(encoded.items(), stored):
+            if ok:
+                _local_set(key, raw, ttl_seconds)
+        return len(encoded) == len(items) and all(stored)
+
+    def _get_with_ttl(
+        self, keys: Sequence[str], operation: str
+    ) -> List[Tuple[Optional[Union[str, bytes]], Optional[float]]]:
+        """
+        Fetch raw payloads and their remaining TTLs in one Redis round trip.
+
+        Returns (raw, ttl_seconds) per key, where ttl_seconds is 0 for keys
+        without expiry and None for keys that are gone or about to expire;
+        an empty list on errors.
+        """
+        try:
+            with self._client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.get(key)
+                    pipe.pttl(key)
+                replies = pipe.execute()
+        except redis.ConnectionError as e:
+            logger.error(f"Redis connection error on {operation}: {e}")
+            return []
+        except redis.TimeoutError as e:
+            logger.error(f"Redis timeout on {operation}: {e}")
+            return []
+        except Exception as e:
+            logger.error(f"Unexpected error on {operation}: {e}")
+            return []
+
+        fetched: List[Tuple[Optional[Union[str, bytes]], Optional[float]]] = []
+        for raw, pttl in zip(replies[::2], replies[1::2]):
+            # PTTL is -1 when the key has no expiry and -2 when it is gone
+            if pttl == -1:
+                fetched.append((raw, 0.0))
+            else:
+                fetched.append((raw, pttl / 1000 if pttl > 0 else None))
+        return fetched
+
+    def _decompress(
+        self, key: str, raw: Union[str, bytes]
+    ) -> Optional[Union[str, bytes]]:
+        """Strip zstd compression from a raw payload, or None if it cannot be."""
+        if isinstance(raw, bytes) and raw.startswith(ZSTD_MAGIC):
+            if self._dctx is None:
+                logger.error(f"zstandard not installed; cannot decode key {key}")
+                return None
+            return self._dctx.decompress(raw[len(ZSTD_MAGIC) :])
+        return raw
+
+    def _decode_json(
+        self, key: str, raw: Union[str, bytes], redis_ttl: Optional[float] = None
+    ) -> Optional[Any]:
+        """
+        Decode a raw payload.
+
+        Payloads read from Redis are remembered locally for at most their
+        remaining Redis TTL (redis_ttl, 0 when the key does not expire).
+        """
+        try:
+            payload = self._decompress(key, raw)
+            if payload is None:
+                return None
+            obj = orjson.loads(payload)
+        except orjson.JSONDecodeError as e:
             logger.error(f"Failed to decode JSON for key {key}: {e}")
             return None
         except Exception as e:
             logger.error(f"Unexpected error decoding JSON for key {key}: {e}")
             return None
+        if redis_ttl is not None:
+            _local_set(key, raw, redis_ttl)
+        return obj
 
-    def set_json(self, key: str, obj, ttl_seconds: int = 600) -> bool:
-        """Convenience: encode JSON and store."""
+    def _encode_json(self, key: str, obj: Any) -> Optional[bytes]:
+        """
+        Encode an object as JSON bytes, or None if it is not serializable.
+
+        Large payloads (layout text, full results) are zstd-compressed and
+        prefixed with ZSTD_MAGIC when zstandard is installed.
+        """
         try:
-            return self.set(key, json.dumps(obj), ttl_seconds)
+            # orjson returns UTF-8 bytes, which redis-py stores as-is
+            raw = orjson.dumps(obj)
+            if self._cctx is not None and len(raw) >= COMPRESSION_MIN_BYTES:
+                return ZSTD_MAGIC + self._cctx.compress(raw)
+            return raw
         except (TypeError, ValueError) as e:
             logger.error(f"Failed to encode JSON for key {key}: {e}")
-            return False
+            return None
         except Exception as e:
             logger.error(f"Unexpected error encoding JSON for key {key}: {e}")
-            return False
+            return None
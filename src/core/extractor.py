@@ -2,20 +2,39 @@
 PDF text extraction with layout information using pdfplumber.
 
 Extracts words with bounding boxes and formats layout for LLM consumption.
+The PyMuPDF engine in extractor_pymupdf reuses the same layout assembly.
 """
 
 import hashlib
 import json
+import re
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
-
-import pdfplumber
+from typing import Any, Dict, FrozenSet, List, Tuple, Union
 
 from src.config.settings import settings
 
+# xxhash for fast PDF fingerprinting (falls back to hashlib.sha256)
+try:
+    import xxhash
+
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+
+def __getattr__(name: str) -> Any:
+    """Import pdfplumber (and pdfminer) on first use to keep import time low."""
+    if name == "pdfplumber":
+        import pdfplumber
 
-@dataclass
+        globals()[name] = pdfplumber
+        return pdfplumber
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@dataclass(slots=True)
 class ExtractedDocument:
     """Extracted PDF document with rich layout information."""
 
@@ -24,9 +43,20 @@ class ExtractedDocument:
     meta: Dict[str, Any]  # Metadata (source, engine, has_tables, etc.)
 
 
+# Zone names of the 3x3 page grid, indexed [row][column]. The middle row has
+# no "MIDDLE" prefix.
+ZONE_GRID = (
+    ("TOP-LEFT", "TOP-CENTER", "TOP-RIGHT"),
+    ("LEFT", "CENTER", "RIGHT"),
+    ("BOTTOM-LEFT", "BOTTOM-CENTER", "BOTTOM-RIGHT"),
+)
+
+
 class PdfExtractor:
     """Extract text and layout from PDF files using pdfplumber."""
 
+    engine = "pdfplumber"
+
     def load(self, pdf_path: str = None, pdf_bytes: bytes = None) -> ExtractedDocument:
         """
         Extract text with layout information from PDF.
@@ -56,70 +86,95 @@ class PdfExtractor:
             pdf_source = str(resolved_path)
             source_name = str(resolved_path.resolve())
         else:
-            # Handle bytes case - wrap in BytesIO for pdfplumber
+            pdf_source = pdf_bytes
+            source_name = "<uploaded_bytes>"
+
+        page_width, page_height, words_raw, has_tables = self._read_first_page(
+            pdf_source
+        )
+
+        # Enrich words with zone information
+        words = []
+        for word in words_raw:
+            bbox = [
+                float(word["x0"]),
+                float(word["top"]),
+                float(word["x1"]),
+                float(word["bottom"]),
+            ]
+            zone = self._calculate_zone(bbox, page_width, page_height)
+
+            words.append(
+                {
+                    "text": word["text"],
+                    "bbox": bbox,
+                    "zone": zone,
+                }
+            )
+
+        # Group words into lines
+        lines = self._group_words_to_lines(words)
+
+        # Format layout text for LLM
+        layout_text = self._format_layout_text(lines)
+
+        meta = {
+            "source": source_name,
+            "engine": self.engine,
+            "pages": 1,
+            "page_width": page_width,
+            "page_height": page_height,
+            "has_tables": has_tables,
+            "word_count": len(words),
+            "line_count": len(lines),
+        }
+
+        return ExtractedDocument(
+            layout_text=layout_text,
+            words=words,
+            meta=meta,
+        )
+
+    def _read_first_page(
+        self, pdf_source: Union[str, bytes]
+    ) -> Tuple[float, float, List[Dict[str, Any]], bool]:
+        """
+        Read the first page with the PDF engine.
+
+        Engines return words in pdfplumber's shape (text, x0, top, x1, bottom)
+        so layout assembly is shared by every backend.
+
+        Args:
+            pdf_source: Resolved file path, or raw PDF bytes
+
+        Returns:
+            Tuple of (page_width, page_height, words, has_tables)
+
+        Raises:
+            ValueError: If the PDF has no pages or no text
+        """
+        if isinstance(pdf_source, bytes):
+            # pdfplumber needs a file-like object for in-memory PDFs
             import io
 
-            pdf_source = io.BytesIO(pdf_bytes)
-            source_name = "<uploaded_bytes>"
+            pdf_source = io.BytesIO(pdf_source)
 
+        pdfplumber = globals().get("pdfplumber") or __getattr__("pdfplumber")
         with pdfplumber.open(pdf_source) as pdf:
             if len(pdf.pages) == 0:
                 raise ValueError("Empty PDF: no pages found")
 
             page = pdf.pages[0]
-            page_width = float(page.width)
-            page_height = float(page.height)
 
             # Extract words with bounding boxes
             words_raw = page.extract_words()
             if not words_raw:
                 raise ValueError("Empty PDF: no text content")
 
-            # Enrich words with zone information
-            words = []
-            for word in words_raw:
-                bbox = [
-                    float(word["x0"]),
-                    float(word["top"]),
-                    float(word["x1"]),
-                    float(word["bottom"]),
-                ]
-                zone = self._calculate_zone(bbox, page_width, page_height)
-
-                words.append(
-                    {
-                        "text": word["text"],
-                        "bbox": bbox,
-                        "zone": zone,
-                    }
-                )
-
             # Detect tables
-            tables = page.find_tables()
-            has_tables = len(tables) > 0
-
-            # Group words into lines
-            lines = self._group_words_to_lines(words)
-
-            # Format layout text for LLM
-            layout_text = self._format_layout_text(lines)
-
-            meta = {
-                "source": source_name,
-                "engine": "pdfplumber",
-                "pages": 1,
-                "page_width": page_width,
-                "page_height": page_height,
-                "has_tables": has_tables,
-                "word_count": len(words),
-                "line_count": len(lines),
-            }
-
-            return ExtractedDocument(
-                layout_text=layout_text,
-                words=words,
-                meta=meta,
-            )
+            has_tables = len(page.find_tables()) > 0
+
+            return float(page.width), float(page.height), words_raw, has_tables
 
     def _calculate_zone(
         self, bbox: List[float], page_width: float, page_height: float
@@ -142,27 +197,11 @@ class PdfExtractor:
         x_third = page_width / 3
         y_third = page_height / 3
 
-        # Determine horizontal position
-        if x_center < x_third:
-            h_pos = "LEFT"
-        elif x_center < 2 * x_third:
-            h_pos = "CENTER"
-        else:
-            h_pos = "RIGHT"
-
-        # Determine vertical position
-        if y_center < y_third:
-            v_pos = "TOP"
-        elif y_center < 2 * y_third:
-            v_pos = "MIDDLE"
-        else:
-            v_pos = "BOTTOM"
+        # Determine horizontal and vertical position
+        col = 0 if x_center < x_third else 1 if x_center < 2 * x_third else 2
+        row = 0 if y_center < y_third else 1 if y_center < 2 * y_third else 2
 
-        # Combine positions (skip "MIDDLE" prefix for center row)
-        if v_pos == "MIDDLE":
-            return h_pos
-        else:
-            return f"{v_pos}-{h_pos}"
+        return ZONE_GRID[row][col]
 
     def _group_words_to_lines(self, words: List[Dict]) -> List[Dict]:
         """
@@ -220,11 +259,9 @@ class PdfExtractor:
         # Combine text
         text = " ".join(w["text"] for w in words_sorted)
 
-        # Calculate bounding box
-        x0 = min(w["bbox"][0] for w in words_sorted)
-        y0 = min(w["bbox"][1] for w in words_sorted)
-        x1 = max(w["bbox"][2] for w in words_sorted)
-        y1 = max(w["bbox"][3] for w in words_sorted)
+        # Calculate bounding box from per-coordinate columns
+        x0s, y0s, x1s, y1s = zip(*(w["bbox"] for w in words_sorted))
+        x0, y0, x1, y1 = min(x0s), min(y0s), max(x1s), max(y1s)
 
         # Use zone from first word (most representative)
         zone = words_sorted[0]["zone"]
@@ -294,39 +331,58 @@ def load_pdf_bytes(pdf_path: Path) -> bytes:
     return pdf_path.read_bytes()
 
 
+def _new_pdf_hasher():
+    """Return an incremental hasher matching hash_pdf_bytes."""
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_128()
+    return hashlib.sha256()
+
+
 def hash_pdf_bytes(pdf_bytes: bytes) -> str:
-    """Generate SHA256 hash of PDF bytes."""
+    """
+    Generate a hash of PDF bytes for cache keys.
+
+    Uses xxh3-128 when xxhash is installed (an order of magnitude faster than
+    SHA256 on large PDFs; the hash only needs to be collision resistant, not
+    cryptographic), otherwise SHA256.
+    """
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_128_hexdigest(pdf_bytes)
     return hashlib.sha256(pdf_bytes).hexdigest()
 
 
-def hash_extraction_schema(schema: Dict[str, str]) -> str:
-    """Generate hash of extraction schema."""
-    encoded = json.dumps(schema, sort_keys=True, ensure_ascii=False).encode("utf-8")
-    return hashlib.sha256(encoded).hexdigest()
+def hash_pdf_file(pdf_path: Path) -> str:
+    """
+    Hash a PDF file without loading it into memory.
 
+    Produces the same digest as hash_pdf_bytes on the file's contents.
+    hashlib.file_digest reads into a reused buffer and, for SHA256, hashes
+    with the GIL released.
 
-def filter_layout_by_keywords(
-    layout_text: str,
-    extraction_schema: Dict[str, str],
-    max_lines: int = 0,
-) -> str:
+    Raises:
+        FileNotFoundError: If PDF path doesn't exist
     """
-    Filter layout lines to only those containing keywords from extraction schema.
+    with open(pdf_path, "rb") as pdf_file:
+        return hashlib.file_digest(pdf_file, _new_pdf_hasher).hexdigest()
 
-    Args:
-        layout_text: Full layout text with all lines
-        extraction_schema: Dict of field names to descriptions
-        max_lines: Maximum lines to return (0 = unlimited)
 
-    Returns:
-        Filtered layout text with relevant lines only
-    """
-    if not extraction_schema or max_lines == 0:
-        return layout_text
+def hash_extraction_schema(schema: Dict[str, str]) -> str:
+    """Generate hash of extraction schema."""
+    # Sorted items are a hashable, order-independent form of the schema, so
+    # repeated schemas skip JSON encoding and hashing entirely
+    return _hash_schema_items(tuple(sorted(schema.items())))
 
-    # Extract keywords from schema
-    keywords = set()
-    stopwords = {
+
+@lru_cache(maxsize=1024)
+def _hash_schema_items(schema_items: Tuple[Tuple[str, str], ...]) -> str:
+    """Hash a canonicalized (sorted items) extraction schema."""
+    encoded = json.dumps(dict(schema_items), ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+# Words too common to say anything about which layout lines are relevant
+KEYWORD_STOPWORDS = frozenset(
+    {
         "do",
         "da",
         "de",
@@ -340,35 +396,73 @@ def filter_layout_by_keywords(
         "os",
         "as",
     }
+)
+
 
-    for field_name, description in extraction_schema.items():
+@lru_cache(maxsize=1024)
+def _schema_keywords(schema_items: Tuple[Tuple[str, str], ...]) -> FrozenSet[str]:
+    """Extract filter keywords from a canonicalized (sorted items) schema."""
+    keywords = set()
+
+    for field_name, description in schema_items:
         # From field name: "nome_completo" -> ["nome", "completo"]
         field_parts = field_name.lower().replace("_", " ").split()
-        keywords.update(
-            part for part in field_parts if part not in stopwords and len(part) > 2
-        )
-
         # From description: "Nome completo do titular" -> ["nome", "completo", "titular"]
         desc_parts = description.lower().split()
+
         keywords.update(
-            part for part in desc_parts if part not in stopwords and len(part) > 2
+            part
+            for part in (*field_parts, *desc_parts)
+            if part not in KEYWORD_STOPWORDS and len(part) > 2
         )
 
+    return frozenset(keywords)
+
+
+@lru_cache(maxsize=1024)
+def _keyword_pattern(keywords: FrozenSet[str]) -> "re.Pattern[str]":
+    """Compile keywords into one alternation so each line is scanned once."""
+    return re.compile("|".join(re.escape(keyword) for keyword in sorted(keywords)))
+
+
+def filter_layout_by_keywords(
+    layout_text: str,
+    extraction_schema: Dict[str, str],
+    max_lines: int = 0,
+) -> str:
+    """
+    Filter layout lines to only those containing keywords from extraction schema.
+
+    Args:
+        layout_text: Full layout text with all lines
+        extraction_schema: Dict of field names to descriptions
+        max_lines: Maximum lines to return (0 = unlimited)
+
+    Returns:
+        Filtered layout text with relevant lines only
+    """
+    if not extraction_schema or max_lines == 0:
+        return layout_text
+
+    keywords = _schema_keywords(tuple(sorted(extraction_schema.items())))
+
     if not keywords:
         # No valid keywords - return original (or truncated by max_lines)
         if max_lines > 0:
-            lines = layout_text.split("\n")[:max_lines]
+            lines = layout_text.splitlines()[:max_lines]
             return "\n".join(lines)
         return layout_text
 
     # Filter lines containing keywords
-    lines = layout_text.split("\n")
+    lines = layout_text.splitlines()
+    # Lowercase the whole text in one call rather than line by line
+    lines_lower = layout_text.lower().splitlines()
+    keyword_search = _keyword_pattern(keywords).search
     relevant_lines = []
 
-    for line in lines:
-        line_lower = line.lower()
+    for line, line_lower in zip(lines, lines_lower):
         # Check if any keyword appears in line
-        if any(keyword in line_lower for keyword in keywords):
+        if keyword_search(line_lower):
             relevant_lines.append(line)
 
     # If no matches found, return first max_lines (fallback)
@@ -0,0 +1,61 @@
+"""
+PDF text extraction backed by PyMuPDF (fitz).
+
+PyMuPDF parses PDFs in C (MuPDF), several times faster than pdfplumber's
+pure-Python pdfminer.six. Only page reading differs: words are converted to
+pdfplumber's shape and layout assembly is inherited from PdfExtractor, so
+both engines produce the same layout text format.
+
+Selected with EXTRACTOR_ENGINE=pymupdf; PyMuPDF is an optional dependency.
+"""
+
+from typing import Any, Dict, List, Tuple, Union
+
+from src.core.extractor import PdfExtractor
+
+
+class PymupdfExtractor(PdfExtractor):
+    """Extract text and layout from PDF files using PyMuPDF."""
+
+    engine = "pymupdf"
+
+    def _read_first_page(
+        self, pdf_source: Union[str, bytes]
+    ) -> Tuple[float, float, List[Dict[str, Any]], bool]:
+        """Read the first page with PyMuPDF (see PdfExtractor._read_first_page)."""
+        import fitz
+
+        if isinstance(pdf_source, bytes):
+            pdf = fitz.open(stream=pdf_source, filetype="pdf")
+        else:
+            pdf = fitz.open(pdf_source)
+
+        with pdf:
+            if pdf.page_count == 0:
+                raise ValueError("Empty PDF: no pages found")
+
+            page = pdf[0]
+
+            # Words come as (x0, y0, x1, y1, text, block_no, line_no, word_no)
+            words_raw = [
+                {
+                    "text": word[4],
+                    "x0": word[0],
+                    "top": word[1],
+                    "x1": word[2],
+                    "bottom": word[3],
+                }
+                for word in page.get_text("words")
+            ]
+            if not words_raw:
+                raise ValueError("Empty PDF: no text content")
+
+            # Detect tables
+            has_tables = len(page.find_tables().tables) > 0
+
+            return (
+                float(page.rect.width),
+                float(page.rect.height),
+                words_raw,
+                has_tables,
+            )
@@ -7,7 +7,7 @@ Provides direct OpenAI Responses API integration using responses.parse:
 - Type-safe structured outputs with automatic validation
 - Spatial layout-aware prompts (leverages position and coordinate metadata)
 - Token counting for observability
-- No retry or truncation logic (simple baseline)
+- Transient API errors retried by the SDK (OPENAI_MAX_RETRIES), no truncation
 
 The prompt engineering approach:
 - Educates the LLM about rich spatial layout information (positions, coordinates)
@@ -23,13 +23,17 @@ Output structure:
 
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
-from typing import Any, Dict, Optional
+import weakref
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
 
-from openai import OpenAI
 from pydantic import BaseModel, Field, create_model
 
 from src.config.settings import settings
+from src.core.rate_limiter import get_openai_bucket
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +49,67 @@ except ImportError:
     )
 
 
+# The OpenAI SDK takes over a second to import, so OpenAI/AsyncOpenAI are
+# resolved on first use (or first attribute access, e.g. by mock.patch)
+_LAZY_SDK_NAMES = frozenset({"OpenAI", "AsyncOpenAI"})
+
+
+def __getattr__(name: str) -> Any:
+    """Import OpenAI SDK clients lazily and keep them as module globals."""
+    if name in _LAZY_SDK_NAMES:
+        import openai
+
+        value = getattr(openai, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _sdk_class(name: str) -> Any:
+    """Return an OpenAI SDK client class, importing the SDK if needed."""
+    return globals().get(name) or __getattr__(name)
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    """
+    OpenAI client options from settings.
+
+    The SDK retries connection errors, 429s and 5xx responses itself, with
+    exponential backoff and jitter, up to max_retries times.
+    """
+    return {
+        "api_key": settings.openai_api_key,
+        "max_retries": settings.openai_max_retries,
+        "timeout": settings.openai_timeout,
+    }
+
+
+# Async clients, created on first use so concurrent extractions share one
+# connection pool (keep-alive, no TLS handshake per call). The httpx pool is
+# bound to the event loop it runs on, so there is one client per loop and a
+# later asyncio.run() never reuses connections from a closed loop.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_client() -> Any:
+    """Return the running event loop's AsyncOpenAI client, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _sdk_class("AsyncOpenAI")(**_client_kwargs())
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_client() -> None:
+    """Close the running event loop's AsyncOpenAI client, if one was created."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
 SYSTEM_PROMPT_TEMPLATE = """
 System: You are a specialized document data extraction assistant for '{label}' documents.
 
@@ -95,6 +160,29 @@ Extract the following fields from the document below.
 """
 
 
+# Appended to the system prompt when several documents share one call
+MARSHALED_SYSTEM_SUFFIX = """
+# Multiple Documents
+The input contains {count} separate documents, delimited as DOC_1 to DOC_{count}.
+Extract the fields from each document independently; never mix values across documents.
+Return a JSON object whose `documents` array holds exactly {count} objects, one per document, in the same order.
+"""
+
+
+MARSHALED_USER_PROMPT_TEMPLATE = """## Extraction Task
+
+Extract the following fields from each of the {count} documents below.
+
+### Fields to Extract
+```
+{fields}
+```
+
+### Documents with Spatial Information
+{documents}
+"""
+
+
 def count_tokens(text: str, model: str = "gpt-5-mini") -> int:
     """
     Count tokens in text using tiktoken.
@@ -119,6 +207,138 @@ def count_tokens(text: str, model: str = "gpt-5-mini") -> int:
     return len(encoding.encode(text))
 
 
+# Prompt pieces and output models only depend on the label/schema, which
+# repeat across requests, so they are built once per distinct value. Schema
+# items are keyed in insertion order, which sets the field order the LLM sees.
+
+
+@lru_cache(maxsize=256)
+def _system_prompt(label: str) -> str:
+    """Render the system prompt for a document label."""
+    return SYSTEM_PROMPT_TEMPLATE.format(label=label)
+
+
+def _format_fields(extraction_schema: Dict[str, str]) -> str:
+    """Render the schema as the bullet list used in user prompts."""
+    return _format_field_items(tuple(extraction_schema.items()))
+
+
+@lru_cache(maxsize=1024)
+def _format_field_items(schema_items: Tuple[Tuple[str, str], ...]) -> str:
+    """Render (once per schema) the field bullet list."""
+    return "\n".join([f"- {name}: {desc}" for name, desc in schema_items])
+
+
+def _build_prompts(
+    label: str, extraction_schema: Dict[str, str], doc_layout: str
+) -> Tuple[str, str]:
+    """Render the system and user prompts and log their token counts."""
+    system_prompt = _system_prompt(label)
+    user_prompt = USER_PROMPT_TEMPLATE.format(
+        fields=_format_fields(extraction_schema), layout=doc_layout
+    )
+    _log_prompts(system_prompt, user_prompt)
+    return system_prompt, user_prompt
+
+
+def _build_marshaled_prompts(
+    label: str, extraction_schema: Dict[str, str], doc_layouts: Sequence[str]
+) -> Tuple[str, str]:
+    """Render one system/user prompt pair covering several documents."""
+    count = len(doc_layouts)
+    system_prompt = _system_prompt(label) + MARSHALED_SYSTEM_SUFFIX.format(count=count)
+    documents = "\n---\n".join(
+        f"DOC_{i}:\n```\n{layout}\n```" for i, layout in enumerate(doc_layouts, 1)
+    )
+    user_prompt = MARSHALED_USER_PROMPT_TEMPLATE.format(
+        count=count, fields=_format_fields(extraction_schema), documents=documents
+    )
+    _log_prompts(system_prompt, user_prompt)
+    return system_prompt, user_prompt
+
+
+def _log_prompts(system_prompt: str, user_prompt: str) -> None:
+    """Log prompt token counts (and the prompts themselves at debug level)."""
+    # Log token counts for observability
+    if TIKTOKEN_AVAILABLE:
+        system_tokens = count_tokens(system_prompt, settings.llm_model)
+        user_tokens = count_tokens(user_prompt, settings.llm_model)
+        total_input_tokens = system_tokens + user_tokens
+        logger.info(
+            f"Prompt tokens: {total_input_tokens} "
+            f"(system={system_tokens}, user={user_tokens})"
+        )
+
+    # Log system and user messages for debugging
+    logger.debug(f"System prompt: {system_prompt}")
+    logger.debug(f"User prompt: {user_prompt}")
+
+
+def _build_output_model(extraction_schema: Dict[str, str]) -> Type[BaseModel]:
+    """Return the dynamic Pydantic model for one document's fields."""
+    return _output_model_for(tuple(extraction_schema.items()))
+
+
+@lru_cache(maxsize=1024)
+def _output_model_for(schema_items: Tuple[Tuple[str, str], ...]) -> Type[BaseModel]:
+    """Create (once per schema) the Pydantic model for one document's fields."""
+    pydantic_fields = {
+        field_name: (Optional[str], Field(description=description))
+        for field_name, description in schema_items
+    }
+    return create_model("ExtractionModel", **pydantic_fields)
+
+
+@lru_cache(maxsize=1024)
+def _marshaled_model_for(schema_items: Tuple[Tuple[str, str], ...]) -> Type[BaseModel]:
+    """Create (once per schema) the model for a list of documents' fields."""
+    return create_model(
+        "MarshaledExtractionModel",
+        documents=(List[_output_model_for(schema_items)], ...),
+    )
+
+
+def _build_parse_kwargs(
+    extraction_schema: Dict[str, str],
+    system_prompt: str,
+    user_prompt: str,
+    text_format: Optional[Type[BaseModel]] = None,
+) -> Dict[str, Any]:
+    """Build the responses.parse arguments, including the dynamic output model."""
+    if text_format is None:
+        text_format = _build_output_model(extraction_schema)
+
+    return {
+        "model": settings.llm_model,
+        "input": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        "text_format": text_format,
+        "reasoning": {"effort": "minimal"},
+        "text": {"verbosity": "low"},
+    }
+
+
+def _handle_parsed_response(
+    response: Any, extraction_schema: Dict[str, str]
+) -> Dict[str, Any]:
+    """Log usage and normalize a responses.parse result."""
+    # Log response tokens
+    usage = response.usage
+    if usage:
+        logger.info(f"Total tokens: {usage.total_tokens}")
+
+    # Extract parsed Pydantic object
+    parsed_data = response.output_parsed
+    if not parsed_data:
+        logger.warning("Empty parsed response from OpenAI")
+        return _fallback_error(extraction_schema, "empty_response")
+
+    # Convert Pydantic model to normalized dict
+    return _normalize_pydantic_response(parsed_data, extraction_schema)
+
+
 def extract_fields(
     label: str,
     extraction_schema: Dict[str, str],
@@ -152,68 +372,238 @@ def extract_fields(
         logger.error("OPENAI_API_KEY not configured")
         return _fallback_error(extraction_schema, "openai_key_missing")
 
-    # Build prompts
-    fields_text = "\n".join(
-        [f"- {name}: {desc}" for name, desc in extraction_schema.items()]
-    )
-    system_prompt = SYSTEM_PROMPT_TEMPLATE.format(label=label)
-    user_prompt = USER_PROMPT_TEMPLATE.format(fields=fields_text, layout=doc_layout)
+    system_prompt, user_prompt = _build_prompts(label, extraction_schema, doc_layout)
+    parse_kwargs = _build_parse_kwargs(extraction_schema, system_prompt, user_prompt)
 
-    # Log token counts for observability
-    if TIKTOKEN_AVAILABLE:
-        system_tokens = count_tokens(system_prompt, settings.llm_model)
-        user_tokens = count_tokens(user_prompt, settings.llm_model)
-        total_input_tokens = system_tokens + user_tokens
-        logger.info(
-            f"Prompt tokens: {total_input_tokens} "
-            f"(system={system_tokens}, user={user_tokens})"
-        )
+    # Call OpenAI Responses API with Pydantic structured output
+    try:
+        client = _sdk_class("OpenAI")(**_client_kwargs())
 
-    # Create dynamic Pydantic model from extraction schema
-    pydantic_fields = {
-        field_name: (Optional[str], Field(description=description))
-        for field_name, description in extraction_schema.items()
-    }
-    ExtractionModel = create_model("ExtractionModel", **pydantic_fields)
+        # Responses API with parse for strict Pydantic validation
+        response = client.responses.parse(**parse_kwargs)
+
+        return _handle_parsed_response(response, extraction_schema)
+
+    except Exception as exc:  # noqa: BLE001
+        logger.error(f"OpenAI API call failed: {exc}")
+        return _fallback_error(extraction_schema, "openai_api_error")
+
+
+async def extract_fields_async(
+    label: str,
+    extraction_schema: Dict[str, str],
+    doc_layout: str,
+) -> Dict[str, Any]:
+    """
+    Async variant of extract_fields using the AsyncOpenAI client.
+
+    Awaits the Responses API call on the event loop instead of holding a
+    worker thread for the duration of the request. Calls wait on the shared
+    token bucket so concurrent extractions stay under settings.openai_rpm.
+    Returns the same normalized structure as extract_fields.
+    """
+    if not settings.openai_api_key:
+        logger.error("OPENAI_API_KEY not configured")
+        return _fallback_error(extraction_schema, "openai_key_missing")
+
+    system_prompt, user_prompt = _build_prompts(label, extraction_schema, doc_layout)
+    parse_kwargs = _build_parse_kwargs(extraction_schema, system_prompt, user_prompt)
 
-    # Call OpenAI Responses API with Pydantic structured output
     try:
-        client = OpenAI(api_key=settings.openai_api_key)
+        client = get_async_client()
 
-        # Log system and user messages for debugging
-        logger.debug(f"System prompt: {system_prompt}")
-        logger.debug(f"User prompt: {user_prompt}")
+        bucket = get_openai_bucket()
+        if bucket is not None:
+            await bucket.acquire()
 
-        # Responses API with parse for strict Pydantic validation
-        response = client.responses.parse(
-            model=settings.llm_model,
-            input=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            text_format=ExtractionModel,
-            reasoning={"effort": "minimal"},
-            text={"verbosity": "low"},
-        )
+        response = await client.responses.parse(**parse_kwargs)
 
-        # Log response tokens
-        usage = response.usage
-        if usage:
-            logger.info(f"Total tokens: {usage.total_tokens}")
+        return _handle_parsed_response(response, extraction_schema)
 
-        # Extract parsed Pydantic object
-        parsed_data = response.output_parsed
-        if not parsed_data:
-            logger.warning("Empty parsed response from OpenAI")
-            return _fallback_error(extraction_schema, "empty_response")
+    except Exception as exc:  # noqa: BLE001
+        logger.error(f"OpenAI API call failed: {exc}")
+        return _fallback_error(extraction_schema, "openai_api_error")
 
-        # Convert Pydantic model to normalized dict
-        return _normalize_pydantic_response(parsed_data, extraction_schema)
+
+def extract_fields_marshaled(
+    label: str,
+    extraction_schema: Dict[str, str],
+    doc_layouts: Sequence[str],
+) -> List[Dict[str, Any]]:
+    """
+    Extract the same fields from several documents in a single LLM call.
+
+    The layouts are concatenated into one prompt (DOC_1, DOC_2, ...) and the
+    model returns one object per document, so the prompt preamble and the
+    request round trip are paid once for the whole group. Meant for short
+    documents sharing a label and schema; see run_extraction_marshaled.
+
+    Args:
+        label: Document type label (e.g., "carteira_oab")
+        extraction_schema: Dict mapping field names to descriptions
+        doc_layouts: Layout text of each document
+
+    Returns:
+        One normalized dict per document, in input order, in the same format
+        as extract_fields
+    """
+    count = len(doc_layouts)
+    if not settings.openai_api_key:
+        logger.error("OPENAI_API_KEY not configured")
+        return [
+            _fallback_error(extraction_schema, "openai_key_missing")
+            for _ in range(count)
+        ]
+
+    system_prompt, user_prompt = _build_marshaled_prompts(
+        label, extraction_schema, doc_layouts
+    )
+    MarshaledModel = _marshaled_model_for(tuple(extraction_schema.items()))
+    parse_kwargs = _build_parse_kwargs(
+        extraction_schema, system_prompt, user_prompt, text_format=MarshaledModel
+    )
+
+    try:
+        client = _sdk_class("OpenAI")(**_client_kwargs())
+
+        response = client.responses.parse(**parse_kwargs)
 
     except Exception as exc:  # noqa: BLE001
         logger.error(f"OpenAI API call failed: {exc}")
+        return [
+            _fallback_error(extraction_schema, "openai_api_error") for _ in range(count)
+        ]
+
+    usage = response.usage
+    if usage:
+        logger.info(f"Total tokens: {usage.total_tokens} for {count} documents")
+
+    parsed_data = response.output_parsed
+    if not parsed_data:
+        logger.warning("Empty parsed response from OpenAI")
+        return [
+            _fallback_error(extraction_schema, "empty_response") for _ in range(count)
+        ]
+
+    # Structured outputs cannot pin the array length, so a model that merged
+    # or skipped documents is only detectable here
+    documents = parsed_data.documents
+    if len(documents) != count:
+        logger.error(f"Expected {count} documents in response, got {len(documents)}")
+        return [
+            _fallback_error(extraction_schema, "invalid_response") for _ in range(count)
+        ]
+
+    return [_normalize_pydantic_response(doc, extraction_schema) for doc in documents]
+
+
+def build_batch_request_body(
+    label: str,
+    extraction_schema: Dict[str, str],
+    doc_layout: str,
+) -> Dict[str, Any]:
+    """
+    Build a raw Responses API request body for one OpenAI Batch API line.
+
+    Mirrors the prompts and options used by extract_fields, but spells out the
+    structured output format as a strict JSON schema since batch lines are
+    plain JSON rather than responses.parse calls.
+
+    Args:
+        label: Document type label (e.g., "carteira_oab")
+        extraction_schema: Dict mapping field names to descriptions
+        doc_layout: Full document text with spatial metadata
+
+    Returns:
+        Request body for the /v1/responses batch endpoint
+    """
+    system_prompt, user_prompt = _build_prompts(label, extraction_schema, doc_layout)
+    output_schema = {
+        "type": "object",
+        "properties": {
+            field_name: {"type": ["string", "null"], "description": description}
+            for field_name, description in extraction_schema.items()
+        },
+        "required": list(extraction_schema),
+        "additionalProperties": False,
+    }
+
+    return {
+        "model": settings.llm_model,
+        "input": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        "text": {
+            "format": {
+                "type": "json_schema",
+                "name": "ExtractionModel",
+                "schema": output_schema,
+                "strict": True,
+            },
+            "verbosity": "low",
+        },
+        "reasoning": {"effort": "minimal"},
+    }
+
+
+def parse_batch_output_line(
+    line: Optional[Dict[str, Any]], extraction_schema: Dict[str, str]
+) -> Dict[str, Any]:
+    """
+    Normalize one OpenAI Batch API output line into extract_fields' format.
+
+    Args:
+        line: Decoded JSONL output line, or None if the batch produced none
+            for this request (e.g. it expired or was cancelled)
+        extraction_schema: Expected field schema
+
+    Returns:
+        Normalized dict in the same format as extract_fields
+    """
+    if line is None:
+        logger.error("No batch output for request")
+        return _fallback_error(extraction_schema, "batch_output_missing")
+
+    if line.get("error"):
+        logger.error(f"OpenAI batch request failed: {line['error']}")
+        return _fallback_error(extraction_schema, "openai_api_error")
+
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    if response.get("status_code") != 200:
+        logger.error(
+            f"OpenAI batch request returned {response.get('status_code')}: "
+            f"{body.get('error')}"
+        )
         return _fallback_error(extraction_schema, "openai_api_error")
 
+    usage = body.get("usage")
+    if usage:
+        logger.info(f"Total tokens: {usage.get('total_tokens')}")
+
+    output_text = "".join(
+        content.get("text", "")
+        for item in body.get("output", [])
+        if item.get("type") == "message"
+        for content in item.get("content", [])
+        if content.get("type") == "output_text"
+    )
+    if not output_text:
+        logger.warning("Empty batch response from OpenAI")
+        return _fallback_error(extraction_schema, "empty_response")
+
+    try:
+        fields = json.loads(output_text)
+    except json.JSONDecodeError as exc:
+        logger.error(f"Failed to decode batch response JSON: {exc}")
+        return _fallback_error(extraction_schema, "invalid_response")
+    if not isinstance(fields, dict):
+        logger.error("Batch response JSON is not an object")
+        return _fallback_error(extraction_schema, "invalid_response")
+
+    return _normalize_response({"fields": fields}, extraction_schema)
+
 
 def _normalize_pydantic_response(
     parsed_data: BaseModel, schema: Dict[str, str]
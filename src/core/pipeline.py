@@ -3,24 +3,196 @@ High-level extraction pipeline orchestration.
 
 Runs the end-to-end flow:
 1. Cache lookup
-2. PDF text/layout extraction
+2. PDF text/layout extraction (reusing a cached layout for the same PDF bytes)
 3. LLM extraction (all fields)
 4. Post-processing and normalization
 5. Cache population
+
+Two entrypoints share the same steps: run_extraction (synchronous, used by
+batch workers) and run_extraction_async (used by the API, awaits the LLM
+call and only offloads blocking steps to threads). run_extraction_batch fans
+run_extraction_async out over many requests with bounded concurrency, while
+run_extraction_marshaled packs documents sharing a label and schema into
+shared LLM prompts.
 """
 
 from __future__ import annotations
 
+import asyncio
+import random
+from contextlib import nullcontext
 from time import perf_counter
-from typing import Any, Dict
+from typing import (Any, AsyncContextManager, Dict, List, Optional, Sequence,
+                    Tuple, Union)
 
+from src.config.settings import get_settings
 from src.core import llm_orchestrator
 from src.core.cache import CacheClient
-from src.core.extractor import (PdfExtractor, hash_extraction_schema,
-                                hash_pdf_bytes, load_pdf_bytes,
-                                resolve_pdf_path)
+from src.core.extractor import (ExtractedDocument, PdfExtractor,
+                                hash_extraction_schema, hash_pdf_bytes,
+                                hash_pdf_file, resolve_pdf_path)
 from src.models.schema import ExtractionRequest, ExtractionResult
 
+# PDF layouts are deterministic, so they can outlive extraction results
+LAYOUT_CACHE_TTL_SECONDS = 86400
+
+# Backoff between item-level LLM retries in run_extraction_batch
+LLM_RETRY_BASE_SECONDS = 1.0
+LLM_RETRY_MAX_SECONDS = 30.0
+
+
+def _llm_call_failed(llm_results: Dict[str, Any]) -> bool:
+    """
+    True when the LLM layer reported an error (API failure, empty or invalid
+    response, missing key), as opposed to fields simply not being found.
+    """
+    return any(data.get("details", {}).get("error") for data in llm_results.values())
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter for the given retry attempt (1-based)."""
+    delay = min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _hash_source(request: ExtractionRequest) -> str:
+    """Hash the PDF - streamed from disk for paths, so it is never fully loaded."""
+    if request.pdf_bytes:
+        return hash_pdf_bytes(request.pdf_bytes)
+    if request.pdf_path:
+        pdf_path = resolve_pdf_path(request.pdf_path)
+        return hash_pdf_file(pdf_path)
+    raise ValueError("Either pdf_path or pdf_bytes must be provided.")
+
+
+def _build_cache_key(request: ExtractionRequest) -> Tuple[str, str, str]:
+    """Return (cache_key, pdf_hash, schema_hash) for a request."""
+    pdf_hash = _hash_source(request)
+    schema_hash = hash_extraction_schema(request.extraction_schema)
+    cache_key = f"extract:{request.label}:{pdf_hash}:{schema_hash}"
+    return cache_key, pdf_hash, schema_hash
+
+
+def _result_from_cache(
+    cached_payload: Dict[str, Any], cache_key: str
+) -> ExtractionResult:
+    """Rebuild a result from a cached payload, flagging the cache hit."""
+    cached_payload.setdefault("meta", {})
+    cached_payload["meta"]["cache_hit"] = True
+    cached_payload["meta"]["cache_key"] = cache_key
+    # Payloads were produced by model_dump() in this module, so skip
+    # re-validation as _build_result does
+    return ExtractionResult.model_construct(**cached_payload)
+
+
+def _new_extractor() -> PdfExtractor:
+    """Create the extractor for the configured engine (EXTRACTOR_ENGINE)."""
+    if get_settings().extractor_engine == "pymupdf":
+        # Imported here so PyMuPDF stays optional
+        from src.core.extractor_pymupdf import PymupdfExtractor
+
+        return PymupdfExtractor()
+    return PdfExtractor()
+
+
+def _extract_document(request: ExtractionRequest) -> ExtractedDocument:
+    """Extract PDF text and layout from either the path or the raw bytes."""
+    extractor = _new_extractor()
+    if request.pdf_path:
+        return extractor.load(pdf_path=request.pdf_path)
+    return extractor.load(pdf_bytes=request.pdf_bytes)
+
+
+def _document_source(request: ExtractionRequest) -> str:
+    """Source name of the request's PDF, as PdfExtractor.load reports it."""
+    if request.pdf_path:
+        return str(resolve_pdf_path(request.pdf_path).resolve())
+    return "<uploaded_bytes>"
+
+
+def _load_document(
+    request: ExtractionRequest,
+    pdf_hash: str,
+    cache_client: CacheClient,
+    use_cache: bool = True,
+    ttl_seconds: Optional[int] = None,
+) -> ExtractedDocument:
+    """
+    Extract the document, reusing the layout of previously seen PDF bytes.
+
+    Layout extraction only depends on the PDF content and the engine, so it
+    is cached under both and shared across labels and schemas. Cached
+    documents carry the layout text and engine-derived metadata only; word
+    boxes are not needed once the layout is formatted, and the source is
+    always taken from the current request.
+
+    When ttl_seconds is given, the layout is stored with it and a cached
+    layout is rewritten with it, so it stays available at least that long.
+    """
+    layout_key = f"layout:{get_settings().extractor_engine}:{pdf_hash}"
+    if use_cache:
+        cached_layout = cache_client.get_json(layout_key)
+        if cached_layout:
+            if ttl_seconds is not None:
+                cache_client.set_json(
+                    layout_key, cached_layout, ttl_seconds=ttl_seconds
+                )
+            return ExtractedDocument(
+                layout_text=cached_layout["layout_text"],
+                words=[],
+                meta={"source": _document_source(request), **cached_layout["meta"]},
+            )
+
+    doc = _extract_document(request)
+    layout_meta = {key: value for key, value in doc.meta.items() if key != "source"}
+    cache_client.set_json(
+        layout_key,
+        {"layout_text": doc.layout_text, "meta": layout_meta},
+        ttl_seconds=ttl_seconds or LAYOUT_CACHE_TTL_SECONDS,
+    )
+    return doc
+
+
+def _build_result(
+    request: ExtractionRequest,
+    doc: ExtractedDocument,
+    llm_results: Dict[str, Any],
+    timings: Dict[str, float],
+    cache_key: str,
+    pdf_hash: str,
+    schema_hash: str,
+) -> ExtractionResult:
+    """Assemble the final result and metadata from the LLM output."""
+    # Build final field results (simple key-value) and the resolution trace
+    # in a single pass, keeping schema order in both trace lists
+    fields: Dict[str, Any] = {}
+    llm_resolved: List[str] = []
+    unresolved: List[str] = []
+    for field_name, data in llm_results.items():
+        value = data.get("value")
+        fields[field_name] = value
+        (llm_resolved if value else unresolved).append(field_name)
+
+    # Build metadata
+    trace_info = {"llm_resolved": llm_resolved, "unresolved": unresolved}
+
+    meta: Dict[str, Any] = {
+        "cache_hit": False,
+        "cache_key": cache_key,
+        "pdf_hash": pdf_hash,
+        "schema_hash": schema_hash,
+        "timings_seconds": timings,
+        "doc_meta": doc.meta,
+        "trace": trace_info,
+    }
+
+    # Values come from trusted internal code, so skip re-validation
+    return ExtractionResult.model_construct(
+        label=request.label,
+        fields=fields,
+        meta=meta,
+    )
+
 
 def run_extraction(
     request: ExtractionRequest,
@@ -33,83 +205,283 @@ def run_extraction(
         FileNotFoundError when the PDF is missing.
         ValueError for invalid inputs.
     """
-    # Get PDF bytes - either from file path or direct bytes
-    if request.pdf_bytes:
-        pdf_bytes = request.pdf_bytes
-    elif request.pdf_path:
-        pdf_path = resolve_pdf_path(request.pdf_path)
-        pdf_bytes = load_pdf_bytes(pdf_path)
-    else:
-        raise ValueError("Either pdf_path or pdf_bytes must be provided.")
-
-    pdf_hash = hash_pdf_bytes(pdf_bytes)
-    schema_hash = hash_extraction_schema(request.extraction_schema)
-    cache_key = f"extract:{request.label}:{pdf_hash}:{schema_hash}"
+    cache_key, pdf_hash, schema_hash = _build_cache_key(request)
 
     cache_client = CacheClient()
 
     if use_cache:
         cached_payload = cache_client.get_json(cache_key)
         if cached_payload:
-            cached_payload.setdefault("meta", {})
-            cached_payload["meta"]["cache_hit"] = True
-            cached_payload["meta"]["cache_key"] = cache_key
-            return ExtractionResult.model_validate(cached_payload)
+            return _result_from_cache(cached_payload, cache_key)
 
     timings: Dict[str, float] = {}
     total_start = perf_counter()
 
     # Extract PDF text and layout
-    extractor = PdfExtractor()
     extract_start = perf_counter()
-    # Pass either pdf_path or pdf_bytes to extractor
-    if request.pdf_path:
-        doc = extractor.load(pdf_path=request.pdf_path)
-    else:
-        doc = extractor.load(pdf_bytes=pdf_bytes)
+    doc = _load_document(request, pdf_hash, cache_client, use_cache)
     timings["extract"] = perf_counter() - extract_start
 
-    # Use layout_text directly from extractor
-    layout_text = doc.layout_text
-
     # Call LLM for ALL fields (no heuristics)
     llm_start = perf_counter()
     llm_results = llm_orchestrator.extract_fields(
         label=request.label,
         extraction_schema=request.extraction_schema,
-        doc_layout=layout_text,
+        doc_layout=doc.layout_text,
     )
     timings["llm"] = perf_counter() - llm_start
 
-    # Build final field results (simple key-value)
-    fields: Dict[str, Any] = {}
-    for field_name, data in llm_results.items():
-        fields[field_name] = data.get("value")
-
     timings["total"] = perf_counter() - total_start
 
-    # Build metadata
-    trace_info = {
-        "llm_resolved": [f for f, d in llm_results.items() if d.get("value")],
-        "unresolved": [f for f, d in llm_results.items() if not d.get("value")],
-    }
+    result = _build_result(
+        request, doc, llm_results, timings, cache_key, pdf_hash, schema_hash
+    )
 
-    meta: Dict[str, Any] = {
-        "cache_hit": False,
-        "cache_key": cache_key,
-        "pdf_hash": pdf_hash,
-        "schema_hash": schema_hash,
-        "timings_seconds": timings,
-        "doc_meta": doc.meta,
-        "trace": trace_info,
-    }
+    # Failed OpenAI calls are not cached, so a rerun retries them
+    if not _llm_call_failed(llm_results):
+        cache_client.set_json(cache_key, result.model_dump())
 
-    result = ExtractionResult(
-        label=request.label,
-        fields=fields,
-        meta=meta,
+    return result
+
+
+def _run_marshaled_group(
+    members: Sequence[Tuple[str, ExtractedDocument, float]],
+    unique: Dict[str, Tuple[ExtractionRequest, str, str]],
+    marshal_batch: int,
+) -> List[Tuple[str, ExtractionResult, bool]]:
+    """
+    Answer one label/schema group of run_extraction_marshaled.
+
+    The group is split into chunks of marshal_batch documents, each answered
+    by a single LLM call. Returns (cache_key, result, llm_call_failed) for
+    each member.
+    """
+    first_request = unique[members[0][0]][0]
+    outcomes: List[Tuple[str, ExtractionResult, bool]] = []
+    for start in range(0, len(members), marshal_batch):
+        chunk = members[start : start + marshal_batch]
+
+        llm_start = perf_counter()
+        llm_results_list = llm_orchestrator.extract_fields_marshaled(
+            label=first_request.label,
+            extraction_schema=first_request.extraction_schema,
+            doc_layouts=[doc.layout_text for _, doc, _ in chunk],
+        )
+        llm_seconds = perf_counter() - llm_start
+
+        for (cache_key, doc, extract_seconds), llm_results in zip(
+            chunk, llm_results_list
+        ):
+            request, pdf_hash, schema_hash = unique[cache_key]
+            timings = {
+                "extract": extract_seconds,
+                "llm": llm_seconds,
+                "total": extract_seconds + llm_seconds,
+            }
+            result = _build_result(
+                request, doc, llm_results, timings, cache_key, pdf_hash, schema_hash
+            )
+            outcomes.append((cache_key, result, _llm_call_failed(llm_results)))
+    return outcomes
+
+
+def run_extraction_marshaled(
+    requests: Sequence[ExtractionRequest],
+    use_cache: bool = True,
+    marshal_batch: Optional[int] = None,
+) -> List[ExtractionResult]:
+    """
+    Execute many extractions, sending several documents per LLM call.
+
+    Requests are grouped by label and schema, and each group is split into
+    chunks of marshal_batch documents whose layouts share one prompt.
+    Identical requests (same cache key) take one prompt slot and share its
+    result. Cache lookup, layout extraction and cache population work as in
+    run_extraction. Each result's "llm" timing is the duration of the shared
+    call.
+
+    Args:
+        requests: Extraction requests to run
+        use_cache: Whether to use Redis cache for results
+        marshal_batch: Documents per LLM call
+            (defaults to settings.marshal_batch)
+
+    Returns:
+        One ExtractionResult per request, in input order
+
+    Raises:
+        FileNotFoundError when a PDF is missing.
+        ValueError for invalid inputs.
+    """
+    if marshal_batch is None:
+        marshal_batch = get_settings().marshal_batch
+
+    cache_client = CacheClient()
+    keys = [_build_cache_key(request) for request in requests]
+
+    # Identical requests share a cache key, so only the first is extracted
+    unique: Dict[str, Tuple[ExtractionRequest, str, str]] = {}
+    for request, (cache_key, pdf_hash, schema_hash) in zip(requests, keys):
+        unique.setdefault(cache_key, (request, pdf_hash, schema_hash))
+
+    cache_keys = list(unique)
+    if use_cache:
+        cached_payloads = cache_client.get_json_many(cache_keys)
+    else:
+        cached_payloads = [None] * len(cache_keys)
+
+    results: Dict[str, ExtractionResult] = {}
+    # (label, schema_hash) -> [(cache_key, document, extract seconds)]
+    groups: Dict[Tuple[str, str], List[Tuple[str, ExtractedDocument, float]]] = {}
+    for cache_key, cached_payload in zip(cache_keys, cached_payloads):
+        request, pdf_hash, schema_hash = unique[cache_key]
+        if cached_payload:
+            results[cache_key] = _result_from_cache(cached_payload, cache_key)
+            continue
+
+        extract_start = perf_counter()
+        doc = _load_document(request, pdf_hash, cache_client, use_cache)
+        groups.setdefault((request.label, schema_hash), []).append(
+            (cache_key, doc, perf_counter() - extract_start)
+        )
+
+    to_cache: Dict[str, Dict[str, Any]] = {}
+    for members in groups.values():
+        outcomes = _run_marshaled_group(members, unique, marshal_batch)
+        for cache_key, result, failed in outcomes:
+            if not failed:
+                to_cache[cache_key] = result.model_dump()
+            results[cache_key] = result
+
+    if to_cache:
+        cache_client.set_json_many(to_cache)
+
+    # Fan each result back out to every request sharing its cache key
+    return [results[cache_key] for cache_key, _, _ in keys]
+
+
+async def run_extraction_async(
+    request: ExtractionRequest,
+    use_cache: bool = True,
+    llm_retries: int = 0,
+    extract_slots: Optional[AsyncContextManager] = None,
+    llm_slots: Optional[AsyncContextManager] = None,
+) -> ExtractionResult:
+    """
+    Execute the extraction pipeline without holding a thread for the LLM call.
+
+    File hashing, Redis and PDF parsing are blocking, so they run via
+    asyncio.to_thread; the LLM request is awaited directly. When the OpenAI
+    call still fails after the SDK's own retries, it is re-issued up to
+    llm_retries more times with exponential backoff.
+
+    extract_slots and llm_slots (e.g. semaphores) bound the preparation stage
+    (hashing, cache lookup, PDF extraction) and the LLM stage separately, so
+    a batch can extract the next PDFs while earlier ones wait on OpenAI.
+
+    Raises:
+        FileNotFoundError when the PDF is missing.
+        ValueError for invalid inputs.
+    """
+    async with extract_slots or nullcontext():
+        cache_key, pdf_hash, schema_hash = await asyncio.to_thread(
+            _build_cache_key, request
+        )
+
+        cache_client = await asyncio.to_thread(CacheClient)
+
+        if use_cache:
+            cached_payload = await asyncio.to_thread(cache_client.get_json, cache_key)
+            if cached_payload:
+                return _result_from_cache(cached_payload, cache_key)
+
+        timings: Dict[str, float] = {}
+        total_start = perf_counter()
+
+        # Extract PDF text and layout (CPU-bound)
+        extract_start = perf_counter()
+        doc = await asyncio.to_thread(
+            _load_document, request, pdf_hash, cache_client, use_cache
+        )
+        timings["extract"] = perf_counter() - extract_start
+
+    # Call LLM for ALL fields (no heuristics); backoff sleeps happen outside
+    # llm_slots so a waiting retry does not hold a slot
+    llm_start = perf_counter()
+    for attempt in range(llm_retries + 1):
+        if attempt:
+            await asyncio.sleep(_retry_delay(attempt))
+        async with llm_slots or nullcontext():
+            llm_results = await llm_orchestrator.extract_fields_async(
+                label=request.label,
+                extraction_schema=request.extraction_schema,
+                doc_layout=doc.layout_text,
+            )
+        if not _llm_call_failed(llm_results):
+            break
+    timings["llm"] = perf_counter() - llm_start
+
+    timings["total"] = perf_counter() - total_start
+
+    result = _build_result(
+        request, doc, llm_results, timings, cache_key, pdf_hash, schema_hash
     )
 
-    cache_client.set_json(cache_key, result.model_dump())
+    # Failed OpenAI calls are not cached, so a rerun retries them
+    if not _llm_call_failed(llm_results):
+        await asyncio.to_thread(cache_client.set_json, cache_key, result.model_dump())
 
     return result
+
+
+async def run_extraction_batch(
+    requests: Sequence[ExtractionRequest],
+    use_cache: bool = True,
+    max_concurrency: Optional[int] = None,
+    return_exceptions: bool = False,
+    llm_retries: Optional[int] = None,
+) -> List[Union[ExtractionResult, BaseException]]:
+    """
+    Execute many extractions concurrently and return results in request order.
+
+    The LLM round-trip dominates wall time, so requests are awaited together
+    via asyncio.gather instead of one after another. The extraction and LLM
+    stages have their own semaphore, each capped at max_concurrency, so PDF
+    extraction of later requests overlaps the LLM calls of earlier ones
+    instead of waiting for a whole slot to free up. The request rate itself
+    is held under settings.openai_rpm by the token bucket in
+    extract_fields_async.
+
+    Args:
+        requests: Extraction requests to run
+        use_cache: Whether to use Redis cache for results
+        max_concurrency: Maximum requests in each stage at once
+            (defaults to settings.max_concurrent_extractions)
+        return_exceptions: Return failures in place of results instead of
+            raising the first one (same semantics as asyncio.gather)
+        llm_retries: Extra attempts for items whose OpenAI call failed
+            (defaults to settings.batch_llm_retries)
+
+    Returns:
+        One ExtractionResult (or exception) per request, in input order
+    """
+    if max_concurrency is None:
+        max_concurrency = get_settings().max_concurrent_extractions
+    if llm_retries is None:
+        llm_retries = get_settings().batch_llm_retries
+    extract_slots = asyncio.Semaphore(max_concurrency)
+    llm_slots = asyncio.Semaphore(max_concurrency)
+
+    return await asyncio.gather(
+        *(
+            run_extraction_async(
+                request,
+                use_cache=use_cache,
+                llm_retries=llm_retries,
+                extract_slots=extract_slots,
+                llm_slots=llm_slots,
+            )
+            for request in requests
+        ),
+        return_exceptions=return_exceptions,
+    )
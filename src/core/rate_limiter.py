@@ -0,0 +1,62 @@
+"""
+Client-side rate limiting for OpenAI requests.
+
+A semaphore only bounds how many calls are in flight, so short LLM calls can
+still burst past the account's requests-per-minute limit and come back as
+429s. The token bucket here spaces requests out to a sustained rate instead,
+while still allowing a short burst up to the bucket capacity.
+"""
+
+import asyncio
+import logging
+from time import monotonic
+from typing import Optional
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket: refills `rate` tokens per second up to `capacity`.
+
+    Callers that find the bucket empty reserve the next token (the balance
+    goes negative) and sleep until it is due, so waiters are served in
+    arrival order without a lock. No state is tied to an event loop, so one
+    bucket can be shared for the whole process.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = monotonic()
+
+    def _refill(self) -> None:
+        now = monotonic()
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        """Take one token, waiting until one is available."""
+        self._refill()
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+# Process-wide bucket for OpenAI calls, created on first use
+_openai_bucket: Optional[TokenBucket] = None
+
+
+def get_openai_bucket() -> Optional[TokenBucket]:
+    """Return the shared OpenAI token bucket, or None when limiting is off."""
+    global _openai_bucket
+    if _openai_bucket is None and settings.openai_rpm > 0:
+        logger.info(f"Rate limiting OpenAI calls to {settings.openai_rpm} RPM")
+        _openai_bucket = TokenBucket(rate=settings.openai_rpm / 60)
+    return _openai_bucket
@@ -12,60 +12,54 @@ This module provides a production-ready FastAPI app with:
 import asyncio
 import json
 import logging
+from pathlib import Path
+from typing import List
 
+import orjson
 from fastapi import (FastAPI, File, Form, HTTPException, Query, Request,
-                     UploadFile, status)
+                     Response, UploadFile, status)
 from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 
 from src.config.logging import setup_logging
 from src.config.settings import settings  # loads environment variables
+from src.core import llm_orchestrator
 from src.core.batch import process_batch_parallel
 from src.core.cache import CacheClient
-from src.core.pipeline import run_extraction
-from src.models.schema import (BatchItemResult, BatchSummary,
-                               ExtractionRequest, ExtractionResult,
-                               HealthResponse)
+from src.core.pipeline import run_extraction_async
+from src.models.schema import (BatchExtractionItem, BatchItemResult,
+                               BatchSummary, ExtractionRequest,
+                               ExtractionResult, HealthResponse)
 
 # Initialize logging on startup
 setup_logging()
 
 logger = logging.getLogger(__name__)
 
-# FastAPI app configuration
-app = FastAPI(
-    title="PDF Extraction AI",
-    description="""
-## Serviço de Extração Inteligente de PDFs
-
-API para extração de dados estruturados de documentos PDF usando LLMs.
-
-### Características Principais
-
-* **Extração Estruturada**: Define seus próprios campos de extração via schema customizado
-* **Cache Inteligente**: Redis cache para evitar reprocessamento
-* **Observabilidade**: Token counting e métricas detalhadas
-* **Alta Precisão**: Utiliza OpenAI GPT-5-mini para extração precisa
+# Liveness payload never changes after startup, so serialize it once
+_HEALTH_BYTES = orjson.dumps(
+    HealthResponse(status="ok", environment=settings.env).model_dump()
+)
 
-### Como Usar
+# Validator for /extract/batch payloads, built once instead of per item
+_BATCH_ITEMS_ADAPTER = TypeAdapter(List[BatchExtractionItem])
 
-1. **Via Upload de Arquivo**: Use `/extract/upload` para enviar PDFs diretamente
-2. **Via Caminho Local**: Use `/extract` com `pdf_path` para processar arquivos locais
+# OpenAPI markdown description, only read when docs are served
+DESCRIPTION_PATH = Path(__file__).parent / "description.md"
 
-### Formato de Schema
 
-O `extraction_schema` define quais campos você deseja extrair:
+def _load_description() -> str:
+    """Read the OpenAPI description shown on /docs and /redoc."""
+    return DESCRIPTION_PATH.read_text(encoding="utf-8")
 
-```json
-{
-  "nome": "Nome completo do profissional",
-  "inscricao": "Número de inscrição OAB",
-  "categoria": "Categoria profissional (ADVOGADO, ESTAGIARIO, etc)"
-}
-```
 
-    """,
+# FastAPI app configuration
+app = FastAPI(
+    title="PDF Extraction AI",
+    description=_load_description() if settings.is_development else "",
     version="1.0.0",
     debug=settings.debug,
     docs_url="/docs" if settings.is_development else None,  # Disable docs in prod
@@ -79,19 +73,22 @@ O `extraction_schema` define quais campos você deseja extrair:
     },
 )
 
-# Parse allowed origins from settings
-allowed_origins = [origin.strip() for origin in settings.allowed_origins.split(",")]
-
-# Configure CORS for frontend access
+# Configure CORS for frontend access (a frozenset keeps origin checks O(1))
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=allowed_origins,
+    allow_origins=settings.allowed_origins_set,
     allow_credentials=False,  # More secure for production
     allow_methods=["GET", "POST", "OPTIONS"],  # Explicit methods only
     allow_headers=["Content-Type", "Authorization", settings.api_key_header],
 )
 
 
+# Compress larger JSON responses (health checks fall below the threshold).
+# Registered before the security headers middleware so it sits inside it and
+# sees complete response bodies; SSE streams are excluded by Starlette.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+
 # Security headers middleware
 @app.middleware("http")
 async def add_security_headers(request: Request, call_next):
@@ -113,21 +110,39 @@ async def add_security_headers(request: Request, call_next):
     return response
 
 
+def _map_pipeline_error(exc: Exception) -> HTTPException:
+    """Translate a pipeline exception into the matching HTTP error.
+
+    Note: on timeout the pending LLM call is cancelled, but a blocking step
+    already handed to a worker thread (PDF parsing, Redis) runs to completion.
+    """
+    if isinstance(exc, asyncio.TimeoutError):
+        return HTTPException(status_code=504, detail="Extraction timed out")
+    if isinstance(exc, FileNotFoundError):
+        return HTTPException(status_code=404, detail=str(exc))
+    if isinstance(exc, ValueError):
+        return HTTPException(status_code=400, detail=str(exc))
+    return HTTPException(status_code=500, detail=f"Extraction pipeline error: {exc}")
+
+
 @app.on_event("startup")
 async def startup_event():
     """Application startup event - log configuration."""
-    logger.info(f"Starting PDF Extraction API in {settings.env} mode")
-    logger.info(f"Debug mode: {settings.debug}")
-    logger.info(f"CORS origins: {settings.allowed_origins}")
-    logger.info(f"Workers configured: {settings.workers}")
+    logger.info("Starting PDF Extraction API in %s mode", settings.env)
+    logger.info("Debug mode: %s", settings.debug)
+    logger.info("CORS origins: %s", settings.allowed_origins)
+    logger.info("Workers configured: %s", settings.workers)
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown event - cleanup resources."""
     logger.info("Shutting down PDF Extraction API")
+    await llm_orchestrator.close_async_client()
 
 
+# Starlette matches routes by linear scan in registration order: keep the
+# static health probes and single-document extraction routes first.
 @app.get(
     "/health",
     response_model=HealthResponse,
@@ -152,7 +167,7 @@ async def health():
     Retorna status 200 se o serviço está rodando normalmente.
     Este endpoint é ideal para health checks básicos de orquestradores como Kubernetes.
     """
-    return HealthResponse(status="ok", environment=settings.env)
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 
 @app.get(
@@ -210,7 +225,7 @@ async def readiness():
                 content={"status": "not_ready", "checks": checks},
             )
     except Exception as e:
-        logger.error(f"Redis readiness check failed: {e}")
+        logger.error("Redis readiness check failed: %s", e)
         checks["redis"] = f"error: {str(e)}"
         return JSONResponse(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -232,6 +247,7 @@ async def readiness():
 @app.post(
     "/extract",
     response_model=ExtractionResult,
+    response_class=ORJSONResponse,
     tags=["Extraction"],
     summary="Extração de PDF (via path local)",
     description="Processa um PDF usando caminho local do arquivo no servidor",
@@ -294,26 +310,21 @@ async def extract(
     - **meta**: Metadados (cache hit, tokens usados, tempo de processamento)
     """
     try:
-        result = await run_in_threadpool(
-            run_extraction,
-            request,
-            use_cache=use_cache,
+        result = await asyncio.wait_for(
+            run_extraction_async(request, use_cache=use_cache),
+            timeout=settings.extraction_timeout_seconds,
         )
-    except FileNotFoundError as exc:
-        raise HTTPException(status_code=404, detail=str(exc)) from exc
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:  # noqa: BLE001
-        raise HTTPException(
-            status_code=500, detail=f"Extraction pipeline error: {exc}"
-        ) from exc
+        raise _map_pipeline_error(exc) from exc
 
-    return result
+    # Serialize once from a plain dict; response_model is kept for OpenAPI only
+    return ORJSONResponse(result.model_dump())
 
 
 @app.post(
     "/extract/upload",
     response_model=ExtractionResult,
+    response_class=ORJSONResponse,
     tags=["Extraction"],
     summary="Extração de PDF (via upload)",
     description="Processa um PDF enviado via upload de arquivo (multipart/form-data)",
@@ -420,8 +431,8 @@ async def extract_upload(
 
     # Parse extraction schema JSON
     try:
-        schema_dict = json.loads(extraction_schema)
-    except json.JSONDecodeError as exc:
+        schema_dict = orjson.loads(extraction_schema)
+    except orjson.JSONDecodeError as exc:
         raise HTTPException(
             status_code=400, detail=f"Invalid extraction_schema JSON: {exc}"
         ) from exc
@@ -433,19 +444,15 @@ async def extract_upload(
 
     # Run extraction pipeline
     try:
-        result = await run_in_threadpool(
-            run_extraction,
-            request,
-            use_cache=use_cache,
+        result = await asyncio.wait_for(
+            run_extraction_async(request, use_cache=use_cache),
+            timeout=settings.extraction_timeout_seconds,
         )
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:  # noqa: BLE001
-        raise HTTPException(
-            status_code=500, detail=f"Extraction pipeline error: {exc}"
-        ) from exc
+        raise _map_pipeline_error(exc) from exc
 
-    return result
+    # Serialize once from a plain dict; response_model is kept for OpenAPI only
+    return ORJSONResponse(result.model_dump())
 
 
 @app.post(
@@ -615,12 +622,13 @@ async def extract_batch(
             detail=f"Batch size ({len(items)}) exceeds maximum allowed ({settings.max_batch_size})",
         )
 
-    # Parse items into BatchExtractionItem models
+    # Parse items into BatchExtractionItem models (off the event loop, since
+    # large batches make validation CPU-bound)
     try:
-        from src.models.schema import BatchExtractionItem
-
-        batch_items = [BatchExtractionItem(**item) for item in items]
-    except Exception as exc:
+        batch_items = await run_in_threadpool(
+            _BATCH_ITEMS_ADAPTER.validate_python, items
+        )
+    except ValidationError as exc:
         raise HTTPException(
             status_code=400,
             detail=f"Invalid batch item format: {exc}",
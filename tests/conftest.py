@@ -2,59 +2,138 @@
 Pytest fixtures for unit and integration tests.
 
 Provides shared fixtures for:
-- AsyncClient for API integration tests
+- Session-scoped AsyncClient for API integration tests
 - Mock Redis client for cache tests
+- In-memory FakeCacheClient for pipeline tests
 - Mock OpenAI client for LLM tests
 - Sample PDF files and test data
 """
 
+import asyncio
 import sys
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Any, Dict
-from unittest.mock import MagicMock
+from types import MappingProxyType, SimpleNamespace
+from typing import Any, Dict, List, Mapping, Tuple
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import orjson
 import pytest
-import pytest_asyncio
-from httpx import AsyncClient
+from httpx import ASGITransport, AsyncClient
+
+from src.config.settings import get_settings
+
+# Helper script for generating PDFs by hand, never a test module.
+collect_ignore = ["fixtures/create_test_pdfs.py"]
+
+# Patchers for the pipeline's collaborators, built once and re-entered per test.
+_PIPELINE_PATCHERS = {
+    "resolve": patch("src.core.pipeline.resolve_pdf_path"),
+    "extractor_class": patch("src.core.pipeline.PdfExtractor"),
+    "cache_class": patch("src.core.pipeline.CacheClient"),
+}
+
+# LLM entrypoints, patched only for the tests that request them.
+_LLM_PATCHERS = {
+    "extract_fields": patch("src.core.pipeline.llm_orchestrator.extract_fields"),
+    "extract_fields_async": patch(
+        "src.core.pipeline.llm_orchestrator.extract_fields_async",
+        new_callable=AsyncMock,
+    ),
+}
+
+# Shared read-only sample data; fixtures hand these out without copying.
+_SAMPLE_WORDS: Tuple[Mapping[str, Any], ...] = tuple(
+    MappingProxyType(word)
+    for word in (
+        {"text": "JOÃO", "x0": 100.0, "top": 50.0, "x1": 150.0, "bottom": 70.0},
+        {"text": "DA", "x0": 155.0, "top": 50.0, "x1": 175.0, "bottom": 70.0},
+        {"text": "SILVA", "x0": 180.0, "top": 50.0, "x1": 230.0, "bottom": 70.0},
+        {
+            "text": "Inscrição:",
+            "x0": 100.0,
+            "top": 100.0,
+            "x1": 170.0,
+            "bottom": 120.0,
+        },
+        {"text": "123456", "x0": 175.0, "top": 100.0, "x1": 230.0, "bottom": 120.0},
+    )
+)
+
+_LLM_DETAILS: Mapping[str, str] = MappingProxyType(
+    {"source": "openai", "method": "responses.parse"}
+)
+
+_SAMPLE_LLM_RESPONSE: Mapping[str, Mapping[str, Any]] = MappingProxyType(
+    {
+        "nome": MappingProxyType({"value": "JOÃO DA SILVA", "details": _LLM_DETAILS}),
+        "inscricao": MappingProxyType({"value": "123456", "details": _LLM_DETAILS}),
+        "categoria": MappingProxyType({"value": "ADVOGADO", "details": _LLM_DETAILS}),
+    }
+)
 
-# Ensure project root is available for src.* imports when tests run in Docker.
-ROOT_DIR = Path(__file__).resolve().parents[1]
-if str(ROOT_DIR) not in sys.path:
-    sys.path.insert(0, str(ROOT_DIR))
 
-# Import the FastAPI app instance (must be created in src/main.py)
-from src.main import app  # noqa: E402
+def pytest_addoption(parser):
+    """Register opt-in flags for the slower test paths."""
+    parser.addoption(
+        "--use-real-pdfs",
+        action="store_true",
+        default=False,
+        help="Run tests that render real PDFs with reportlab.",
+    )
 
 
-@pytest_asyncio.fixture
-async def client():
-    """Provide an HTTPX AsyncClient connected to the FastAPI app."""
-    async with AsyncClient(app=app, base_url="http://testserver") as ac:
-        yield ac
+@pytest.fixture(scope="session")
+def app_instance():
+    """Import the FastAPI app once per session (must be created in src/main.py)."""
+    from src.main import app
+
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app_instance):
+    """
+    Provide an HTTPX AsyncClient connected to the FastAPI app (shared per session).
+
+    ASGITransport holds no sockets or loop-bound state, so one client is safe
+    to share across the per-test event loops.
+    """
+    transport = ASGITransport(app=app_instance)
+    ac = AsyncClient(transport=transport, base_url="http://testserver")
+    yield ac
+    asyncio.run(ac.aclose())
 
 
 @pytest.fixture
 def mock_redis():
-    """Provide a mock Redis client for cache tests."""
-    mock = MagicMock()
-    mock.get.return_value = None
-    mock.set.return_value = True
-    mock.setex.return_value = True
-    return mock
+    """Provide a lightweight Redis client stub for cache tests."""
+    return SimpleNamespace(
+        get=lambda *_, **__: None,
+        set=lambda *_, **__: True,
+        setex=lambda *_, **__: True,
+    )
 
 
-@pytest.fixture
-def mock_openai_client():
-    """Provide a mock OpenAI client for LLM tests."""
-    mock = MagicMock()
+class _StubOpenAIResponses:
+    """Minimal stand-in for ``OpenAI().responses`` returning an empty parse."""
+
+    def parse(self, *args, **kwargs):
+        return SimpleNamespace(
+            output_parsed=None, usage=SimpleNamespace(total_tokens=1500)
+        )
 
-    # Mock responses.parse response structure
-    mock_response = MagicMock()
-    mock_response.usage.total_tokens = 1500
-    mock_response.output_parsed = None
-    mock.responses.parse.return_value = mock_response
 
-    return mock
+class _StubOpenAI:
+    """Minimal stand-in for the OpenAI client used by the orchestrator."""
+
+    responses = _StubOpenAIResponses()
+
+
+@pytest.fixture(scope="session")
+def mock_openai_client():
+    """Provide a stub OpenAI client for LLM tests."""
+    return _StubOpenAI()
 
 
 @pytest.fixture
@@ -77,46 +156,16 @@ def sample_extraction_request(sample_extraction_schema) -> Dict[str, Any]:
     }
 
 
+@pytest.fixture(scope="session")
+def sample_extracted_words() -> Tuple[Mapping[str, Any], ...]:
+    """Provide sample word data with bounding boxes (read-only, shared)."""
+    return _SAMPLE_WORDS
+
+
 @pytest.fixture
-def sample_extracted_words() -> list:
-    """Provide sample word data with bounding boxes."""
-    return [
-        {
-            "text": "JOÃO",
-            "x0": 100.0,
-            "top": 50.0,
-            "x1": 150.0,
-            "bottom": 70.0,
-        },
-        {
-            "text": "DA",
-            "x0": 155.0,
-            "top": 50.0,
-            "x1": 175.0,
-            "bottom": 70.0,
-        },
-        {
-            "text": "SILVA",
-            "x0": 180.0,
-            "top": 50.0,
-            "x1": 230.0,
-            "bottom": 70.0,
-        },
-        {
-            "text": "Inscrição:",
-            "x0": 100.0,
-            "top": 100.0,
-            "x1": 170.0,
-            "bottom": 120.0,
-        },
-        {
-            "text": "123456",
-            "x0": 175.0,
-            "top": 100.0,
-            "x1": 230.0,
-            "bottom": 120.0,
-        },
-    ]
+def sample_extracted_words_mutable() -> List[Dict[str, Any]]:
+    """Provide a private, mutable copy of the sample word data."""
+    return [dict(word) for word in _SAMPLE_WORDS]
 
 
 @pytest.fixture
@@ -129,25 +178,178 @@ def sample_layout_text() -> str:
 [BOTTOM-RIGHT] [x:450-550, y:700] ATIVO"""
 
 
+@pytest.fixture(scope="session")
+def sample_llm_response() -> Mapping[str, Mapping[str, Any]]:
+    """Provide a sample normalized LLM response (read-only, shared)."""
+    return _SAMPLE_LLM_RESPONSE
+
+
 @pytest.fixture
-def sample_llm_response() -> Dict[str, Any]:
-    """Provide a sample normalized LLM response."""
+def sample_llm_response_mutable() -> Dict[str, Dict[str, Any]]:
+    """Provide a private, mutable copy of the sample LLM response."""
     return {
-        "nome": {
-            "value": "JOÃO DA SILVA",
-            "details": {"source": "openai", "method": "responses.parse"},
-        },
-        "inscricao": {
-            "value": "123456",
-            "details": {"source": "openai", "method": "responses.parse"},
-        },
-        "categoria": {
-            "value": "ADVOGADO",
-            "details": {"source": "openai", "method": "responses.parse"},
-        },
+        field: {"value": data["value"], "details": dict(data["details"])}
+        for field, data in _SAMPLE_LLM_RESPONSE.items()
     }
 
 
+@pytest.fixture(scope="session")
+def fake_pdf_file(tmp_path_factory) -> Path:
+    """Provide one placeholder PDF file shared by tests that mock its loading."""
+    pdf_file = tmp_path_factory.mktemp("pdfs") / "test.pdf"
+    pdf_file.write_bytes(b"fake pdf")
+    return pdf_file
+
+
+@pytest.fixture(scope="session")
+def fake_pdfs(tmp_path_factory) -> Tuple[Path, ...]:
+    """Provide placeholder PDFs test0.pdf..test2.pdf with distinct contents."""
+    pdf_dir = tmp_path_factory.mktemp("batch_pdfs")
+    paths = tuple(pdf_dir / f"test{i}.pdf" for i in range(3))
+    for i, path in enumerate(paths):
+        path.write_bytes(f"fake pdf {i}".encode())
+    return paths
+
+
+@pytest.fixture(scope="session")
+def sample_extracted_document(fake_pdf_file):
+    """Provide one extracted document shared by tests that mock the extractor."""
+    from src.core.extractor import ExtractedDocument
+
+    return ExtractedDocument(
+        layout_text="[TOP-LEFT] JOÃO DA SILVA",
+        words=[],
+        meta={"source": str(fake_pdf_file), "engine": "pdfplumber", "pages": 1},
+    )
+
+
+@pytest.fixture
+def mock_extractor(sample_extracted_document):
+    """Provide a PdfExtractor mock whose load() returns the sample document."""
+    from src.core.extractor import PdfExtractor
+
+    extractor = MagicMock(spec=PdfExtractor)
+    extractor.load.return_value = sample_extracted_document
+    return extractor
+
+
+@pytest.fixture
+def llm_mocks():
+    """Replace the orchestrator's LLM calls for the requesting test only."""
+    with ExitStack() as stack:
+        yield SimpleNamespace(
+            **{
+                name: stack.enter_context(patcher)
+                for name, patcher in _LLM_PATCHERS.items()
+            }
+        )
+
+
+@pytest.fixture
+def pipeline_mocks(fake_pdf_file, mock_extractor, llm_mocks):
+    """
+    Patch every collaborator of src.core.pipeline in one go.
+
+    Defaults to a cache miss and a one-line extracted document; tests only
+    set the LLM return value and whatever else they need to vary.
+    """
+    with ExitStack() as stack:
+        mocks = SimpleNamespace(
+            file=fake_pdf_file,
+            **vars(llm_mocks),
+            **{
+                name: stack.enter_context(patcher)
+                for name, patcher in _PIPELINE_PATCHERS.items()
+            },
+        )
+
+        mocks.resolve.return_value = fake_pdf_file
+
+        mocks.cache = mocks.cache_class.return_value
+        mocks.cache.get_json.return_value = None
+        mocks.cache.set_json.return_value = True
+
+        mocks.extractor = mock_extractor
+        mocks.extractor_class.return_value = mock_extractor
+
+        yield mocks
+
+
+@pytest.fixture(scope="session")
+def real_pdf(request, tmp_path_factory) -> Path:
+    """Provide a reportlab-rendered OAB card PDF (needs --use-real-pdfs)."""
+    if not request.config.getoption("--use-real-pdfs"):
+        pytest.skip("set --use-real-pdfs to run tests against rendered PDFs")
+    pytest.importorskip("reportlab")
+
+    from tests.fixtures.create_test_pdfs import CARTEIRA_OAB_TEXT, render_pdf
+
+    pdf_file = tmp_path_factory.mktemp("real_pdfs") / "sample_oab.pdf"
+    pdf_file.write_bytes(render_pdf(CARTEIRA_OAB_TEXT))
+    return pdf_file
+
+
+class FakeCacheClient:
+    """
+    Dict-backed stand-in for CacheClient, without call recording.
+
+    Values are stored serialized, like in Redis, so callers mutating a
+    returned payload cannot change what the next get_json sees.
+    """
+
+    def __init__(self):
+        self.store: Dict[str, bytes] = {}
+
+    def get_json(self, key):
+        raw = self.store.get(key)
+        return orjson.loads(raw) if raw is not None else None
+
+    def set_json(self, key, obj, ttl_seconds=600):
+        self.store[key] = orjson.dumps(obj)
+        return True
+
+    def get_json_many(self, keys):
+        return [self.get_json(key) for key in keys]
+
+    def set_json_many(self, items, ttl_seconds=600):
+        for key, obj in items.items():
+            self.set_json(key, obj, ttl_seconds)
+        return True
+
+
+@pytest.fixture
+def fake_cache(monkeypatch):
+    """Back the pipeline's CacheClient with an empty FakeCacheClient."""
+    cache = FakeCacheClient()
+    monkeypatch.setattr("src.core.pipeline.CacheClient", lambda: cache)
+    return cache
+
+
+class _StubExtractor:
+    """Extractor returning a fixed document, without call recording."""
+
+    def __init__(self, document):
+        self._document = document
+
+    def load(self, pdf_path=None, pdf_bytes=None):
+        return self._document
+
+
+@pytest.fixture
+def pipeline_stubs(pipeline_mocks, sample_extracted_document):
+    """
+    Swap the cache and extractor in pipeline_mocks for plain stubs.
+
+    For tests that never assert on those calls (e.g. batches that hit them
+    once per item), so MagicMock bookkeeping is skipped.
+    """
+    pipeline_mocks.cache = FakeCacheClient()
+    pipeline_mocks.cache_class.return_value = pipeline_mocks.cache
+    pipeline_mocks.extractor = _StubExtractor(sample_extracted_document)
+    pipeline_mocks.extractor_class.return_value = pipeline_mocks.extractor
+    return pipeline_mocks
+
+
 @pytest.fixture
 def temp_test_dir(tmp_path):
     """Create a temporary directory for test files."""
@@ -156,66 +358,106 @@ def temp_test_dir(tmp_path):
     return test_dir
 
 
-@pytest.fixture
-def mock_settings(monkeypatch):
-    """Provide mock settings for tests."""
-    monkeypatch.setenv("OPENAI_API_KEY", "test-key-12345")
-    monkeypatch.setenv("LLM_MODEL", "gpt-5-mini")
-    monkeypatch.setenv("REDIS_HOST", "localhost")
-    monkeypatch.setenv("REDIS_PORT", "6379")
-    monkeypatch.setenv("PDF_BASE_PATH", "/tmp/test_pdfs")
+@pytest.fixture(scope="session")
+def mock_settings():
+    """Provide mock settings for tests (env is patched and parsed once per session)."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("OPENAI_API_KEY", "test-key-12345")
+        mp.setenv("LLM_MODEL", "gpt-5-mini")
+        mp.setenv("REDIS_HOST", "localhost")
+        mp.setenv("REDIS_PORT", "6379")
+        mp.setenv("PDF_BASE_PATH", "/tmp/test_pdfs")
+
+        # Force settings reload
+        get_settings.cache_clear()
 
-    # Force settings reload
-    from src.config.settings import get_settings
+        yield get_settings()
 
     get_settings.cache_clear()
 
-    return get_settings()
+
+@pytest.fixture(scope="module")
+def extractor():
+    """Provide one stateless PdfExtractor shared by a test module."""
+    from src.core.extractor import PdfExtractor
+
+    return PdfExtractor()
 
 
 @pytest.fixture
 def mock_pdfplumber_page():
-    """Provide a mock pdfplumber page object."""
-    mock_page = MagicMock()
-    mock_page.width = 595.0  # A4 width in points
-    mock_page.height = 842.0  # A4 height in points
+    """Provide a lightweight stub of a pdfplumber page object."""
+    # First line of the sample words ("JOÃO DA SILVA")
+    words = list(_SAMPLE_WORDS[:3])
+
+    return SimpleNamespace(
+        width=595.0,  # A4 width in points
+        height=842.0,  # A4 height in points
+        extract_words=lambda **_: words,
+        find_tables=lambda **_: [],  # No tables detected
+    )
 
-    # Sample words with bbox data
-    mock_page.extract_words.return_value = [
-        {
-            "text": "JOÃO",
-            "x0": 100.0,
-            "top": 50.0,
-            "x1": 150.0,
-            "bottom": 70.0,
-        },
-        {
-            "text": "DA",
-            "x0": 155.0,
-            "top": 50.0,
-            "x1": 175.0,
-            "bottom": 70.0,
-        },
-        {
-            "text": "SILVA",
-            "x0": 180.0,
-            "top": 50.0,
-            "x1": 230.0,
-            "bottom": 70.0,
-        },
-    ]
 
-    # Mock table detection
-    mock_page.find_tables.return_value = []
+class _FakePdf:
+    """Minimal pdfplumber PDF: a page list usable as a context manager."""
 
-    return mock_page
+    def __init__(self, pages):
+        self.pages = pages
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
 
 
 @pytest.fixture
 def mock_pdfplumber_pdf(mock_pdfplumber_page):
-    """Provide a mock pdfplumber PDF object."""
-    mock_pdf = MagicMock()
-    mock_pdf.pages = [mock_pdfplumber_page]
-    mock_pdf.__enter__ = MagicMock(return_value=mock_pdf)
-    mock_pdf.__exit__ = MagicMock(return_value=False)
-    return mock_pdf
+    """Provide a lightweight stand-in for a pdfplumber PDF object."""
+    return _FakePdf([mock_pdfplumber_page])
+
+
+@pytest.fixture
+def fake_pdfplumber(monkeypatch, mock_pdfplumber_pdf):
+    """
+    Point the extractor at a stand-in pdfplumber whose open() returns
+    mock_pdfplumber_pdf; tests mutate its pages instead of patching open().
+    """
+    fake = SimpleNamespace(open=lambda *args, **kwargs: mock_pdfplumber_pdf)
+    monkeypatch.setattr("src.core.extractor.pdfplumber", fake)
+    return fake
+
+
+class _FakeFitzDocument:
+    """Minimal PyMuPDF document: indexable pages, usable as a context manager."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.page_count = len(pages)
+
+    def __getitem__(self, index):
+        return self.pages[index]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+@pytest.fixture
+def mock_fitz_module(monkeypatch):
+    """Install a stand-in `fitz` module whose PDFs hold the sample first line."""
+    page = SimpleNamespace(
+        rect=SimpleNamespace(width=595.0, height=842.0),
+        get_text=lambda kind: [
+            (w["x0"], w["top"], w["x1"], w["bottom"], w["text"], 0, 0, i)
+            for i, w in enumerate(_SAMPLE_WORDS[:3])
+        ],
+        find_tables=lambda: SimpleNamespace(tables=[]),
+    )
+    fitz = SimpleNamespace(
+        open=MagicMock(side_effect=lambda *a, **kw: _FakeFitzDocument([page]))
+    )
+    monkeypatch.setitem(sys.modules, "fitz", fitz)
+    return fitz
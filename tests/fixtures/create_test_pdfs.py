@@ -5,19 +5,34 @@ This script creates basic PDF files with text content for use in tests.
 Requires reportlab: pip install reportlab
 """
 
+import io
+from functools import lru_cache
 from pathlib import Path
 
-try:
+CARTEIRA_OAB_TEXT = """
+ORDEM DOS ADVOGADOS DO BRASIL
+CARTEIRA DE IDENTIDADE PROFISSIONAL
+
+Nome: JOÃO DA SILVA
+Inscrição: 123456
+Seccional: OAB/SP
+Categoria: ADVOGADO
+CPF: 123.456.789-00
+Data de Inscrição: 01/01/2020
+
+Situação: ATIVO
+""".strip()
+
+
+@lru_cache(maxsize=None)
+def render_pdf(text_content: str) -> bytes:
+    """Render text content to PDF bytes (memoized per content)."""
+    # Imported lazily so importing this module never pays reportlab's setup cost
     from reportlab.lib.pagesizes import A4
     from reportlab.pdfgen import canvas
-except ImportError:
-    print("reportlab not installed. Run: pip install reportlab")
-    exit(1)
 
-
-def create_simple_pdf(filepath: str, text_content: str):
-    """Create a simple PDF with text content."""
-    c = canvas.Canvas(filepath, pagesize=A4)
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
     width, height = A4
 
     # Add text at different positions
@@ -30,23 +45,20 @@ def create_simple_pdf(filepath: str, text_content: str):
             y_position -= 20
 
     c.save()
+    return buffer.getvalue()
 
 
-def create_carteira_oab_sample():
-    """Create a sample OAB card PDF."""
-    content = """
-ORDEM DOS ADVOGADOS DO BRASIL
-CARTEIRA DE IDENTIDADE PROFISSIONAL
+def create_simple_pdf(filepath: str, text_content: str):
+    """Create a simple PDF with text content, skipping files already generated."""
+    path = Path(filepath)
+    if path.exists() and path.stat().st_size > 0:
+        return
+    path.write_bytes(render_pdf(text_content))
 
-Nome: JOÃO DA SILVA
-Inscrição: 123456
-Seccional: OAB/SP
-Categoria: ADVOGADO
-CPF: 123.456.789-00
-Data de Inscrição: 01/01/2020
 
-Situação: ATIVO
-    """.strip()
+def create_carteira_oab_sample():
+    """Create a sample OAB card PDF."""
+    content = CARTEIRA_OAB_TEXT
 
     fixtures_dir = Path(__file__).parent
     filepath = fixtures_dir / "sample_oab.pdf"
@@ -109,13 +121,18 @@ def create_empty_pdf():
     fixtures_dir = Path(__file__).parent
     filepath = fixtures_dir / "empty_document.pdf"
 
-    c = canvas.Canvas(str(filepath), pagesize=A4)
     # Don't add any text
-    c.save()
+    create_simple_pdf(str(filepath), "")
     print(f"Created: {filepath}")
 
 
 if __name__ == "__main__":
+    try:
+        import reportlab  # noqa: F401
+    except ImportError:
+        print("reportlab not installed. Run: pip install reportlab")
+        exit(1)
+
     # Create fixtures directory if it doesn't exist
     fixtures_dir = Path(__file__).parent
     fixtures_dir.mkdir(exist_ok=True)
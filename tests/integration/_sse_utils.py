@@ -0,0 +1,24 @@
+"""
+Helpers for reading Server-Sent Events responses in integration tests.
+"""
+
+from typing import Any, AsyncIterator, Dict, List
+
+import orjson
+
+_DATA_PREFIX = "data: "
+
+
+async def aiter_sse(response) -> AsyncIterator[Dict[str, Any]]:
+    """Yield decoded ``data:`` events from a streaming response as they arrive."""
+    async for line in response.aiter_lines():
+        if line.startswith(_DATA_PREFIX):
+            yield orjson.loads(line[len(_DATA_PREFIX) :])
+
+
+async def post_sse(client, url: str, **kwargs) -> List[Dict[str, Any]]:
+    """POST to an SSE endpoint and collect its events without buffering the body."""
+    async with client.stream("POST", url, **kwargs) as response:
+        assert response.status_code == 200
+        assert "text/event-stream" in response.headers["content-type"]
+        return [event async for event in aiter_sse(response)]
@@ -4,11 +4,27 @@ Integration tests for FastAPI endpoints.
 Tests the /health and /extract endpoints with real HTTP requests.
 """
 
-from unittest.mock import MagicMock, patch
+import asyncio
+from unittest.mock import patch
 
+import orjson
 import pytest
 
-from src.core.extractor import ExtractedDocument
+from src.models.schema import ExtractionResult
+
+pytestmark = pytest.mark.asyncio
+
+
+# Request body shared by most /extract tests, serialized once.
+_PAYLOAD_BASIC = orjson.dumps(
+    {"label": "test", "extraction_schema": {"nome": "Nome"}, "pdf_path": "test.pdf"}
+)
+_JSON_HEADERS = {"content-type": "application/json"}
+
+
+def _json(response):
+    """Decode a response body with orjson (faster than httpx's stdlib json)."""
+    return orjson.loads(response.content)
 
 
 @pytest.mark.asyncio
@@ -20,7 +36,7 @@ class TestHealthEndpoint:
         response = await client.get("/health")
 
         assert response.status_code == 200
-        data = response.json()
+        data = _json(response)
         assert data["status"] == "ok"
         assert "environment" in data
 
@@ -29,7 +45,7 @@ class TestHealthEndpoint:
         response = await client.get("/health")
 
         assert response.status_code == 200
-        data = response.json()
+        data = _json(response)
         assert isinstance(data["environment"], str)
 
     async def test_health_endpoint_content_type(self, client):
@@ -39,422 +55,286 @@ class TestHealthEndpoint:
         assert response.status_code == 200
         assert "application/json" in response.headers["content-type"]
 
-
-@pytest.mark.asyncio
-class TestExtractEndpoint:
-    """Test cases for /extract endpoint."""
-
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    async def test_extract_endpoint_success(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        client,
-        tmp_path,
-    ):
-        """Test successful extraction through API endpoint."""
-        # Setup file mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        # Setup cache mock (cache miss)
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache.set_json.return_value = True
-        mock_cache_class.return_value = mock_cache
-
-        # Setup extractor mock
-        mock_doc = ExtractedDocument(
-            layout_text="[TOP-LEFT] JOÃO DA SILVA",
-            words=[],
-            meta={"source": str(test_file), "engine": "pdfplumber", "pages": 1},
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
-        # Setup LLM mock
-        mock_extract_fields.return_value = {
-            "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
-            "inscricao": {"value": "123456", "details": {"source": "openai"}},
-        }
-
-        # Make request
-        payload = {
-            "label": "carteira_oab",
-            "extraction_schema": {
-                "nome": "Nome do profissional",
-                "inscricao": "Número de inscrição",
-            },
-            "pdf_path": "test.pdf",
-        }
-
-        response = await client.post("/extract", json=payload)
+    async def test_health_endpoint_not_compressed(self, client):
+        """Test small health responses skip gzip compression."""
+        response = await client.get("/health", headers={"Accept-Encoding": "gzip"})
 
         assert response.status_code == 200
-        data = response.json()
-        assert data["label"] == "carteira_oab"
-        assert data["fields"]["nome"] == "JOÃO DA SILVA"
-        assert data["fields"]["inscricao"] == "123456"
-        assert "meta" in data
-
-    async def test_extract_endpoint_missing_fields(self, client):
-        """Test extraction endpoint with missing required fields."""
-        payload = {
-            "label": "test",
-            # Missing extraction_schema and pdf_path
-        }
+        assert "content-encoding" not in response.headers
 
-        response = await client.post("/extract", json=payload)
 
-        assert response.status_code == 422  # Validation error
+# /extract endpoint: plain functions (no class state) so xdist can spread them.
 
-    async def test_extract_endpoint_invalid_json(self, client):
-        """Test extraction endpoint with invalid JSON."""
-        response = await client.post(
-            "/extract",
-            content="not valid json {",
-            headers={"content-type": "application/json"},
-        )
-
-        assert response.status_code == 422
-
-    @patch("src.core.pipeline.resolve_pdf_path")
-    async def test_extract_endpoint_file_not_found(self, mock_resolve, client):
-        """Test extraction endpoint with non-existent PDF file."""
-        mock_resolve.side_effect = FileNotFoundError("PDF not found")
-
-        payload = {
-            "label": "test",
-            "extraction_schema": {"nome": "Nome"},
-            "pdf_path": "/nonexistent/file.pdf",
-        }
-
-        response = await client.post("/extract", json=payload)
-
-        assert response.status_code == 404
-        assert "not found" in response.json()["detail"].lower()
-
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    async def test_extract_endpoint_with_cache_hit(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_cache_class,
-        client,
-        tmp_path,
-    ):
-        """Test extraction endpoint returns cached result."""
-        # Setup file mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        # Setup cache mock (cache hit)
-        cached_result = {
-            "label": "carteira_oab",
-            "fields": {"nome": "CACHED VALUE"},
-            "meta": {"cache_hit": False},
-        }
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = cached_result
-        mock_cache_class.return_value = mock_cache
-
-        payload = {
-            "label": "carteira_oab",
-            "extraction_schema": {"nome": "Nome"},
-            "pdf_path": "test.pdf",
-        }
-
-        response = await client.post("/extract", json=payload)
-
-        assert response.status_code == 200
-        data = response.json()
-        assert data["fields"]["nome"] == "CACHED VALUE"
-        assert data["meta"]["cache_hit"] is True
-
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    async def test_extract_endpoint_use_cache_false(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        client,
-        tmp_path,
-    ):
-        """Test extraction endpoint with use_cache=false query parameter."""
-        # Setup file mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        # Setup cache mock
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = {"cached": "data"}
-        mock_cache_class.return_value = mock_cache
-
-        # Setup extractor mock
-        mock_doc = ExtractedDocument(
-            layout_text="test",
-            words=[],
-            meta={"source": str(test_file), "pages": 1},
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
-        # Setup LLM mock
-        mock_extract_fields.return_value = {
-            "nome": {"value": "FRESH DATA", "details": {"source": "openai"}},
-        }
-
-        payload = {
-            "label": "test",
-            "extraction_schema": {"nome": "Nome"},
-            "pdf_path": "test.pdf",
-        }
 
-        response = await client.post("/extract?use_cache=false", json=payload)
-
-        assert response.status_code == 200
-        data = response.json()
-        assert data["fields"]["nome"] == "FRESH DATA"
-        # Cache check should not have been called
-        mock_cache.get_json.assert_not_called()
-
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    async def test_extract_endpoint_multiple_fields(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        client,
-        tmp_path,
-    ):
-        """Test extraction endpoint with multiple fields."""
-        # Setup mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
-        mock_doc = ExtractedDocument(
-            layout_text="test",
-            words=[],
-            meta={"source": str(test_file), "pages": 1},
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
-        mock_extract_fields.return_value = {
-            "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
-            "inscricao": {"value": "123456", "details": {"source": "openai"}},
-            "categoria": {"value": "ADVOGADO", "details": {"source": "openai"}},
-            "situacao": {"value": "ATIVO", "details": {"source": "openai"}},
-        }
-
-        payload = {
-            "label": "carteira_oab",
-            "extraction_schema": {
+@pytest.mark.parametrize(
+    "label, extraction_schema, llm_results, expected_fields",
+    [
+        pytest.param(
+            "carteira_oab",
+            {"nome": "Nome do profissional", "inscricao": "Número de inscrição"},
+            {
+                "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
+                "inscricao": {"value": "123456", "details": {"source": "openai"}},
+            },
+            {"nome": "JOÃO DA SILVA", "inscricao": "123456"},
+            id="success",
+        ),
+        pytest.param(
+            "carteira_oab",
+            {
                 "nome": "Nome",
                 "inscricao": "Inscrição",
                 "categoria": "Categoria",
                 "situacao": "Situação",
             },
-            "pdf_path": "test.pdf",
-        }
-
-        response = await client.post("/extract", json=payload)
-
-        assert response.status_code == 200
-        data = response.json()
-        assert len(data["fields"]) == 4
-        assert data["fields"]["nome"] == "JOÃO DA SILVA"
-        assert data["fields"]["categoria"] == "ADVOGADO"
-
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    async def test_extract_endpoint_with_none_values(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        client,
-        tmp_path,
-    ):
-        """Test extraction endpoint with some fields returning None."""
-        # Setup mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
-        mock_doc = ExtractedDocument(
-            layout_text="test",
-            words=[],
-            meta={"source": str(test_file), "pages": 1},
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
-        mock_extract_fields.return_value = {
-            "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
-            "inscricao": {"value": None, "details": {"source": "openai"}},
-        }
-
-        payload = {
-            "label": "test",
-            "extraction_schema": {
-                "nome": "Nome",
-                "inscricao": "Inscrição",
+            {
+                "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
+                "inscricao": {"value": "123456", "details": {"source": "openai"}},
+                "categoria": {"value": "ADVOGADO", "details": {"source": "openai"}},
+                "situacao": {"value": "ATIVO", "details": {"source": "openai"}},
+            },
+            {
+                "nome": "JOÃO DA SILVA",
+                "inscricao": "123456",
+                "categoria": "ADVOGADO",
+                "situacao": "ATIVO",
             },
-            "pdf_path": "test.pdf",
-        }
+            id="multiple_fields",
+        ),
+        pytest.param(
+            "test",
+            {"nome": "Nome", "inscricao": "Inscrição"},
+            {
+                "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
+                "inscricao": {"value": None, "details": {"source": "openai"}},
+            },
+            {"nome": "JOÃO DA SILVA", "inscricao": None},
+            id="none_values",
+        ),
+    ],
+)
+async def test_extract_endpoint_success(
+    client,
+    pipeline_mocks,
+    label,
+    extraction_schema,
+    llm_results,
+    expected_fields,
+):
+    """Test successful extraction returns fields and metadata."""
+    pipeline_mocks.extract_fields_async.return_value = llm_results
+
+    payload = {
+        "label": label,
+        "extraction_schema": extraction_schema,
+        "pdf_path": "test.pdf",
+    }
+
+    response = await client.post("/extract", json=payload)
+
+    assert response.status_code == 200
+    data = _json(response)
+    assert data["label"] == label
+    assert data["fields"] == expected_fields
+    assert "timings_seconds" in data["meta"]
+    assert "cache_hit" in data["meta"]
+    assert "trace" in data["meta"]
+
+
+@pytest.mark.parametrize(
+    "request_kwargs, pipeline_error, expected_status, detail_fragment",
+    [
+        (
+            # Missing extraction_schema and pdf_path
+            {"json": {"label": "test"}},
+            None,
+            422,
+            None,
+        ),
+        (
+            {"content": "not valid json {", "headers": _JSON_HEADERS},
+            None,
+            422,
+            None,
+        ),
+        (
+            {"content": "not json", "headers": {"content-type": "text/plain"}},
+            None,
+            422,
+            None,
+        ),
+        (
+            {
+                "json": {
+                    "label": "test",
+                    "extraction_schema": {"nome": "Nome"},
+                    "pdf_path": "/nonexistent/file.pdf",
+                }
+            },
+            FileNotFoundError("PDF not found"),
+            404,
+            "not found",
+        ),
+        (
+            # Empty schema is technically valid, so the pipeline error decides
+            {
+                "json": {
+                    "label": "test",
+                    "extraction_schema": {},
+                    "pdf_path": "test.pdf",
+                }
+            },
+            FileNotFoundError("PDF not found"),
+            404,
+            "not found",
+        ),
+        (
+            {"content": _PAYLOAD_BASIC, "headers": _JSON_HEADERS},
+            Exception("Internal error"),
+            500,
+            "error",
+        ),
+    ],
+    ids=[
+        "missing_fields",
+        "invalid_json",
+        "content_type_not_json",
+        "file_not_found",
+        "empty_schema",
+        "internal_error",
+    ],
+)
+@patch("src.main.run_extraction_async")
+async def test_extract_endpoint_errors(
+    mock_run,
+    client,
+    request_kwargs,
+    pipeline_error,
+    expected_status,
+    detail_fragment,
+):
+    """Test /extract maps invalid requests and pipeline failures to HTTP errors."""
+    mock_run.side_effect = pipeline_error
+
+    response = await client.post("/extract", **request_kwargs)
+
+    assert response.status_code == expected_status
+    if detail_fragment is not None:
+        assert detail_fragment in _json(response)["detail"].lower()
+    if pipeline_error is None:
+        mock_run.assert_not_called()
+
+
+async def test_extract_endpoint_with_cache_hit(client, pipeline_mocks):
+    """Test extraction endpoint returns cached result."""
+    # Setup cache mock (cache hit)
+    pipeline_mocks.cache.get_json.return_value = {
+        "label": "carteira_oab",
+        "fields": {"nome": "CACHED VALUE"},
+        "meta": {"cache_hit": False},
+    }
+
+    payload = {
+        "label": "carteira_oab",
+        "extraction_schema": {"nome": "Nome"},
+        "pdf_path": "test.pdf",
+    }
+
+    response = await client.post("/extract", json=payload)
+
+    assert response.status_code == 200
+    data = _json(response)
+    assert data["fields"]["nome"] == "CACHED VALUE"
+    assert data["meta"]["cache_hit"] is True
+
+
+async def test_extract_endpoint_use_cache_false(client, pipeline_mocks):
+    """Test extraction endpoint with use_cache=false query parameter."""
+    pipeline_mocks.cache.get_json.return_value = {"cached": "data"}
+    pipeline_mocks.extract_fields_async.return_value = {
+        "nome": {"value": "FRESH DATA", "details": {"source": "openai"}},
+    }
+
+    response = await client.post(
+        "/extract?use_cache=false", content=_PAYLOAD_BASIC, headers=_JSON_HEADERS
+    )
+
+    assert response.status_code == 200
+    data = _json(response)
+    assert data["fields"]["nome"] == "FRESH DATA"
+    # Cache check should not have been called
+    pipeline_mocks.cache.get_json.assert_not_called()
+
+
+@patch("src.main.run_extraction_async")
+async def test_extract_endpoint_gzip_large_response(mock_run, client):
+    """Test large extraction responses are gzip-compressed."""
+    mock_run.return_value = ExtractionResult(
+        label="test",
+        fields={f"campo_{i}": "JOÃO DA SILVA" * 10 for i in range(20)},
+        meta={"cache_hit": False},
+    )
+
+    response = await client.post(
+        "/extract",
+        content=_PAYLOAD_BASIC,
+        headers={**_JSON_HEADERS, "Accept-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert _json(response)["fields"]["campo_0"] == "JOÃO DA SILVA" * 10
+
+
+@patch("src.main.run_extraction_async")
+async def test_extract_endpoint_timeout(mock_run, client, monkeypatch):
+    """Test extraction endpoint returns 504 when the pipeline is too slow."""
+    from src.main import settings
+
+    monkeypatch.setattr(settings, "extraction_timeout_seconds", 0.05)
+
+    async def slow_extraction(*args, **kwargs):
+        await asyncio.sleep(0.5)
+
+    mock_run.side_effect = slow_extraction
+
+    response = await client.post(
+        "/extract", content=_PAYLOAD_BASIC, headers=_JSON_HEADERS
+    )
+
+    assert response.status_code == 504
+    assert "timed out" in _json(response)["detail"].lower()
 
-        response = await client.post("/extract", json=payload)
 
-        assert response.status_code == 200
-        data = response.json()
-        assert data["fields"]["nome"] == "JOÃO DA SILVA"
-        assert data["fields"]["inscricao"] is None
-
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    async def test_extract_endpoint_returns_metadata(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        client,
-        tmp_path,
-    ):
-        """Test extraction endpoint includes metadata in response."""
-        # Setup mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
-        mock_doc = ExtractedDocument(
-            layout_text="test",
-            words=[],
-            meta={"source": str(test_file), "pages": 1, "engine": "pdfplumber"},
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
+@pytest.mark.asyncio
+class TestExtractUploadEndpoint:
+    """Test cases for /extract/upload endpoint."""
 
-        mock_extract_fields.return_value = {
-            "nome": {"value": "Test", "details": {"source": "openai"}},
-        }
+    async def test_extract_upload_invalid_schema_json(self, client):
+        """Test upload endpoint rejects malformed extraction_schema JSON."""
+        response = await client.post(
+            "/extract/upload",
+            files={"file": ("test.pdf", b"%PDF-1.4 fake", "application/pdf")},
+            data={"label": "test", "extraction_schema": "not valid json {"},
+        )
 
-        payload = {
-            "label": "test",
-            "extraction_schema": {"nome": "Nome"},
-            "pdf_path": "test.pdf",
-        }
+        assert response.status_code == 400
+        assert "invalid extraction_schema json" in _json(response)["detail"].lower()
 
-        response = await client.post("/extract", json=payload)
+    @patch("src.main.run_extraction_async")
+    async def test_extract_upload_success(self, mock_run, client):
+        """Test upload endpoint parses the schema and runs the pipeline."""
+        mock_run.return_value = ExtractionResult(
+            label="carteira_oab", fields={"nome": "JOÃO DA SILVA"}, meta={}
+        )
 
-        assert response.status_code == 200
-        data = response.json()
-        assert "meta" in data
-        assert "timings_seconds" in data["meta"]
-        assert "cache_hit" in data["meta"]
-        assert "trace" in data["meta"]
-
-    @patch("src.main.run_extraction")
-    async def test_extract_endpoint_internal_error(self, mock_run, client):
-        """Test extraction endpoint handles internal errors."""
-        # Mock run_extraction to raise a generic exception
-        mock_run.side_effect = Exception("Internal error")
-
-        payload = {
-            "label": "test",
-            "extraction_schema": {"nome": "Nome"},
-            "pdf_path": "test.pdf",
-        }
-
-        response = await client.post("/extract", json=payload)
-
-        assert response.status_code == 500
-        data = response.json()
-        assert "detail" in data
-        # Check that error message is included
-        assert "error" in data["detail"].lower() or "internal" in data["detail"].lower()
-
-    @patch("src.main.run_extraction")
-    async def test_extract_endpoint_empty_schema(self, mock_run, client):
-        """Test extraction endpoint with empty extraction schema."""
-        # Mock to avoid actual file operations
-        mock_run.side_effect = FileNotFoundError("PDF not found")
-
-        payload = {
-            "label": "test",
-            "extraction_schema": {},
-            "pdf_path": "test.pdf",
-        }
-
-        # Empty schema is technically valid, so we expect 404 (file not found)
-        response = await client.post("/extract", json=payload)
-
-        assert response.status_code == 404
-
-    async def test_extract_endpoint_content_type_json(self, client):
-        """Test that extract endpoint requires JSON content type."""
         response = await client.post(
-            "/extract",
-            content="not json",
-            headers={"content-type": "text/plain"},
+            "/extract/upload",
+            files={"file": ("test.pdf", b"%PDF-1.4 fake", "application/pdf")},
+            data={"label": "carteira_oab", "extraction_schema": '{"nome": "Nome"}'},
         )
 
-        assert response.status_code == 422
+        assert response.status_code == 200
+        assert _json(response)["fields"]["nome"] == "JOÃO DA SILVA"
+        request = mock_run.call_args[0][0]
+        assert request.extraction_schema == {"nome": "Nome"}
@@ -4,275 +4,144 @@ Integration tests for batch extraction endpoints.
 Tests the /extract/batch endpoint with real HTTP requests and streaming responses.
 """
 
-import asyncio
-import json
-from unittest.mock import MagicMock, patch
-
+import orjson
 import pytest
+from fastapi import HTTPException
+
+from src.config.settings import get_settings
+from src.main import extract_batch
+from tests.integration._sse_utils import post_sse
+
+# Label and values repeated across the OAB batch payloads and assertions
+_LABEL = "carteira_oab"
+_NOME = "JOÃO DA SILVA"
 
-from src.core.extractor import ExtractedDocument
+# Schema shared by every item in the OAB batch payloads (one dict, many items)
+_OAB_SCHEMA = {
+    "nome": "Nome do profissional",
+    "inscricao": "Número de inscrição",
+}
 
 
 @pytest.mark.asyncio
 class TestBatchExtractEndpoint:
     """Test cases for /extract/batch endpoint."""
 
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    async def test_batch_extract_success(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        client,
-        tmp_path,
+    @pytest.mark.parametrize(
+        "n_items, failing_indices",
+        [
+            pytest.param(2, (), id="success"),
+            pytest.param(2, (1,), id="partial_failure"),
+            pytest.param(3, (), id="parallel_processing"),
+        ],
+    )
+    @pytest.mark.usefixtures("pipeline_stubs")
+    async def test_batch_extract_streams_results(
+        self, client, fake_pdfs, pipeline_mocks, n_items, failing_indices
     ):
-        """Test successful batch extraction with multiple items."""
-        # Setup file mocks
-        test_file1 = tmp_path / "test1.pdf"
-        test_file2 = tmp_path / "test2.pdf"
-        test_file1.write_bytes(b"fake pdf 1")
-        test_file2.write_bytes(b"fake pdf 2")
+        """Test batch extraction streams one event per item plus a summary."""
+        # Setup file mocks - failing items point at files that do not exist
+        test_files = fake_pdfs[:n_items]
+        resolve_map = {f.name: f for f in test_files}
 
         def resolve_side_effect(path):
-            if "test1.pdf" in path:
-                return test_file1
-            return test_file2
+            if path not in resolve_map:
+                raise FileNotFoundError(f"File not found: {path}")
+            return resolve_map[path]
 
-        def load_side_effect(path):
-            if "test1.pdf" in str(path):
-                return b"fake pdf 1"
-            return b"fake pdf 2"
+        pipeline_mocks.resolve.side_effect = resolve_side_effect
 
-        mock_resolve.side_effect = resolve_side_effect
-        mock_load_bytes.side_effect = load_side_effect
-
-        # Setup cache mock (cache miss)
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache.set_json.return_value = True
-        mock_cache_class.return_value = mock_cache
-
-        # Setup extractor mock
-        mock_doc = ExtractedDocument(
-            layout_text="[TOP-LEFT] JOÃO DA SILVA",
-            words=[],
-            meta={"source": "test.pdf", "engine": "pdfplumber", "pages": 1},
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
-        # Setup LLM mock - different results for different PDFs
-        def extract_side_effect(*args, **kwargs):
-            # Simulate different extractions
-            return {
-                "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
-                "inscricao": {"value": "123456", "details": {"source": "openai"}},
-            }
-
-        mock_extract_fields.side_effect = extract_side_effect
+        # Setup LLM mock
+        pipeline_mocks.extract_fields.return_value = {
+            "nome": {"value": _NOME, "details": {"source": "openai"}},
+            "inscricao": {"value": "123456", "details": {"source": "openai"}},
+        }
 
         # Make batch request
         payload = [
             {
-                "label": "carteira_oab",
-                "extraction_schema": {
-                    "nome": "Nome do profissional",
-                    "inscricao": "Número de inscrição",
-                },
-                "pdf_path": "test1.pdf",
-            },
-            {
-                "label": "carteira_oab",
-                "extraction_schema": {
-                    "nome": "Nome do profissional",
-                    "inscricao": "Número de inscrição",
-                },
-                "pdf_path": "test2.pdf",
-            },
+                "label": _LABEL,
+                "extraction_schema": _OAB_SCHEMA,
+                "pdf_path": f"missing{i}.pdf" if i in failing_indices else f.name,
+            }
+            for i, f in enumerate(test_files)
         ]
 
-        response = await client.post("/extract/batch", json=payload)
-
-        # Verify streaming response
-        assert response.status_code == 200
-        assert "text/event-stream" in response.headers["content-type"]
-
-        # Parse SSE stream
-        content = response.text
-        events = []
-        for line in content.split("\n"):
-            if line.startswith("data: "):
-                data = json.loads(line[6:])  # Remove "data: " prefix
-                events.append(data)
-
-        # Should have 2 item results + 1 summary
-        assert len(events) == 3
+        # Consume the SSE stream: one result per item + 1 summary
+        events = await post_sse(client, "/extract/batch", json=payload)
+        assert len(events) == n_items + 1
 
         # Verify item results
         item_results = [e for e in events if "index" in e]
-        assert len(item_results) == 2
-        assert all(r["status"] == "completed" for r in item_results)
-        assert all(r["label"] == "carteira_oab" for r in item_results)
-        assert all("fields" in r for r in item_results)
+        success = [r for r in item_results if r["status"] == "completed"]
+        errors = [r for r in item_results if r["status"] == "error"]
+
+        assert len(success) == n_items - len(failing_indices)
+        assert all(r["label"] == _LABEL for r in success)
+        assert all("fields" in r for r in success)
+        assert sorted(r["index"] for r in errors) == sorted(failing_indices)
+        assert all("error" in r for r in errors)
 
         # Verify summary
-        summary = [e for e in events if e.get("status") == "done"][0]
-        assert summary["total"] == 2
-        assert summary["successful"] == 2
-        assert summary["failed"] == 0
+        summary = events[-1]
+        assert summary["status"] == "done"
+        assert summary["total"] == n_items
+        assert summary["successful"] == n_items - len(failing_indices)
+        assert summary["failed"] == len(failing_indices)
 
-    async def test_batch_extract_empty_list(self, client):
+    async def test_batch_extract_empty_list(self):
         """Test batch extraction with empty list returns 400."""
-        response = await client.post("/extract/batch", json=[])
+        with pytest.raises(HTTPException) as exc_info:
+            await extract_batch(items=[], use_cache=True)
 
-        assert response.status_code == 400
-        data = response.json()
-        assert "empty" in data["detail"].lower()
+        assert exc_info.value.status_code == 400
+        assert "empty" in exc_info.value.detail.lower()
 
-    @pytest.mark.skip(reason="Skipping because creating 100001 items is too slow for tests")
     async def test_batch_extract_exceeds_max_size(self, client):
         """Test batch extraction exceeding max size returns 413."""
-        from src.config.settings import get_settings
-
-        settings = get_settings()
-        max_size = settings.max_batch_size
+        max_size = get_settings().max_batch_size
 
-        # Create a batch larger than max_batch_size
-        payload = [
-            {
-                "label": "test",
-                "extraction_schema": {"field": "desc"},
-                "pdf_path": f"test_{i}.pdf",
-            }
-            for i in range(max_size + 1)
-        ]
-
-        response = await client.post("/extract/batch", json=payload)
+        item = (
+            b'{"label":"test","extraction_schema":{"field":"desc"},"pdf_path":"t.pdf"}'
+        )
+        chunk_items = 10_000
+
+        # Stream a JSON array one item larger than max_batch_size in fixed-size
+        # chunks instead of building the list of dicts on the client side
+        async def oversized_batch():
+            remaining = max_size + 1
+            yield b"[" + item
+            remaining -= 1
+            while remaining:
+                count = min(chunk_items, remaining)
+                yield (b"," + item) * count
+                remaining -= count
+            yield b"]"
+
+        response = await client.post(
+            "/extract/batch",
+            content=oversized_batch(),
+            headers={"content-type": "application/json"},
+        )
 
         assert response.status_code == 413
-        data = response.json()
+        data = orjson.loads(response.content)
         assert "exceeds maximum" in data["detail"]
 
-    async def test_batch_extract_invalid_item_format(self, client):
+    async def test_batch_extract_invalid_item_format(self):
         """Test batch extraction with invalid item format returns 400."""
-        payload = [
+        items = [
             {
                 "label": "test",
                 # Missing required fields
             }
         ]
 
-        response = await client.post("/extract/batch", json=payload)
+        with pytest.raises(HTTPException) as exc_info:
+            await extract_batch(items=items, use_cache=True)
 
-        assert response.status_code == 400
-        data = response.json()
-        assert "invalid" in data["detail"].lower()
-
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    async def test_batch_extract_partial_failure(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        client,
-        tmp_path,
-    ):
-        """Test batch extraction with some items failing."""
-        # Setup file mocks - second file will fail
-        test_file1 = tmp_path / "test1.pdf"
-        test_file1.write_bytes(b"fake pdf 1")
-
-        def resolve_side_effect(path):
-            if "test1.pdf" in path:
-                return test_file1
-            raise FileNotFoundError(f"File not found: {path}")
-
-        def load_side_effect(path):
-            if "test1.pdf" in str(path):
-                return b"fake pdf 1"
-            raise FileNotFoundError(f"File not found: {path}")
-
-        mock_resolve.side_effect = resolve_side_effect
-        mock_load_bytes.side_effect = load_side_effect
-
-        # Setup cache mock (cache miss)
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache.set_json.return_value = True
-        mock_cache_class.return_value = mock_cache
-
-        # Setup extractor mock
-        mock_doc = ExtractedDocument(
-            layout_text="[TOP-LEFT] JOÃO DA SILVA",
-            words=[],
-            meta={"source": "test.pdf", "engine": "pdfplumber", "pages": 1},
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
-        # Setup LLM mock
-        mock_extract_fields.return_value = {
-            "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
-        }
-
-        # Make batch request
-        payload = [
-            {
-                "label": "carteira_oab",
-                "extraction_schema": {"nome": "Nome do profissional"},
-                "pdf_path": "test1.pdf",
-            },
-            {
-                "label": "carteira_oab",
-                "extraction_schema": {"nome": "Nome do profissional"},
-                "pdf_path": "missing.pdf",
-            },
-        ]
-
-        response = await client.post("/extract/batch", json=payload)
-
-        # Verify streaming response
-        assert response.status_code == 200
-
-        # Parse SSE stream
-        content = response.text
-        events = []
-        for line in content.split("\n"):
-            if line.startswith("data: "):
-                data = json.loads(line[6:])
-                events.append(data)
-
-        # Should have 2 item results + 1 summary
-        assert len(events) == 3
-
-        # Verify one success and one failure
-        item_results = [e for e in events if "index" in e]
-        success = [r for r in item_results if r["status"] == "completed"]
-        errors = [r for r in item_results if r["status"] == "error"]
-
-        assert len(success) == 1
-        assert len(errors) == 1
-        assert "error" in errors[0]
-
-        # Verify summary
-        summary = [e for e in events if e.get("status") == "done"][0]
-        assert summary["total"] == 2
-        assert summary["successful"] == 1
-        assert summary["failed"] == 1
+        assert exc_info.value.status_code == 400
+        assert "invalid" in exc_info.value.detail.lower()
 
     async def test_batch_extract_cache_enabled(self, client):
         """Test batch extraction respects use_cache parameter."""
@@ -293,86 +162,22 @@ class TestBatchExtractEndpoint:
         response = await client.post("/extract/batch?use_cache=false", json=payload)
         assert response.status_code == 200
 
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    async def test_batch_extract_parallel_processing(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        client,
-        tmp_path,
+    @pytest.mark.usefixtures("pipeline_stubs")
+    async def test_batch_extract_deduplicates_identical_items(
+        self, client, pipeline_mocks
     ):
-        """Test that batch processing runs in parallel (items complete out of order)."""
-        # Setup file mocks
-        test_files = []
-        for i in range(3):
-            f = tmp_path / f"test{i}.pdf"
-            f.write_bytes(f"fake pdf {i}".encode())
-            test_files.append(f)
-
-        mock_resolve.side_effect = lambda p: test_files[int(p.split("test")[1][0])]
-        mock_load_bytes.side_effect = lambda p: f"fake pdf {p}".encode()
-
-        # Setup cache mock (cache miss)
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache.set_json.return_value = True
-        mock_cache_class.return_value = mock_cache
-
-        # Setup extractor mock
-        mock_doc = ExtractedDocument(
-            layout_text="[TOP-LEFT] TEST",
-            words=[],
-            meta={"source": "test.pdf", "engine": "pdfplumber", "pages": 1},
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
-        # Setup LLM mock with varying delays (simulated via async)
-        mock_extract_fields.return_value = {
-            "field": {"value": "TEST", "details": {"source": "openai"}},
+        """Test identical batch items share a single extraction."""
+        pipeline_mocks.extract_fields.return_value = {
+            "nome": {"value": _NOME, "details": {"source": "openai"}},
         }
 
-        # Make batch request with 3 items
-        payload = [
-            {
-                "label": "test",
-                "extraction_schema": {"field": "desc"},
-                "pdf_path": f"test{i}.pdf",
-            }
-            for i in range(3)
-        ]
-
-        response = await client.post("/extract/batch", json=payload)
-
-        # Verify streaming response
-        assert response.status_code == 200
-
-        # Parse SSE stream
-        content = response.text
-        events = []
-        for line in content.split("\n"):
-            if line.startswith("data: "):
-                data = json.loads(line[6:])
-                events.append(data)
-
-        # Should have 3 item results + 1 summary
-        assert len(events) == 4
-
-        # Verify all items completed
+        item = {
+            "label": _LABEL,
+            "extraction_schema": _OAB_SCHEMA,
+            "pdf_path": "test.pdf",
+        }
+        events = await post_sse(client, "/extract/batch", json=[item, item, item])
         item_results = [e for e in events if "index" in e]
-        assert len(item_results) == 3
-        assert all(r["status"] == "completed" for r in item_results)
-
-        # Verify summary
-        summary = [e for e in events if e.get("status") == "done"][0]
-        assert summary["total"] == 3
-        assert summary["successful"] == 3
-        assert summary["failed"] == 0
+        assert sorted(r["index"] for r in item_results) == [0, 1, 2]
+        assert all(r["fields"]["nome"] == _NOME for r in item_results)
+        pipeline_mocks.extract_fields.assert_called_once()
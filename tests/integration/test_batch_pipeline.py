@@ -0,0 +1,213 @@
+"""
+Integration tests for the OpenAI Batch API pipeline.
+
+Tests submission and collection of batch jobs with a mocked OpenAI client.
+"""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from openai import OpenAI
+
+from src.core.batch_pipeline import (
+    BATCH_ENDPOINT,
+    BATCH_LAYOUT_TTL_SECONDS,
+    COMPLETION_WINDOW,
+    SubmittedBatch,
+    poll_batch,
+    submit_batch,
+)
+from src.models.schema import ExtractionRequest
+
+_SCHEMA = {"nome": "Nome do profissional"}
+
+
+def _output_line(custom_id, fields=None, status_code=200):
+    """Build one line of a batch output file as OpenAI returns it."""
+    body = {
+        "output": [
+            {
+                "type": "message",
+                "content": [{"type": "output_text", "text": json.dumps(fields)}],
+            }
+        ],
+        "usage": {"total_tokens": 42},
+    }
+    return json.dumps(
+        {
+            "id": f"batch_req_{custom_id}",
+            "custom_id": custom_id,
+            "response": {"status_code": status_code, "body": body},
+            "error": None,
+        }
+    )
+
+
+@pytest.fixture
+def batch_mocks(pipeline_mocks):
+    """Pipeline mocks plus a mocked OpenAI client for the batch module."""
+    with (
+        patch("src.core.batch_pipeline.CacheClient", pipeline_mocks.cache_class),
+        patch("src.core.llm_orchestrator.TIKTOKEN_AVAILABLE", False),
+    ):
+        client = MagicMock(spec=OpenAI)
+        client.files.create.return_value = SimpleNamespace(id="file-in")
+        client.batches.create.return_value = SimpleNamespace(id="batch-1")
+        pipeline_mocks.openai = client
+        pipeline_mocks.cache.get_json_many.side_effect = lambda keys: [None] * len(keys)
+        yield pipeline_mocks
+
+
+def _requests(*labels):
+    return [
+        ExtractionRequest(label=label, extraction_schema=_SCHEMA, pdf_path="test.pdf")
+        for label in labels
+    ]
+
+
+class TestBatchPipeline:
+    """Integration tests for submit_batch/poll_batch."""
+
+    def test_submit_batch_uploads_one_line_per_unique_request(self, batch_mocks):
+        """Test submission uploads a JSONL line per cache key and creates a batch."""
+        submitted = submit_batch(_requests("a", "b", "a"), client=batch_mocks.openai)
+
+        assert submitted.batch_id == "batch-1"
+        assert len(submitted.custom_ids) == 3
+        assert submitted.custom_ids[0] == submitted.custom_ids[2]
+
+        upload = batch_mocks.openai.files.create.call_args.kwargs
+        assert upload["purpose"] == "batch"
+        _, content = upload["file"]
+        lines = [json.loads(line) for line in content.decode().splitlines()]
+        assert [line["custom_id"] for line in lines] == submitted.custom_ids[:2]
+        assert all(line["url"] == BATCH_ENDPOINT for line in lines)
+        assert lines[0]["body"]["text"]["format"]["schema"]["required"] == ["nome"]
+
+        batch_mocks.openai.batches.create.assert_called_once_with(
+            input_file_id="file-in",
+            endpoint=BATCH_ENDPOINT,
+            completion_window=COMPLETION_WINDOW,
+        )
+        batch_mocks.extract_fields.assert_not_called()
+
+    def test_submit_batch_all_cached_skips_upload(self, batch_mocks):
+        """Test fully cached batches are answered without calling OpenAI."""
+        batch_mocks.cache.get_json_many.side_effect = None
+        batch_mocks.cache.get_json_many.return_value = [
+            {"label": "a", "fields": {"nome": "CACHED"}, "meta": {}}
+        ]
+
+        submitted = submit_batch(_requests("a"), client=batch_mocks.openai)
+        results = poll_batch(submitted, client=batch_mocks.openai)
+
+        assert submitted.batch_id is None
+        batch_mocks.openai.files.create.assert_not_called()
+        assert results[submitted.custom_ids[0]].fields["nome"] == "CACHED"
+        assert results[submitted.custom_ids[0]].meta["cache_hit"] is True
+
+    def test_poll_batch_in_progress_returns_none(self, batch_mocks):
+        """Test polling an unfinished batch returns None."""
+        submitted = submit_batch(_requests("a"), client=batch_mocks.openai)
+        batch_mocks.openai.batches.retrieve.return_value = SimpleNamespace(
+            id="batch-1", status="in_progress"
+        )
+
+        assert poll_batch(submitted, client=batch_mocks.openai) is None
+        batch_mocks.openai.files.content.assert_not_called()
+
+    def test_poll_batch_completed_assembles_and_caches(self, batch_mocks):
+        """Test completed batches produce results and cache only successes."""
+        submitted = submit_batch(_requests("ok", "failed"), client=batch_mocks.openai)
+        ok_id, failed_id = submitted.custom_ids
+        batch_mocks.openai.batches.retrieve.return_value = SimpleNamespace(
+            id="batch-1",
+            status="completed",
+            output_file_id="file-out",
+            error_file_id="file-err",
+            created_at=100,
+            completed_at=160,
+        )
+        files = {
+            "file-out": _output_line(ok_id, {"nome": " JOÃO DA SILVA "}),
+            "file-err": _output_line(failed_id, status_code=500),
+        }
+        batch_mocks.openai.files.content.side_effect = lambda file_id: MagicMock(
+            text=files[file_id]
+        )
+
+        results = poll_batch(submitted, client=batch_mocks.openai)
+
+        assert results[ok_id].fields["nome"] == "JOÃO DA SILVA"
+        assert results[ok_id].meta["batch_id"] == "batch-1"
+        assert results[ok_id].meta["timings_seconds"]["llm"] == 60.0
+        assert results[failed_id].fields["nome"] is None
+        assert results[failed_id].meta["trace"]["unresolved"] == ["nome"]
+        batch_mocks.cache.set_json_many.assert_called_once()
+        assert list(batch_mocks.cache.set_json_many.call_args[0][0]) == [ok_id]
+
+    def test_poll_batch_accepts_handle_from_another_process(self, batch_mocks):
+        """Test a JSON round-tripped handle is polled from the layout cache."""
+        submitted = submit_batch(_requests("a"), client=batch_mocks.openai)
+        (custom_id,) = submitted.custom_ids
+        layout_key, layout = batch_mocks.cache.set_json.call_args[0][:2]
+        batch_mocks.cache.get_json.side_effect = {layout_key: layout}.get
+        batch_mocks.extractor.load.reset_mock()
+
+        restored = SubmittedBatch.from_dict(json.loads(json.dumps(submitted.to_dict())))
+        batch_mocks.openai.batches.retrieve.return_value = SimpleNamespace(
+            id="batch-1",
+            status="completed",
+            output_file_id="file-out",
+            error_file_id=None,
+            created_at=100,
+            completed_at=160,
+        )
+        batch_mocks.openai.files.content.return_value = MagicMock(
+            text=_output_line(custom_id, {"nome": "JOÃO"})
+        )
+
+        results = poll_batch(restored, client=batch_mocks.openai)
+
+        assert results[custom_id].fields["nome"] == "JOÃO"
+        assert results[custom_id].meta["doc_meta"]["engine"] == "pdfplumber"
+        batch_mocks.extractor.load.assert_not_called()
+
+    def test_submit_batch_layouts_outlive_completion_window(self, batch_mocks):
+        """Test submitted layouts are cached for longer than the batch may run."""
+        submit_batch(_requests("a"), client=batch_mocks.openai)
+
+        ttl_seconds = batch_mocks.cache.set_json.call_args.kwargs["ttl_seconds"]
+        assert ttl_seconds == BATCH_LAYOUT_TTL_SECONDS
+        assert ttl_seconds > int(COMPLETION_WINDOW.rstrip("h")) * 3600
+
+    def test_poll_batch_fails_uploads_with_expired_layout(self, batch_mocks):
+        """Test uploaded bytes whose layout expired are failed, not cached."""
+        request = ExtractionRequest(
+            label="a", extraction_schema=_SCHEMA, pdf_bytes=b"%PDF-1.4 upload"
+        )
+        submitted = submit_batch([request], client=batch_mocks.openai)
+        (custom_id,) = submitted.custom_ids
+        # The layout cache is empty at poll time and the bytes are gone
+        batch_mocks.extractor.load.side_effect = ValueError(
+            "Either pdf_path or pdf_bytes must be provided"
+        )
+        batch_mocks.openai.batches.retrieve.return_value = SimpleNamespace(
+            id="batch-1",
+            status="completed",
+            output_file_id="file-out",
+            error_file_id=None,
+            created_at=100,
+            completed_at=160,
+        )
+        batch_mocks.openai.files.content.return_value = MagicMock(
+            text=_output_line(custom_id, {"nome": "JOÃO"})
+        )
+
+        results = poll_batch(submitted, client=batch_mocks.openai)
+
+        assert results[custom_id].fields["nome"] is None
+        assert results[custom_id].meta["trace"]["unresolved"] == ["nome"]
+        batch_mocks.cache.set_json_many.assert_not_called()
@@ -4,26 +4,32 @@ Integration tests for the full extraction pipeline.
 Tests end-to-end extraction flow with real components (minus external APIs).
 """
 
-from unittest.mock import MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from src.core.pipeline import run_extraction
+from src.config.settings import get_settings
+from src.core import llm_orchestrator
+from src.core.pipeline import (
+    run_extraction,
+    run_extraction_batch,
+    run_extraction_marshaled,
+)
 from src.models.schema import ExtractionRequest
 
 
 class TestPipelineIntegration:
     """Integration tests for complete extraction pipeline."""
 
-    @patch("src.core.pipeline.CacheClient")
     @patch("src.core.pipeline.llm_orchestrator.extract_fields")
     @patch("src.core.extractor.pdfplumber.open")
     def test_full_pipeline_without_cache(
         self,
         mock_pdfplumber,
         mock_extract_fields,
-        mock_cache_class,
         mock_pdfplumber_pdf,
+        fake_cache,
         tmp_path,
     ):
         """Test complete pipeline flow from PDF to result without cache."""
@@ -34,12 +40,6 @@ class TestPipelineIntegration:
         # Mock pdfplumber
         mock_pdfplumber.return_value = mock_pdfplumber_pdf
 
-        # Mock cache (miss)
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache.set_json.return_value = True
-        mock_cache_class.return_value = mock_cache
-
         # Mock LLM extraction
         mock_extract_fields.return_value = {
             "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
@@ -68,7 +68,7 @@ class TestPipelineIntegration:
         # Verify pipeline stages executed
         mock_pdfplumber.assert_called_once()
         mock_extract_fields.assert_called_once()
-        mock_cache.set_json.assert_called_once()
+        assert len(fake_cache.store) == 2  # Layout + result
 
     @patch("src.core.pipeline.CacheClient")
     @patch("src.core.pipeline.llm_orchestrator.extract_fields")
@@ -123,18 +123,149 @@ class TestPipelineIntegration:
         mock_pdfplumber.assert_not_called()
         mock_extract_fields.assert_not_called()
 
-    @patch("src.core.pipeline.CacheClient")
+    @patch("src.core.llm_orchestrator.TIKTOKEN_AVAILABLE", False)
+    @patch("src.core.llm_orchestrator.OpenAI")
+    @patch("src.core.extractor.pdfplumber.open")
+    def test_full_pipeline_marshaled_without_cache(
+        self,
+        mock_pdfplumber,
+        mock_openai_class,
+        mock_pdfplumber_pdf,
+        fake_cache,
+        tmp_path,
+    ):
+        """Test marshaled pipeline answers several PDFs with one LLM call."""
+        # Create real PDF files
+        test_files = []
+        for i in range(4):
+            test_file = tmp_path / f"test{i}.pdf"
+            test_file.write_bytes(f"fake pdf content {i}".encode())
+            test_files.append(test_file)
+
+        # Mock pdfplumber
+        mock_pdfplumber.return_value = mock_pdfplumber_pdf
+
+        # Mock one LLM response holding a result per document
+        mock_response = MagicMock()
+        mock_response.output_parsed = SimpleNamespace(
+            documents=[
+                SimpleNamespace(nome=f"NOME {i}", inscricao=f"{i}" * 6)
+                for i in range(4)
+            ]
+        )
+        mock_client = mock_openai_class.return_value
+        mock_client.responses.parse.return_value = mock_response
+
+        requests = [
+            ExtractionRequest(
+                label="carteira_oab",
+                extraction_schema={
+                    "nome": "Nome do profissional",
+                    "inscricao": "Número de inscrição",
+                },
+                pdf_path=str(test_file),
+            )
+            for test_file in test_files
+        ]
+
+        # Run pipeline
+        with patch.object(llm_orchestrator.settings, "openai_api_key", "test-key"):
+            results = run_extraction_marshaled(requests, use_cache=False)
+
+        # Verify each PDF got its own result, in order
+        assert [r.fields["nome"] for r in results] == [f"NOME {i}" for i in range(4)]
+        assert results[3].fields["inscricao"] == "333333"
+        assert len({r.meta["cache_key"] for r in results}) == 4
+
+        # Verify one LLM call covering all four layouts
+        mock_client.responses.parse.assert_called_once()
+        prompt_input = mock_client.responses.parse.call_args.kwargs["input"]
+        assert "DOC_4:" in prompt_input[1]["content"]
+        assert len(fake_cache.store) == 8  # Layout + result per PDF
+
+    @patch("src.core.llm_orchestrator.TIKTOKEN_AVAILABLE", False)
+    @patch("src.core.llm_orchestrator.OpenAI")
+    @patch("src.core.extractor.pdfplumber.open")
+    def test_marshaled_pipeline_does_not_cache_invalid_response(
+        self,
+        mock_pdfplumber,
+        mock_openai_class,
+        mock_pdfplumber_pdf,
+        fake_cache,
+        tmp_path,
+    ):
+        """Test a reply with too few documents is returned but not cached."""
+        requests = []
+        for i in range(3):
+            test_file = tmp_path / f"test{i}.pdf"
+            test_file.write_bytes(f"fake pdf content {i}".encode())
+            requests.append(
+                ExtractionRequest(
+                    label="test",
+                    extraction_schema={"nome": "Nome"},
+                    pdf_path=str(test_file),
+                )
+            )
+        mock_pdfplumber.return_value = mock_pdfplumber_pdf
+
+        # The model merged two documents: N-1 objects for N layouts
+        mock_response = MagicMock()
+        mock_response.output_parsed = SimpleNamespace(
+            documents=[SimpleNamespace(nome=f"NOME {i}") for i in range(2)]
+        )
+        mock_openai_class.return_value.responses.parse.return_value = mock_response
+
+        with patch.object(llm_orchestrator.settings, "openai_api_key", "test-key"):
+            results = run_extraction_marshaled(requests)
+
+        assert [r.fields["nome"] for r in results] == [None, None, None]
+        assert all(key.startswith("layout:") for key in fake_cache.store)
+
+    @patch("src.core.pipeline.llm_orchestrator.extract_fields_marshaled")
+    @patch("src.core.extractor.pdfplumber.open")
+    def test_marshaled_pipeline_dedupes_identical_requests(
+        self,
+        mock_pdfplumber,
+        mock_extract_fields_marshaled,
+        mock_pdfplumber_pdf,
+        fake_cache,
+        tmp_path,
+    ):
+        """Test identical requests share one prompt slot and one result."""
+        test_file = tmp_path / "test.pdf"
+        test_file.write_bytes(b"fake pdf content")
+        mock_pdfplumber.return_value = mock_pdfplumber_pdf
+        mock_extract_fields_marshaled.return_value = [
+            {"nome": {"value": "JOÃO", "details": {"source": "openai"}}},
+        ]
+
+        request = ExtractionRequest(
+            label="test", extraction_schema={"nome": "Nome"}, pdf_path=str(test_file)
+        )
+        results = run_extraction_marshaled([request, request], use_cache=False)
+
+        # One layout in the prompt, fanned back out to both indices
+        mock_pdfplumber.assert_called_once()
+        assert len(mock_extract_fields_marshaled.call_args.kwargs["doc_layouts"]) == 1
+        assert [r.fields["nome"] for r in results] == ["JOÃO", "JOÃO"]
+
+    @pytest.mark.parametrize("engine", ["pdfplumber", "pymupdf"])
     @patch("src.core.pipeline.llm_orchestrator.extract_fields")
     @patch("src.core.extractor.pdfplumber.open")
     def test_pipeline_with_real_extractor(
         self,
         mock_pdfplumber,
         mock_extract_fields,
-        mock_cache_class,
+        engine,
         mock_pdfplumber_pdf,
+        mock_fitz_module,
+        fake_cache,
+        monkeypatch,
         tmp_path,
     ):
-        """Test pipeline uses real PdfExtractor for document processing."""
+        """Test pipeline uses the configured real extractor for document processing."""
+        monkeypatch.setattr(get_settings(), "extractor_engine", engine)
+
         # Create real PDF file
         test_file = tmp_path / "test.pdf"
         test_file.write_bytes(b"fake pdf content")
@@ -142,11 +273,6 @@ class TestPipelineIntegration:
         # Mock pdfplumber to return words
         mock_pdfplumber.return_value = mock_pdfplumber_pdf
 
-        # Mock cache
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
         # Mock LLM
         mock_extract_fields.return_value = {
             "nome": {"value": "Test", "details": {"source": "openai"}},
@@ -159,28 +285,26 @@ class TestPipelineIntegration:
             pdf_path=str(test_file),
         )
 
-        # Run pipeline (should use real PdfExtractor)
+        # Run pipeline (should use the real extractor for the engine)
         result = run_extraction(request, use_cache=False)
 
         # Verify extractor was used
-        assert result.meta["doc_meta"]["engine"] == "pdfplumber"
+        assert result.meta["doc_meta"]["engine"] == engine
         assert result.meta["doc_meta"]["pages"] == 1
 
-        # Verify LLM received layout text
+        # Verify LLM received the same layout text from either engine
         call_args = mock_extract_fields.call_args
         doc_layout = call_args[1]["doc_layout"]
-        assert isinstance(doc_layout, str)
-        assert len(doc_layout) > 0
+        assert doc_layout == "[TOP-LEFT] [x:100-230, y:50] JOÃO DA SILVA"
 
-    @patch("src.core.pipeline.CacheClient")
     @patch("src.core.pipeline.llm_orchestrator.extract_fields")
     @patch("src.core.extractor.pdfplumber.open")
     def test_pipeline_timing_metadata(
         self,
         mock_pdfplumber,
         mock_extract_fields,
-        mock_cache_class,
         mock_pdfplumber_pdf,
+        fake_cache,
         tmp_path,
     ):
         """Test pipeline records accurate timing information."""
@@ -191,10 +315,6 @@ class TestPipelineIntegration:
         # Mock components
         mock_pdfplumber.return_value = mock_pdfplumber_pdf
 
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
         mock_extract_fields.return_value = {
             "nome": {"value": "Test", "details": {"source": "openai"}},
         }
@@ -223,15 +343,14 @@ class TestPipelineIntegration:
         # Total should be >= sum of stages
         assert timings["total"] >= timings["extract"] + timings["llm"]
 
-    @patch("src.core.pipeline.CacheClient")
     @patch("src.core.pipeline.llm_orchestrator.extract_fields")
     @patch("src.core.extractor.pdfplumber.open")
     def test_pipeline_trace_information(
         self,
         mock_pdfplumber,
         mock_extract_fields,
-        mock_cache_class,
         mock_pdfplumber_pdf,
+        fake_cache,
         tmp_path,
     ):
         """Test pipeline tracks which fields were resolved/unresolved."""
@@ -242,10 +361,6 @@ class TestPipelineIntegration:
         # Mock components
         mock_pdfplumber.return_value = mock_pdfplumber_pdf
 
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
         # LLM resolves some fields, not others
         mock_extract_fields.return_value = {
             "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
@@ -273,15 +388,14 @@ class TestPipelineIntegration:
         assert "inscricao" in trace["llm_resolved"]
         assert "categoria" in trace["unresolved"]
 
-    @patch("src.core.pipeline.CacheClient")
     @patch("src.core.pipeline.llm_orchestrator.extract_fields")
     @patch("src.core.extractor.pdfplumber.open")
     def test_pipeline_cache_key_generation(
         self,
         mock_pdfplumber,
         mock_extract_fields,
-        mock_cache_class,
         mock_pdfplumber_pdf,
+        fake_cache,
         tmp_path,
     ):
         """Test pipeline generates consistent cache keys."""
@@ -292,11 +406,6 @@ class TestPipelineIntegration:
         # Mock components
         mock_pdfplumber.return_value = mock_pdfplumber_pdf
 
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache.set_json.return_value = True
-        mock_cache_class.return_value = mock_cache
-
         mock_extract_fields.return_value = {
             "nome": {"value": "Test", "details": {"source": "openai"}},
         }
@@ -315,15 +424,14 @@ class TestPipelineIntegration:
         # Cache keys should be identical
         assert result1.meta["cache_key"] == result2.meta["cache_key"]
 
-    @patch("src.core.pipeline.CacheClient")
     @patch("src.core.pipeline.llm_orchestrator.extract_fields")
     @patch("src.core.extractor.pdfplumber.open")
     def test_pipeline_different_schemas_different_cache_keys(
         self,
         mock_pdfplumber,
         mock_extract_fields,
-        mock_cache_class,
         mock_pdfplumber_pdf,
+        fake_cache,
         tmp_path,
     ):
         """Test different extraction schemas generate different cache keys."""
@@ -334,10 +442,6 @@ class TestPipelineIntegration:
         # Mock components
         mock_pdfplumber.return_value = mock_pdfplumber_pdf
 
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
         mock_extract_fields.return_value = {
             "field": {"value": "value", "details": {"source": "openai"}},
         }
@@ -361,15 +465,126 @@ class TestPipelineIntegration:
         # Cache keys should be different
         assert result1.meta["cache_key"] != result2.meta["cache_key"]
 
-    @patch("src.core.pipeline.CacheClient")
+    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
+    @patch("src.core.extractor.pdfplumber.open")
+    def test_pipeline_reuses_layout_across_schemas(
+        self,
+        mock_pdfplumber,
+        mock_extract_fields,
+        mock_pdfplumber_pdf,
+        fake_cache,
+        tmp_path,
+    ):
+        """Test the same PDF is only parsed once for different schemas."""
+        # Create real PDF file
+        test_file = tmp_path / "test.pdf"
+        test_file.write_bytes(b"fake pdf content")
+
+        # Mock components
+        mock_pdfplumber.return_value = mock_pdfplumber_pdf
+
+        mock_extract_fields.return_value = {
+            "field": {"value": "value", "details": {"source": "openai"}},
+        }
+
+        # Same PDF, two schemas
+        for schema in ({"nome": "Nome"}, {"inscricao": "Inscrição"}):
+            request = ExtractionRequest(
+                label="test",
+                extraction_schema=schema,
+                pdf_path=str(test_file),
+            )
+            result = run_extraction(request, use_cache=True)
+            assert result.meta["doc_meta"]["engine"] == "pdfplumber"
+
+        # PDF parsed once, LLM called for each schema
+        mock_pdfplumber.assert_called_once()
+        assert mock_extract_fields.call_count == 2
+        layout_prompts = [
+            c.kwargs["doc_layout"] for c in mock_extract_fields.call_args_list
+        ]
+        assert layout_prompts[0] == layout_prompts[1]
+
+    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
+    @patch("src.core.extractor.pdfplumber.open")
+    def test_pipeline_cached_layout_keeps_request_source(
+        self,
+        mock_pdfplumber,
+        mock_extract_fields,
+        mock_pdfplumber_pdf,
+        fake_cache,
+        tmp_path,
+    ):
+        """Test a cached layout never leaks another request's source path."""
+        test_file = tmp_path / "test.pdf"
+        test_file.write_bytes(b"fake pdf content")
+        mock_pdfplumber.return_value = mock_pdfplumber_pdf
+        mock_extract_fields.return_value = {
+            "nome": {"value": "JOÃO", "details": {"source": "openai"}},
+        }
+
+        by_path = run_extraction(
+            ExtractionRequest(
+                label="test",
+                extraction_schema={"nome": "Nome"},
+                pdf_path=str(test_file),
+            )
+        )
+        by_upload = run_extraction(
+            ExtractionRequest(
+                label="test",
+                extraction_schema={"inscricao": "Inscrição"},
+                pdf_bytes=b"fake pdf content",
+            )
+        )
+
+        # Same bytes: parsed once, but each result reports its own source
+        mock_pdfplumber.assert_called_once()
+        assert by_path.meta["doc_meta"]["source"] == str(test_file.resolve())
+        assert by_upload.meta["doc_meta"]["source"] == "<uploaded_bytes>"
+
+    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
+    @patch("src.core.extractor.pdfplumber.open")
+    def test_pipeline_layout_cache_is_per_engine(
+        self,
+        mock_pdfplumber,
+        mock_extract_fields,
+        mock_pdfplumber_pdf,
+        mock_fitz_module,
+        fake_cache,
+        monkeypatch,
+        tmp_path,
+    ):
+        """Test switching EXTRACTOR_ENGINE does not reuse the other engine's layout."""
+        test_file = tmp_path / "test.pdf"
+        test_file.write_bytes(b"fake pdf content")
+        mock_pdfplumber.return_value = mock_pdfplumber_pdf
+        mock_extract_fields.return_value = {
+            "nome": {"value": "JOÃO", "details": {"source": "openai"}},
+        }
+
+        for schema, engine in (
+            ({"nome": "Nome"}, "pdfplumber"),
+            ({"a": "A"}, "pymupdf"),
+        ):
+            monkeypatch.setattr(get_settings(), "extractor_engine", engine)
+            request = ExtractionRequest(
+                label="test", extraction_schema=schema, pdf_path=str(test_file)
+            )
+            result = run_extraction(request)
+            assert result.meta["doc_meta"]["engine"] == engine
+
+        mock_pdfplumber.assert_called_once()
+        mock_fitz_module.open.assert_called_once()
+
     @patch("src.core.pipeline.llm_orchestrator.extract_fields")
     @patch("src.core.extractor.pdfplumber.open")
     def test_pipeline_stores_result_in_cache(
         self,
         mock_pdfplumber,
         mock_extract_fields,
-        mock_cache_class,
         mock_pdfplumber_pdf,
+        fake_cache,
         tmp_path,
     ):
         """Test pipeline stores extraction result in cache."""
@@ -380,11 +595,6 @@ class TestPipelineIntegration:
         # Mock components
         mock_pdfplumber.return_value = mock_pdfplumber_pdf
 
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache.set_json.return_value = True
-        mock_cache_class.return_value = mock_cache
-
         mock_extract_fields.return_value = {
             "nome": {"value": "JOÃO", "details": {"source": "openai"}},
         }
@@ -397,27 +607,25 @@ class TestPipelineIntegration:
         )
 
         # Run pipeline
-        run_extraction(request, use_cache=True)
+        result = run_extraction(request, use_cache=True)
 
-        # Verify cache.set_json was called
-        mock_cache.set_json.assert_called_once()
+        # Verify layout and result were cached
+        assert len(fake_cache.store) == 2  # Layout + result
 
         # Verify cached data structure
-        call_args = mock_cache.set_json.call_args
-        cache_key = call_args[0][0]
-        cached_data = call_args[0][1]
+        cache_key = result.meta["cache_key"]
+        cached_data = fake_cache.get_json(cache_key)
 
         assert cache_key.startswith("extract:test:")
         assert cached_data["label"] == "test"
         assert cached_data["fields"]["nome"] == "JOÃO"
         assert "meta" in cached_data
 
-    @patch("src.core.pipeline.CacheClient")
     @patch("src.core.extractor.pdfplumber.open")
     def test_pipeline_handles_extractor_errors(
         self,
         mock_pdfplumber,
-        mock_cache_class,
+        fake_cache,
         tmp_path,
     ):
         """Test pipeline propagates extractor errors."""
@@ -428,10 +636,6 @@ class TestPipelineIntegration:
         # Mock pdfplumber to raise error
         mock_pdfplumber.side_effect = Exception("PDF extraction error")
 
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
         # Create request
         request = ExtractionRequest(
             label="test",
@@ -443,15 +647,14 @@ class TestPipelineIntegration:
         with pytest.raises(Exception, match="PDF extraction error"):
             run_extraction(request, use_cache=False)
 
-    @patch("src.core.pipeline.CacheClient")
     @patch("src.core.pipeline.llm_orchestrator.extract_fields")
     @patch("src.core.extractor.pdfplumber.open")
     def test_pipeline_handles_llm_errors_gracefully(
         self,
         mock_pdfplumber,
         mock_extract_fields,
-        mock_cache_class,
         mock_pdfplumber_pdf,
+        fake_cache,
         tmp_path,
     ):
         """Test pipeline handles LLM extraction errors."""
@@ -462,10 +665,6 @@ class TestPipelineIntegration:
         # Mock components
         mock_pdfplumber.return_value = mock_pdfplumber_pdf
 
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
         # LLM returns fallback error response
         mock_extract_fields.return_value = {
             "nome": {"value": None, "details": {"error": "openai_api_error"}},
@@ -485,15 +684,14 @@ class TestPipelineIntegration:
         assert result.fields["nome"] is None
         assert "nome" in result.meta["trace"]["unresolved"]
 
-    @patch("src.core.pipeline.CacheClient")
     @patch("src.core.pipeline.llm_orchestrator.extract_fields")
     @patch("src.core.extractor.pdfplumber.open")
     def test_pipeline_preserves_field_order(
         self,
         mock_pdfplumber,
         mock_extract_fields,
-        mock_cache_class,
         mock_pdfplumber_pdf,
+        fake_cache,
         tmp_path,
     ):
         """Test pipeline preserves extraction schema field order."""
@@ -504,10 +702,6 @@ class TestPipelineIntegration:
         # Mock components
         mock_pdfplumber.return_value = mock_pdfplumber_pdf
 
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
         mock_extract_fields.return_value = {
             "field1": {"value": "value1", "details": {"source": "openai"}},
             "field2": {"value": "value2", "details": {"source": "openai"}},
@@ -531,3 +725,58 @@ class TestPipelineIntegration:
 
         # Verify all fields present
         assert list(result.fields.keys()) == ["field1", "field2", "field3"]
+
+    @pytest.mark.asyncio
+    @patch("src.core.pipeline.CacheClient")
+    @patch(
+        "src.core.pipeline.llm_orchestrator.extract_fields_async",
+        new_callable=AsyncMock,
+    )
+    @patch("src.core.extractor.pdfplumber.open")
+    async def test_full_pipeline_batch_without_cache(
+        self,
+        mock_pdfplumber,
+        mock_extract_fields_async,
+        mock_cache_class,
+        mock_pdfplumber_pdf,
+        tmp_path,
+    ):
+        """Test batch pipeline runs each PDF end to end through the async path."""
+        # Create real PDF files
+        test_files = []
+        for i in range(3):
+            test_file = tmp_path / f"test{i}.pdf"
+            test_file.write_bytes(f"fake pdf content {i}".encode())
+            test_files.append(test_file)
+
+        # Mock pdfplumber
+        mock_pdfplumber.return_value = mock_pdfplumber_pdf
+
+        # Mock cache (miss)
+        mock_cache = MagicMock()
+        mock_cache.get_json.return_value = None
+        mock_cache_class.return_value = mock_cache
+
+        # Mock LLM extraction
+        mock_extract_fields_async.return_value = {
+            "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
+        }
+
+        requests = [
+            ExtractionRequest(
+                label="carteira_oab",
+                extraction_schema={"nome": "Nome do profissional"},
+                pdf_path=str(test_file),
+            )
+            for test_file in test_files
+        ]
+
+        # Run pipeline
+        results = await run_extraction_batch(requests, use_cache=False)
+
+        # Verify one result per PDF, each with its own cache key
+        assert len(results) == 3
+        assert all(r.fields["nome"] == "JOÃO DA SILVA" for r in results)
+        assert len({r.meta["cache_key"] for r in results}) == 3
+        assert mock_extract_fields_async.await_count == 3
+        mock_cache.get_json.assert_not_called()
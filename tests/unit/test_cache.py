@@ -7,7 +7,61 @@ Tests Redis cache wrapper functionality including get/set operations and JSON ha
 import json
 from unittest.mock import MagicMock, patch
 
-from src.core.cache import CacheClient
+import pytest
+
+from src.core.cache import (
+    COMPRESSION_MIN_BYTES,
+    ZSTD_MAGIC,
+    CacheClient,
+    clear_local_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def _empty_local_cache():
+    """Start every test with an empty in-process LRU."""
+    clear_local_cache()
+    yield
+    clear_local_cache()
+
+
+def _store_backed_redis(mock_redis_class, store=None, ttls=None):
+    """
+    Back the mocked Redis client with a dict, for direct calls and pipelines.
+
+    ttls holds each key's PTTL in milliseconds; stored keys without one
+    report -1 (no expiry) and missing keys -2, as Redis does.
+    """
+    store = {} if store is None else store
+    ttls = {} if ttls is None else ttls
+
+    def pttl(key):
+        return ttls.get(key, -1) if key in store else -2
+
+    def setex(key, ttl, value):
+        store[key] = value
+        ttls[key] = ttl * 1000
+        return True
+
+    pipe = MagicMock()
+    queued = []
+    for name, op in {"get": store.get, "pttl": pttl, "setex": setex}.items():
+        getattr(pipe, name).side_effect = lambda *args, op=op: queued.append(
+            lambda: op(*args)
+        )
+
+    def execute():
+        results = [op() for op in queued]
+        queued.clear()
+        return results
+
+    pipe.execute.side_effect = execute
+
+    redis_instance = MagicMock()
+    redis_instance.setex.side_effect = setex
+    redis_instance.pipeline.return_value.__enter__.return_value = pipe
+    mock_redis_class.return_value = redis_instance
+    return redis_instance, pipe
 
 
 class TestCacheClient:
@@ -36,6 +90,23 @@ class TestCacheClient:
         assert result == "cached_value"
         mock_redis_instance.get.assert_called_once_with("test_key")
 
+    @patch("src.core.cache.redis.Redis")
+    def test_get_returns_str_for_raw_payloads(self, mock_redis_class):
+        """Test get() keeps returning str although the pool yields bytes."""
+        pytest.importorskip("zstandard")
+        store = {}
+        mock_redis_instance, _ = _store_backed_redis(mock_redis_class, store)
+        mock_redis_instance.get.side_effect = store.get
+        large = {"layout_text": "JOÃO DA SILVA [TOP-LEFT]\n" * 200}
+
+        cache = CacheClient()
+        cache.set("plain", "JOÃO".encode("utf-8"))
+        cache.set_json("compressed", large)
+
+        assert store["compressed"].startswith(ZSTD_MAGIC)
+        assert cache.get("plain") == "JOÃO"
+        assert json.loads(cache.get("compressed")) == large
+
     @patch("src.core.cache.redis.Redis")
     def test_get_missing_key(self, mock_redis_class):
         """Test getting a non-existent cache key."""
@@ -119,9 +190,7 @@ class TestCacheClient:
         test_data = {"field1": "value1", "field2": "value2"}
         json_string = json.dumps(test_data)
 
-        mock_redis_instance = MagicMock()
-        mock_redis_instance.get.return_value = json_string
-        mock_redis_class.return_value = mock_redis_instance
+        _store_backed_redis(mock_redis_class, {"test_key": json_string})
 
         cache = CacheClient()
         result = cache.get_json("test_key")
@@ -131,9 +200,7 @@ class TestCacheClient:
     @patch("src.core.cache.redis.Redis")
     def test_get_json_missing_key(self, mock_redis_class):
         """Test get_json with missing cache key."""
-        mock_redis_instance = MagicMock()
-        mock_redis_instance.get.return_value = None
-        mock_redis_class.return_value = mock_redis_instance
+        _store_backed_redis(mock_redis_class)
 
         cache = CacheClient()
         result = cache.get_json("missing_key")
@@ -143,9 +210,7 @@ class TestCacheClient:
     @patch("src.core.cache.redis.Redis")
     def test_get_json_invalid_data(self, mock_redis_class):
         """Test get_json with invalid JSON data."""
-        mock_redis_instance = MagicMock()
-        mock_redis_instance.get.return_value = "not valid json {"
-        mock_redis_class.return_value = mock_redis_instance
+        _store_backed_redis(mock_redis_class, {"test_key": "not valid json {"})
 
         cache = CacheClient()
         result = cache.get_json("test_key")
@@ -231,25 +296,13 @@ class TestCacheClient:
             "meta": {"cache_hit": False},
         }
 
-        stored_json = None
-
-        def mock_setex(key, ttl, value):
-            nonlocal stored_json
-            stored_json = value
-            return True
-
-        def mock_get(key):
-            return stored_json
-
-        mock_redis_instance = MagicMock()
-        mock_redis_instance.setex.side_effect = mock_setex
-        mock_redis_instance.get.side_effect = mock_get
-        mock_redis_class.return_value = mock_redis_instance
+        _store_backed_redis(mock_redis_class)
 
         cache = CacheClient()
 
-        # Set and get
+        # Set and get (from Redis, not the in-process LRU)
         cache.set_json("test_key", test_data)
+        clear_local_cache()
         result = cache.get_json("test_key")
 
         assert result == test_data
@@ -257,25 +310,14 @@ class TestCacheClient:
     @patch("src.core.cache.redis.Redis")
     def test_cache_key_isolation(self, mock_redis_class):
         """Test that different cache keys are isolated."""
-        mock_redis_instance = MagicMock()
-        cache_data = {}
-
-        def mock_get(key):
-            return cache_data.get(key)
-
-        def mock_setex(key, ttl, value):
-            cache_data[key] = value
-            return True
-
-        mock_redis_instance.get.side_effect = mock_get
-        mock_redis_instance.setex.side_effect = mock_setex
-        mock_redis_class.return_value = mock_redis_instance
+        _store_backed_redis(mock_redis_class)
 
         cache = CacheClient()
 
         # Set different values for different keys
         cache.set_json("key1", {"value": 1})
         cache.set_json("key2", {"value": 2})
+        clear_local_cache()
 
         # Verify isolation
         result1 = cache.get_json("key1")
@@ -283,3 +325,134 @@ class TestCacheClient:
 
         assert result1["value"] == 1
         assert result2["value"] == 2
+
+    @patch("src.core.cache.redis.Redis")
+    def test_local_cache_hits_avoid_redis(self, mock_redis_class):
+        """Test repeated get_json calls are served from the in-process LRU."""
+        _, pipe = _store_backed_redis(
+            mock_redis_class, {"hot_key": json.dumps({"value": 1})}
+        )
+
+        first = CacheClient().get_json("hot_key")
+        first["value"] = 2  # Callers may mutate what they get back
+        second = CacheClient().get_json("hot_key")
+
+        assert second == {"value": 1}
+        assert pipe.execute.call_count == 1
+
+    @patch("src.core.cache.redis.Redis")
+    def test_set_evicts_local_cache_entry(self, mock_redis_class):
+        """Test a raw set() after set_json() is not hidden by the local copy."""
+        _store_backed_redis(mock_redis_class)
+
+        cache = CacheClient()
+        cache.set_json("key", {"value": 1})
+        cache.set("key", json.dumps({"value": 2}))
+
+        assert cache.get_json("key") == {"value": 2}
+
+    @patch("src.core.cache.monotonic")
+    @patch("src.core.cache.redis.Redis")
+    def test_local_cache_never_outlives_redis_ttl(
+        self, mock_redis_class, mock_monotonic
+    ):
+        """Test payloads read from Redis expire locally with their Redis TTL."""
+        store = {"short_key": json.dumps({"value": 1})}
+        _, pipe = _store_backed_redis(mock_redis_class, store, {"short_key": 2000})
+        mock_monotonic.return_value = 100.0
+
+        cache = CacheClient()
+        assert cache.get_json("short_key") == {"value": 1}
+
+        # Expired in Redis after 2s, well before the local TTL
+        del store["short_key"]
+        mock_monotonic.return_value = 102.5
+
+        assert cache.get_json("short_key") is None
+        assert pipe.execute.call_count == 2
+
+    @patch("src.core.cache.redis.Redis")
+    def test_local_cache_populated_by_set_json(self, mock_redis_class):
+        """Test set_json fills the in-process LRU so reads skip Redis."""
+        mock_redis_instance = MagicMock()
+        mock_redis_instance.setex.return_value = True
+        mock_redis_class.return_value = mock_redis_instance
+
+        cache = CacheClient()
+        cache.set_json("key", {"value": 1})
+
+        assert cache.get_json("key") == {"value": 1}
+        mock_redis_instance.get.assert_not_called()
+
+    @patch("src.core.cache.settings.local_cache_max_entries", 2)
+    @patch("src.core.cache.redis.Redis")
+    def test_local_cache_evicts_least_recently_used(self, mock_redis_class):
+        """Test the in-process LRU is bounded and evicts the oldest key."""
+        store = {}
+        _, pipe = _store_backed_redis(mock_redis_class, store)
+
+        cache = CacheClient()
+        cache.set_json("key1", {"value": 1})
+        cache.set_json("key2", {"value": 2})
+        cache.get_json("key1")  # key1 becomes most recently used
+        cache.set_json("key3", {"value": 3})
+        store.clear()
+
+        assert cache.get_json("key1") == {"value": 1}
+        assert cache.get_json("key3") == {"value": 3}
+        assert cache.get_json("key2") is None  # Evicted, and gone from Redis
+        pipe.get.assert_called_once_with("key2")
+
+    @patch("src.core.cache.redis.Redis")
+    def test_json_many_roundtrip_uses_one_pipeline(self, mock_redis_class):
+        """Test set_json_many/get_json_many each take a single pipeline call."""
+        mock_redis_instance, pipe = _store_backed_redis(mock_redis_class)
+
+        items = {f"key{i}": {"value": i} for i in range(10)}
+        cache = CacheClient()
+
+        assert cache.set_json_many(items) is True
+        clear_local_cache()  # Force reads to go to Redis
+        results = cache.get_json_many([*items, "missing"])
+
+        assert results == [*items.values(), None]
+        assert pipe.execute.call_count == 2
+        mock_redis_instance.get.assert_not_called()
+
+    @patch("src.core.cache.redis.Redis")
+    def test_small_payloads_are_stored_uncompressed(self, mock_redis_class):
+        """Test payloads under COMPRESSION_MIN_BYTES are stored as plain JSON."""
+        mock_redis_instance = MagicMock()
+        mock_redis_class.return_value = mock_redis_instance
+
+        CacheClient().set_json("test_key", {"nome": "JOÃO"})
+
+        stored_value = mock_redis_instance.setex.call_args[0][2]
+        assert not stored_value.startswith(ZSTD_MAGIC)
+        assert json.loads(stored_value) == {"nome": "JOÃO"}
+
+    @patch("src.core.cache.redis.Redis")
+    def test_large_payloads_roundtrip_compressed(self, mock_redis_class):
+        """Test large payloads are zstd-compressed in Redis and decode back."""
+        pytest.importorskip("zstandard")
+        store = {}
+        _store_backed_redis(mock_redis_class, store)
+
+        test_data = {"layout_text": "JOÃO DA SILVA [TOP-LEFT]\n" * 200}
+        cache = CacheClient()
+        cache.set_json("layout:abc", test_data)
+        clear_local_cache()  # Force the read to go to Redis
+
+        assert store["layout:abc"].startswith(ZSTD_MAGIC)
+        assert len(store["layout:abc"]) < COMPRESSION_MIN_BYTES
+        assert cache.get_json("layout:abc") == test_data
+
+    @patch("src.core.cache.ZSTD_AVAILABLE", False)
+    @patch("src.core.cache.redis.Redis")
+    def test_compressed_payload_without_zstandard(self, mock_redis_class):
+        """Test compressed entries are treated as misses when zstd is missing."""
+        _store_backed_redis(
+            mock_redis_class, {"test_key": ZSTD_MAGIC + b"\x28\xb5\x2f\xfd"}
+        )
+
+        assert CacheClient().get_json("test_key") is None
@@ -5,6 +5,7 @@ Tests PDF extraction, text processing, layout analysis, and utility functions.
 """
 
 import hashlib
+import json
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -12,44 +13,44 @@ import pytest
 from src.core.extractor import (
     ExtractedDocument,
     PdfExtractor,
+    _hash_schema_items,
+    _schema_keywords,
     filter_layout_by_keywords,
     hash_extraction_schema,
     hash_pdf_bytes,
+    hash_pdf_file,
     load_pdf_bytes,
     resolve_pdf_path,
 )
+from src.core.extractor_pymupdf import PymupdfExtractor
 
 
 class TestPdfExtractor:
     """Test cases for PdfExtractor class."""
 
-    def test_load_success(self, mock_pdfplumber_pdf, mock_pdfplumber_page, tmp_path):
+    @pytest.mark.usefixtures("fake_pdfplumber")
+    def test_load_success(self, extractor, tmp_path):
         """Test successful PDF loading and extraction."""
         # Create a real PDF file
         test_file = tmp_path / "test.pdf"
         test_file.write_bytes(b"fake pdf content")
 
-        with patch("src.core.extractor.pdfplumber.open") as mock_open:
-            mock_open.return_value = mock_pdfplumber_pdf
+        result = extractor.load(str(test_file))
 
-            extractor = PdfExtractor()
-            result = extractor.load(str(test_file))
+        assert isinstance(result, ExtractedDocument)
+        assert result.layout_text != ""
+        assert len(result.words) == 3
+        assert result.meta["engine"] == "pdfplumber"
+        assert result.meta["pages"] == 1
+        assert result.meta["word_count"] == 3
 
-            assert isinstance(result, ExtractedDocument)
-            assert result.layout_text != ""
-            assert len(result.words) == 3
-            assert result.meta["engine"] == "pdfplumber"
-            assert result.meta["pages"] == 1
-            assert result.meta["word_count"] == 3
-
-    def test_load_file_not_found(self):
+    def test_load_file_not_found(self, extractor):
         """Test loading non-existent PDF file."""
-        extractor = PdfExtractor()
-
         with pytest.raises(FileNotFoundError, match="PDF not found"):
             extractor.load("/nonexistent/file.pdf")
 
-    def test_load_empty_pdf(self, mock_pdfplumber_pdf, tmp_path):
+    @pytest.mark.usefixtures("fake_pdfplumber")
+    def test_load_empty_pdf(self, extractor, mock_pdfplumber_pdf, tmp_path):
         """Test loading PDF with no pages."""
         # Create a real PDF file
         test_file = tmp_path / "empty.pdf"
@@ -57,58 +58,66 @@ class TestPdfExtractor:
 
         mock_pdfplumber_pdf.pages = []
 
-        with patch("src.core.extractor.pdfplumber.open") as mock_open:
-            mock_open.return_value = mock_pdfplumber_pdf
-
-            extractor = PdfExtractor()
-            with pytest.raises(ValueError, match="Empty PDF: no pages found"):
-                extractor.load(str(test_file))
+        with pytest.raises(ValueError, match="Empty PDF: no pages found"):
+            extractor.load(str(test_file))
 
-    def test_load_pdf_with_no_text(
-        self, mock_pdfplumber_pdf, mock_pdfplumber_page, tmp_path
-    ):
+    @pytest.mark.usefixtures("fake_pdfplumber")
+    def test_load_pdf_with_no_text(self, extractor, mock_pdfplumber_page, tmp_path):
         """Test loading PDF with no extractable text."""
         # Create a real PDF file
         test_file = tmp_path / "notext.pdf"
         test_file.write_bytes(b"fake pdf content")
 
-        mock_pdfplumber_page.extract_words.return_value = []
-        mock_pdfplumber_pdf.pages = [mock_pdfplumber_page]
-
-        with patch("src.core.extractor.pdfplumber.open") as mock_open:
-            mock_open.return_value = mock_pdfplumber_pdf
+        mock_pdfplumber_page.extract_words = lambda **_: []
 
-            extractor = PdfExtractor()
-            with pytest.raises(ValueError, match="Empty PDF: no text content"):
-                extractor.load(str(test_file))
+        with pytest.raises(ValueError, match="Empty PDF: no text content"):
+            extractor.load(str(test_file))
 
-    def test_calculate_zone_top_left(self):
+    def test_calculate_zone_top_left(self, extractor):
         """Test zone calculation for top-left corner."""
-        extractor = PdfExtractor()
         bbox = [50.0, 50.0, 100.0, 70.0]  # Top-left area
         zone = extractor._calculate_zone(bbox, 595.0, 842.0)
 
         assert zone == "TOP-LEFT"
 
-    def test_calculate_zone_center(self):
+    def test_calculate_zone_center(self, extractor):
         """Test zone calculation for center area."""
-        extractor = PdfExtractor()
         bbox = [250.0, 400.0, 350.0, 420.0]  # Center area
         zone = extractor._calculate_zone(bbox, 595.0, 842.0)
 
         assert zone == "CENTER"
 
-    def test_calculate_zone_bottom_right(self):
+    def test_calculate_zone_bottom_right(self, extractor):
         """Test zone calculation for bottom-right corner."""
-        extractor = PdfExtractor()
         bbox = [500.0, 750.0, 550.0, 800.0]  # Bottom-right area
         zone = extractor._calculate_zone(bbox, 595.0, 842.0)
 
         assert zone == "BOTTOM-RIGHT"
 
-    def test_group_words_to_lines_same_line(self):
+    @pytest.mark.parametrize(
+        "x_center, y_center, expected",
+        [
+            (100.0, 100.0, "TOP-LEFT"),
+            (300.0, 100.0, "TOP-CENTER"),
+            (500.0, 100.0, "TOP-RIGHT"),
+            (100.0, 400.0, "LEFT"),
+            (300.0, 400.0, "CENTER"),
+            (500.0, 400.0, "RIGHT"),
+            (100.0, 700.0, "BOTTOM-LEFT"),
+            (300.0, 700.0, "BOTTOM-CENTER"),
+            (500.0, 700.0, "BOTTOM-RIGHT"),
+            # Centers exactly on a grid line belong to the next cell
+            (200.0, 300.0, "CENTER"),
+        ],
+    )
+    def test_calculate_zone_grid(self, extractor, x_center, y_center, expected):
+        """Test every cell of the 3x3 zone grid."""
+        bbox = [x_center - 10, y_center - 5, x_center + 10, y_center + 5]
+
+        assert extractor._calculate_zone(bbox, 600.0, 900.0) == expected
+
+    def test_group_words_to_lines_same_line(self, extractor):
         """Test grouping words on the same line."""
-        extractor = PdfExtractor()
         words = [
             {"text": "Hello", "bbox": [100.0, 50.0, 150.0, 70.0], "zone": "TOP-LEFT"},
             {"text": "World", "bbox": [155.0, 52.0, 200.0, 72.0], "zone": "TOP-LEFT"},
@@ -120,9 +129,8 @@ class TestPdfExtractor:
         assert lines[0]["text"] == "Hello World"
         assert lines[0]["word_count"] == 2
 
-    def test_group_words_to_lines_different_lines(self):
+    def test_group_words_to_lines_different_lines(self, extractor):
         """Test grouping words on different lines."""
-        extractor = PdfExtractor()
         words = [
             {"text": "Line1", "bbox": [100.0, 50.0, 150.0, 70.0], "zone": "TOP-LEFT"},
             {"text": "Line2", "bbox": [100.0, 100.0, 150.0, 120.0], "zone": "TOP-LEFT"},
@@ -134,16 +142,14 @@ class TestPdfExtractor:
         assert lines[0]["text"] == "Line1"
         assert lines[1]["text"] == "Line2"
 
-    def test_group_words_empty_list(self):
+    def test_group_words_empty_list(self, extractor):
         """Test grouping empty word list."""
-        extractor = PdfExtractor()
         lines = extractor._group_words_to_lines([])
 
         assert lines == []
 
-    def test_create_line_dict(self):
+    def test_create_line_dict(self, extractor):
         """Test line dictionary creation from words."""
-        extractor = PdfExtractor()
         words = [
             {"text": "Hello", "bbox": [100.0, 50.0, 150.0, 70.0], "zone": "TOP-LEFT"},
             {"text": "World", "bbox": [155.0, 50.0, 200.0, 70.0], "zone": "TOP-LEFT"},
@@ -157,9 +163,8 @@ class TestPdfExtractor:
         assert line["zone"] == "TOP-LEFT"
         assert line["word_count"] == 2
 
-    def test_format_layout_text(self):
+    def test_format_layout_text(self, extractor):
         """Test layout text formatting."""
-        extractor = PdfExtractor()
         lines = [
             {
                 "text": "JOÃO DA SILVA",
@@ -182,25 +187,23 @@ class TestPdfExtractor:
         assert "[x:100-230, y:50]" in layout_text
         assert "Inscrição: 123456" in layout_text
 
-    def test_layout_text_includes_coordinates(self, mock_pdfplumber_pdf, tmp_path):
+    @pytest.mark.usefixtures("fake_pdfplumber")
+    def test_layout_text_includes_coordinates(self, extractor, tmp_path):
         """Test that layout text includes coordinate information."""
         # Create a real PDF file
         test_file = tmp_path / "test.pdf"
         test_file.write_bytes(b"fake pdf content")
 
-        with patch("src.core.extractor.pdfplumber.open") as mock_open:
-            mock_open.return_value = mock_pdfplumber_pdf
+        result = extractor.load(str(test_file))
 
-            extractor = PdfExtractor()
-            result = extractor.load(str(test_file))
-
-            # Verify format includes zone and coordinates
-            assert "[TOP-LEFT]" in result.layout_text or "[" in result.layout_text
-            assert "x:" in result.layout_text
-            assert "y:" in result.layout_text
+        # Verify format includes zone and coordinates
+        assert "[TOP-LEFT]" in result.layout_text or "[" in result.layout_text
+        assert "x:" in result.layout_text
+        assert "y:" in result.layout_text
 
+    @pytest.mark.usefixtures("fake_pdfplumber")
     def test_metadata_includes_table_detection(
-        self, mock_pdfplumber_pdf, mock_pdfplumber_page, tmp_path
+        self, extractor, mock_pdfplumber_page, tmp_path
     ):
         """Test that metadata includes table detection info."""
         # Create a real PDF file
@@ -208,27 +211,54 @@ class TestPdfExtractor:
         test_file.write_bytes(b"fake pdf content")
 
         # Test with tables
-        mock_pdfplumber_page.find_tables.return_value = [MagicMock()]
-        mock_pdfplumber_pdf.pages = [mock_pdfplumber_page]
-
-        with patch("src.core.extractor.pdfplumber.open") as mock_open:
-            mock_open.return_value = mock_pdfplumber_pdf
+        mock_pdfplumber_page.find_tables = lambda **_: [MagicMock()]
 
-            extractor = PdfExtractor()
-            result = extractor.load(str(test_file))
+        result = extractor.load(str(test_file))
 
-            assert result.meta["has_tables"] is True
+        assert result.meta["has_tables"] is True
 
         # Test without tables
-        mock_pdfplumber_page.find_tables.return_value = []
+        mock_pdfplumber_page.find_tables = lambda **_: []
+
+        result = extractor.load(str(test_file))
+
+        assert result.meta["has_tables"] is False
 
-        with patch("src.core.extractor.pdfplumber.open") as mock_open:
-            mock_open.return_value = mock_pdfplumber_pdf
+    def test_load_real_pdf(self, extractor, real_pdf):
+        """Test extraction against a rendered PDF (opt-in via --use-real-pdfs)."""
+        result = extractor.load(pdf_bytes=real_pdf.read_bytes())
 
-            extractor = PdfExtractor()
-            result = extractor.load(str(test_file))
+        assert "JOÃO DA SILVA" in result.layout_text
+        assert "123456" in result.layout_text
+        assert result.meta["pages"] == 1
 
-            assert result.meta["has_tables"] is False
+
+class TestPymupdfExtractor:
+    """Test cases for the PyMuPDF extraction engine."""
+
+    @pytest.mark.usefixtures("fake_pdfplumber")
+    def test_load_bytes_matches_pdfplumber_layout(self, mock_fitz_module):
+        """Test PyMuPDF words produce the same layout as pdfplumber."""
+        expected = PdfExtractor().load(pdf_bytes=b"%PDF-1.4 fake")
+
+        result = PymupdfExtractor().load(pdf_bytes=b"%PDF-1.4 fake")
+
+        mock_fitz_module.open.assert_called_once_with(
+            stream=b"%PDF-1.4 fake", filetype="pdf"
+        )
+        assert result.layout_text == expected.layout_text
+        assert result.words == expected.words
+        assert result.meta["engine"] == "pymupdf"
+        assert result.meta["source"] == "<uploaded_bytes>"
+
+    def test_load_pdf_with_no_text(self, mock_fitz_module):
+        """Test PyMuPDF engine rejects PDFs without text."""
+        # Every opened document shares the fixture's single page
+        page = mock_fitz_module.open()[0]
+        page.get_text = lambda kind: []
+
+        with pytest.raises(ValueError, match="Empty PDF: no text content"):
+            PymupdfExtractor().load(pdf_bytes=b"%PDF-1.4 fake")
 
 
 class TestUtilityFunctions:
@@ -291,8 +321,9 @@ class TestUtilityFunctions:
         assert result == test_content
         assert isinstance(result, bytes)
 
+    @patch("src.core.extractor.XXHASH_AVAILABLE", False)
     def test_hash_pdf_bytes(self):
-        """Test PDF bytes hashing."""
+        """Test PDF bytes hashing falls back to SHA256 without xxhash."""
         pdf_bytes = b"fake pdf content"
         expected_hash = hashlib.sha256(pdf_bytes).hexdigest()
 
@@ -301,6 +332,35 @@ class TestUtilityFunctions:
         assert result == expected_hash
         assert len(result) == 64  # SHA256 hex digest length
 
+    def test_hash_pdf_bytes_xxhash(self):
+        """Test PDF bytes hashing uses xxh3-128 when xxhash is installed."""
+        xxhash = pytest.importorskip("xxhash")
+        pdf_bytes = b"fake pdf content"
+
+        result = hash_pdf_bytes(pdf_bytes)
+
+        assert result == xxhash.xxh3_128_hexdigest(pdf_bytes)
+        assert len(result) == 32  # xxh3-128 hex digest length
+
+    @pytest.mark.parametrize("xxhash_available", [True, False])
+    def test_hash_pdf_file_matches_hash_pdf_bytes(
+        self, tmp_path, monkeypatch, xxhash_available
+    ):
+        """Test streamed file hashing gives the same digest as hashing the bytes."""
+        if xxhash_available:
+            pytest.importorskip("xxhash")
+        monkeypatch.setattr("src.core.extractor.XXHASH_AVAILABLE", xxhash_available)
+        content = b"fake pdf content spanning several chunks"
+        test_file = tmp_path / "test.pdf"
+        test_file.write_bytes(content)
+
+        assert hash_pdf_file(test_file) == hash_pdf_bytes(content)
+
+    def test_hash_pdf_file_not_found(self, tmp_path):
+        """Test hashing a missing PDF raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            hash_pdf_file(tmp_path / "missing.pdf")
+
     def test_hash_pdf_bytes_different_content(self):
         """Test that different content produces different hashes."""
         hash1 = hash_pdf_bytes(b"content1")
@@ -320,6 +380,20 @@ class TestUtilityFunctions:
         assert isinstance(result, str)
         assert len(result) == 64  # SHA256 hex digest length
 
+    def test_hash_extraction_schema_memoized(self):
+        """Test repeated schemas (in any key order) reuse the cached hash."""
+        schema = {"memo_nome": "Nome", "memo_inscricao": "Inscrição"}
+        expected = hashlib.sha256(
+            json.dumps(schema, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+
+        first = hash_extraction_schema(schema)
+        hits = _hash_schema_items.cache_info().hits
+        second = hash_extraction_schema(dict(reversed(schema.items())))
+
+        assert first == second == expected
+        assert _hash_schema_items.cache_info().hits == hits + 1
+
     def test_hash_extraction_schema_order_independent(self):
         """Test that schema hash is independent of key order."""
         schema1 = {"nome": "Nome", "inscricao": "Inscrição"}
@@ -359,7 +433,7 @@ class TestFilterLayoutByKeywords:
 
         result = filter_layout_by_keywords(sample_layout_text, schema, max_lines=2)
 
-        lines = result.split("\n")
+        lines = result.splitlines()
         assert len(lines) <= 2
 
     def test_filter_no_max_lines(self, sample_layout_text):
@@ -385,7 +459,7 @@ class TestFilterLayoutByKeywords:
         result = filter_layout_by_keywords(sample_layout_text, schema, max_lines=3)
 
         # Should return first max_lines as fallback
-        lines = result.split("\n")
+        lines = result.splitlines()
         assert len(lines) <= 3
 
     def test_filter_ignores_stopwords(self, sample_layout_text):
@@ -395,7 +469,7 @@ class TestFilterLayoutByKeywords:
         result = filter_layout_by_keywords(sample_layout_text, schema, max_lines=2)
 
         # Should fall back to first max_lines since all words are stopwords
-        lines = result.split("\n")
+        lines = result.splitlines()
         assert len(lines) <= 2
 
     def test_filter_extracts_keywords_from_field_name(self):
@@ -417,3 +491,31 @@ class TestFilterLayoutByKeywords:
 
         # Should match despite case differences
         assert "JOÃO" in result
+
+    def test_filter_keywords_memoized_per_schema(self):
+        """Test keywords are extracted once per schema, in any key order."""
+        layout = "[TOP-LEFT] [x:100-200, y:50] Telefone: (11) 99999-9999"
+        schema = {"memo_telefone": "Telefone", "memo_email": "E-mail do titular"}
+
+        filter_layout_by_keywords(layout, schema, max_lines=10)
+        hits = _schema_keywords.cache_info().hits
+        result = filter_layout_by_keywords(
+            layout, dict(reversed(schema.items())), max_lines=10
+        )
+
+        assert "Telefone" in result
+        assert _schema_keywords.cache_info().hits == hits + 1
+
+    def test_filter_keywords_with_regex_characters(self):
+        """Test keywords are matched literally, not as regex syntax."""
+        layout = "\n".join(
+            [
+                "[TOP-LEFT] [x:100-200, y:50] JOÃO DA SILVA",
+                "[TOP-LEFT] [x:100-200, y:70] Contato: (11) 99999-9999",
+            ]
+        )
+        schema = {"contato": "Telefone com DDD (11)"}
+
+        result = filter_layout_by_keywords(layout, schema, max_lines=10)
+
+        assert result == "[TOP-LEFT] [x:100-200, y:70] Contato: (11) 99999-9999"
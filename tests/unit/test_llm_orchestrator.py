@@ -4,16 +4,27 @@ Unit tests for src/core/llm_orchestrator.py
 Tests OpenAI API integration, prompt building, response parsing, and error handling.
 """
 
-from unittest.mock import MagicMock, patch
+import asyncio
+import weakref
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
 from pydantic import BaseModel
 
 from src.core.llm_orchestrator import (
+    _build_output_model,
     _fallback_error,
+    _format_fields,
     _normalize_pydantic_response,
     _normalize_response,
+    close_async_client,
     count_tokens,
     extract_fields,
+    extract_fields_async,
+    extract_fields_marshaled,
+    get_async_client,
+    parse_batch_output_line,
 )
 
 
@@ -219,6 +230,61 @@ class TestFallbackError:
         assert result["nome"]["details"]["error"] == "openai_api_error"
 
 
+def _batch_line(text, status_code=200):
+    """Build one OpenAI Batch API output line with the given output text."""
+    return {
+        "custom_id": "key",
+        "response": {
+            "status_code": status_code,
+            "body": {
+                "output": [
+                    {
+                        "type": "message",
+                        "content": [{"type": "output_text", "text": text}],
+                    }
+                ]
+            },
+        },
+        "error": None,
+    }
+
+
+class TestParseBatchOutputLine:
+    """Test cases for OpenAI Batch API output line parsing."""
+
+    def test_parse_batch_output_line_valid(self):
+        """Test successful lines are normalized like extract_fields results."""
+        line = _batch_line('{"nome": " JOÃO ", "inscricao": null}')
+
+        result = parse_batch_output_line(line, {"nome": "Nome", "inscricao": "Nº"})
+
+        assert result["nome"]["value"] == "JOÃO"
+        assert result["inscricao"]["value"] is None
+
+    @pytest.mark.parametrize(
+        "line, reason",
+        [
+            pytest.param(None, "batch_output_missing", id="missing"),
+            pytest.param(
+                {"custom_id": "key", "response": None, "error": {"code": "x"}},
+                "openai_api_error",
+                id="line_error",
+            ),
+            pytest.param(
+                _batch_line('{"nome": "X"}', 500), "openai_api_error", id="http_500"
+            ),
+            pytest.param(_batch_line("not json"), "invalid_response", id="bad_json"),
+            pytest.param(_batch_line(""), "empty_response", id="empty"),
+        ],
+    )
+    def test_parse_batch_output_line_errors(self, line, reason):
+        """Test failed or malformed lines fall back to null fields."""
+        result = parse_batch_output_line(line, {"nome": "Nome"})
+
+        assert result["nome"]["value"] is None
+        assert result["nome"]["details"]["error"] == reason
+
+
 class TestExtractFields:
     """Test cases for main extract_fields function."""
 
@@ -450,3 +516,168 @@ class TestExtractFields:
         user_message = messages[1]["content"]
 
         assert layout in user_message
+
+
+@pytest.mark.asyncio
+class TestExtractFieldsAsync:
+    """Test cases for the async extract_fields_async variant."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_async_clients(self, monkeypatch):
+        """Drop the shared clients so each test builds one from its patch."""
+        monkeypatch.setattr(
+            "src.core.llm_orchestrator._async_clients", weakref.WeakKeyDictionary()
+        )
+
+    @patch("src.core.llm_orchestrator.AsyncOpenAI")
+    @patch("src.core.llm_orchestrator.TIKTOKEN_AVAILABLE", False)
+    async def test_extract_fields_async_success(self, mock_openai_class, mock_settings):
+        """Test successful async field extraction."""
+
+        class MockModel(BaseModel):
+            nome: str = "JOÃO DA SILVA"
+
+        mock_response = MagicMock()
+        mock_response.output_parsed = MockModel()
+        mock_response.usage.total_tokens = 1500
+
+        mock_client = MagicMock()
+        mock_client.responses.parse = AsyncMock(return_value=mock_response)
+        mock_openai_class.return_value = mock_client
+
+        result = await extract_fields_async("test_doc", {"nome": "Nome"}, "layout")
+
+        assert result["nome"]["value"] == "JOÃO DA SILVA"
+        mock_client.responses.parse.assert_awaited_once()
+
+    @patch("src.core.llm_orchestrator.AsyncOpenAI")
+    @patch("src.core.llm_orchestrator.TIKTOKEN_AVAILABLE", False)
+    async def test_extract_fields_async_api_error(
+        self, mock_openai_class, mock_settings
+    ):
+        """Test async extraction falls back on API errors."""
+        mock_client = MagicMock()
+        mock_client.responses.parse = AsyncMock(side_effect=Exception("API Error"))
+        mock_openai_class.return_value = mock_client
+
+        result = await extract_fields_async("test_doc", {"nome": "Nome"}, "layout")
+
+        assert result["nome"]["value"] is None
+        assert result["nome"]["details"]["error"] == "openai_api_error"
+
+    @patch("src.core.llm_orchestrator.AsyncOpenAI")
+    @patch("src.core.llm_orchestrator.TIKTOKEN_AVAILABLE", False)
+    async def test_extract_fields_async_reuses_client(
+        self, mock_openai_class, mock_settings
+    ):
+        """Test calls share one client until it is closed."""
+        mock_client = MagicMock()
+        mock_client.responses.parse = AsyncMock(side_effect=Exception("API Error"))
+        mock_client.close = AsyncMock()
+        mock_openai_class.return_value = mock_client
+
+        await extract_fields_async("test_doc", {"nome": "Nome"}, "layout")
+        await extract_fields_async("test_doc", {"nome": "Nome"}, "layout")
+        await close_async_client()
+
+        mock_openai_class.assert_called_once()
+        assert mock_client.responses.parse.await_count == 2
+        mock_client.close.assert_awaited_once()
+
+
+class TestGetAsyncClient:
+    """Test cases for the per-event-loop AsyncOpenAI client."""
+
+    @patch("src.core.llm_orchestrator._async_clients", weakref.WeakKeyDictionary())
+    @patch("src.core.llm_orchestrator.AsyncOpenAI")
+    def test_each_event_loop_gets_its_own_client(self, mock_openai_class):
+        """Test a new asyncio.run() never reuses a client from a closed loop."""
+        mock_openai_class.side_effect = lambda **kwargs: MagicMock()
+
+        async def client_pair():
+            return get_async_client(), get_async_client()
+
+        first, again = asyncio.run(client_pair())
+        second, _ = asyncio.run(client_pair())
+
+        assert first is again
+        assert second is not first
+        assert mock_openai_class.call_count == 2
+
+
+class TestExtractFieldsMarshaled:
+    """Test cases for extracting several documents in one call."""
+
+    @patch("src.core.llm_orchestrator.OpenAI")
+    @patch("src.core.llm_orchestrator.TIKTOKEN_AVAILABLE", False)
+    def test_extract_fields_marshaled_success(self, mock_openai_class, mock_settings):
+        """Test one call returns one normalized result per layout, in order."""
+        mock_response = MagicMock()
+        mock_response.output_parsed = SimpleNamespace(
+            documents=[SimpleNamespace(nome=" JOÃO "), SimpleNamespace(nome=None)]
+        )
+        mock_client = MagicMock()
+        mock_client.responses.parse.return_value = mock_response
+        mock_openai_class.return_value = mock_client
+
+        results = extract_fields_marshaled(
+            "test_doc", {"nome": "Nome"}, ["layout one", "layout two"]
+        )
+
+        assert [r["nome"]["value"] for r in results] == ["JOÃO", None]
+        mock_client.responses.parse.assert_called_once()
+        kwargs = mock_client.responses.parse.call_args.kwargs
+        assert "DOC_1:\n```\nlayout one" in kwargs["input"][1]["content"]
+        assert "exactly 2 objects" in kwargs["input"][0]["content"]
+
+    @patch("src.core.llm_orchestrator.OpenAI")
+    @patch("src.core.llm_orchestrator.TIKTOKEN_AVAILABLE", False)
+    def test_extract_fields_marshaled_count_mismatch(
+        self, mock_openai_class, mock_settings
+    ):
+        """Test a response with the wrong number of documents is rejected."""
+        mock_response = MagicMock()
+        mock_response.output_parsed = SimpleNamespace(
+            documents=[SimpleNamespace(nome="JOÃO")]
+        )
+        mock_openai_class.return_value.responses.parse.return_value = mock_response
+
+        results = extract_fields_marshaled("test_doc", {"nome": "Nome"}, ["a", "b"])
+
+        assert len(results) == 2
+        assert all(r["nome"]["value"] is None for r in results)
+        assert all(r["nome"]["details"]["error"] == "invalid_response" for r in results)
+
+    @patch("src.core.llm_orchestrator.OpenAI")
+    @patch("src.core.llm_orchestrator.TIKTOKEN_AVAILABLE", False)
+    def test_extract_fields_marshaled_api_error(self, mock_openai_class, mock_settings):
+        """Test API errors fall back for every document."""
+        mock_openai_class.return_value.responses.parse.side_effect = Exception("boom")
+
+        results = extract_fields_marshaled("test_doc", {"nome": "Nome"}, ["a", "b"])
+
+        assert [r["nome"]["details"]["error"] for r in results] == [
+            "openai_api_error",
+            "openai_api_error",
+        ]
+
+
+class TestSchemaMemoization:
+    """Test cases for per-schema caching of prompts and output models."""
+
+    def test_output_model_built_once_per_schema(self):
+        """Test equal schemas share one Pydantic model class."""
+        model = _build_output_model({"nome": "Nome", "inscricao": "Inscrição"})
+
+        assert _build_output_model({"nome": "Nome", "inscricao": "Inscrição"}) is model
+        assert list(model.model_fields) == ["nome", "inscricao"]
+
+    def test_output_model_keeps_schema_order(self):
+        """Test schemas differing only in order get their own field order."""
+        model = _build_output_model({"inscricao": "Inscrição", "nome": "Nome"})
+
+        assert list(model.model_fields) == ["inscricao", "nome"]
+
+    def test_field_list_rendered_in_schema_order(self):
+        """Test the cached field list matches the schema's insertion order."""
+        assert _format_fields({"b": "B", "a": "A"}) == "- b: B\n- a: A"
@@ -0,0 +1,48 @@
+"""
+Unit tests for src/config/logging.py
+
+Tests that logging is configured once and can be forced to rebuild.
+"""
+
+import logging
+
+import pytest
+
+from src.config import logging as logging_config
+from src.config.logging import setup_logging
+
+
+@pytest.fixture
+def root_logger(monkeypatch):
+    """Run with an unconfigured module and restore the root logger afterwards."""
+    monkeypatch.setattr(logging_config, "_CONFIGURED", False)
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield root
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+class TestSetupLogging:
+    """Test cases for setup_logging."""
+
+    def test_repeated_calls_keep_one_handler(self, root_logger):
+        """Test a second call is a no-op and leaves the same single handler."""
+        setup_logging()
+        (handler,) = root_logger.handlers
+
+        setup_logging("DEBUG")
+
+        assert root_logger.handlers == [handler]
+        assert root_logger.level != logging.DEBUG
+
+    def test_force_rebuilds_handler(self, root_logger):
+        """Test force=True replaces the handler and applies the new level."""
+        setup_logging("INFO")
+        (handler,) = root_logger.handlers
+
+        setup_logging("DEBUG", force=True)
+
+        (rebuilt,) = root_logger.handlers
+        assert rebuilt is not handler
+        assert root_logger.level == logging.DEBUG
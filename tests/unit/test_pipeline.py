@@ -4,12 +4,12 @@ Unit tests for src/core/pipeline.py
 Tests the extraction pipeline orchestration, cache integration, and error handling.
 """
 
-from unittest.mock import MagicMock, patch
+import asyncio
+from unittest.mock import patch
 
 import pytest
 
-from src.core.extractor import ExtractedDocument
-from src.core.pipeline import run_extraction
+from src.core.pipeline import run_extraction, run_extraction_async, run_extraction_batch
 from src.models.schema import ExtractionRequest, ExtractionResult
 
 
@@ -42,29 +42,14 @@ class TestRunExtraction:
         with pytest.raises(FileNotFoundError):
             run_extraction(request)
 
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    def test_run_extraction_cache_hit(
-        self, mock_load_bytes, mock_resolve, mock_cache_class, tmp_path
-    ):
+    def test_run_extraction_cache_hit(self, pipeline_mocks):
         """Test pipeline returns cached result when available."""
-        # Setup mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        cached_result = {
+        pipeline_mocks.cache.get_json.return_value = {
             "label": "test",
             "fields": {"nome": "JOÃO DA SILVA"},
             "meta": {"cache_hit": False},
         }
 
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = cached_result
-        mock_cache_class.return_value = mock_cache
-
         request = ExtractionRequest(
             label="test",
             extraction_schema={"nome": "Nome"},
@@ -76,47 +61,12 @@ class TestRunExtraction:
         assert isinstance(result, ExtractionResult)
         assert result.fields["nome"] == "JOÃO DA SILVA"
         assert result.meta["cache_hit"] is True
-        mock_cache.get_json.assert_called_once()
+        pipeline_mocks.cache.get_json.assert_called_once()
+        pipeline_mocks.extractor_class.assert_not_called()
 
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    def test_run_extraction_cache_miss(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        tmp_path,
-    ):
+    def test_run_extraction_cache_miss(self, pipeline_mocks):
         """Test pipeline executes full extraction on cache miss."""
-        # Setup file mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        # Setup cache mock (cache miss)
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache.set_json.return_value = True
-        mock_cache_class.return_value = mock_cache
-
-        # Setup extractor mock
-        mock_doc = ExtractedDocument(
-            layout_text="[TOP-LEFT] [x:100-200, y:50] JOÃO DA SILVA",
-            words=[],
-            meta={"source": str(test_file), "engine": "pdfplumber", "pages": 1},
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
-        # Setup LLM mock
-        mock_extract_fields.return_value = {
+        pipeline_mocks.extract_fields.return_value = {
             "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
         }
 
@@ -131,47 +81,13 @@ class TestRunExtraction:
         assert isinstance(result, ExtractionResult)
         assert result.fields["nome"] == "JOÃO DA SILVA"
         assert result.meta["cache_hit"] is False
-        mock_cache.set_json.assert_called_once()
+        assert pipeline_mocks.cache.set_json.call_count == 2  # Layout + result
 
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    def test_run_extraction_use_cache_false(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        tmp_path,
-    ):
+    def test_run_extraction_use_cache_false(self, pipeline_mocks):
         """Test pipeline bypasses cache when use_cache=False."""
-        # Setup file mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        # Setup cache mock
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = {"label": "cached"}  # Should be ignored
-        mock_cache.set_json.return_value = True
-        mock_cache_class.return_value = mock_cache
-
-        # Setup extractor mock
-        mock_doc = ExtractedDocument(
-            layout_text="[TOP-LEFT] JOÃO",
-            words=[],
-            meta={"source": str(test_file), "engine": "pdfplumber", "pages": 1},
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
-        # Setup LLM mock
-        mock_extract_fields.return_value = {
+        # Should be ignored
+        pipeline_mocks.cache.get_json.return_value = {"label": "cached"}
+        pipeline_mocks.extract_fields.return_value = {
             "nome": {"value": "FRESH EXTRACTION", "details": {"source": "openai"}},
         }
 
@@ -185,41 +101,11 @@ class TestRunExtraction:
 
         assert result.fields["nome"] == "FRESH EXTRACTION"
         assert result.meta["cache_hit"] is False
-        mock_cache.get_json.assert_not_called()  # Should not check cache
+        pipeline_mocks.cache.get_json.assert_not_called()  # Should not check cache
 
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    def test_run_extraction_includes_timings(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        tmp_path,
-    ):
+    def test_run_extraction_includes_timings(self, pipeline_mocks):
         """Test pipeline includes timing information in result."""
-        # Setup mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
-        mock_doc = ExtractedDocument(
-            layout_text="test", words=[], meta={"source": str(test_file), "pages": 1}
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
-        mock_extract_fields.return_value = {
+        pipeline_mocks.extract_fields.return_value = {
             "nome": {"value": "Test", "details": {"source": "openai"}},
         }
 
@@ -239,40 +125,10 @@ class TestRunExtraction:
             isinstance(t, float) for t in result.meta["timings_seconds"].values()
         )
 
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    def test_run_extraction_includes_trace_info(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        tmp_path,
-    ):
+    def test_run_extraction_includes_trace_info(self, pipeline_mocks):
         """Test pipeline includes trace information in metadata."""
-        # Setup mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
-        mock_doc = ExtractedDocument(
-            layout_text="test", words=[], meta={"source": str(test_file), "pages": 1}
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
         # LLM returns some resolved, some unresolved
-        mock_extract_fields.return_value = {
+        pipeline_mocks.extract_fields.return_value = {
             "nome": {"value": "JOÃO", "details": {"source": "openai"}},
             "inscricao": {"value": None, "details": {"source": "openai"}},
         }
@@ -291,39 +147,9 @@ class TestRunExtraction:
         assert "nome" in result.meta["trace"]["llm_resolved"]
         assert "inscricao" in result.meta["trace"]["unresolved"]
 
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    def test_run_extraction_includes_cache_key(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        tmp_path,
-    ):
+    def test_run_extraction_includes_cache_key(self, pipeline_mocks):
         """Test pipeline includes cache key in metadata."""
-        # Setup mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
-        mock_doc = ExtractedDocument(
-            layout_text="test", words=[], meta={"source": str(test_file), "pages": 1}
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
-        mock_extract_fields.return_value = {
+        pipeline_mocks.extract_fields.return_value = {
             "nome": {"value": "Test", "details": {"source": "openai"}},
         }
 
@@ -338,45 +164,13 @@ class TestRunExtraction:
         assert "cache_key" in result.meta
         assert result.meta["cache_key"].startswith("extract:test_label:")
 
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    @patch("src.core.pipeline.hash_pdf_bytes")
-    @patch("src.core.pipeline.hash_extraction_schema")
+    @patch("src.core.pipeline.hash_pdf_file", return_value="pdf123")
+    @patch("src.core.pipeline.hash_extraction_schema", return_value="schema456")
     def test_run_extraction_cache_key_format(
-        self,
-        mock_hash_schema,
-        mock_hash_pdf,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        tmp_path,
+        self, mock_hash_schema, mock_hash_pdf, pipeline_mocks
     ):
         """Test cache key format includes label, pdf_hash, and schema_hash."""
-        # Setup mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-        mock_hash_pdf.return_value = "pdf123"
-        mock_hash_schema.return_value = "schema456"
-
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
-        mock_doc = ExtractedDocument(
-            layout_text="test", words=[], meta={"source": str(test_file), "pages": 1}
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
-        mock_extract_fields.return_value = {
+        pipeline_mocks.extract_fields.return_value = {
             "nome": {"value": "Test", "details": {"source": "openai"}},
         }
 
@@ -391,40 +185,9 @@ class TestRunExtraction:
         expected_key = "extract:my_label:pdf123:schema456"
         assert result.meta["cache_key"] == expected_key
 
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    def test_run_extraction_caches_result(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        tmp_path,
-    ):
+    def test_run_extraction_caches_result(self, pipeline_mocks):
         """Test pipeline caches extraction result after processing."""
-        # Setup mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache.set_json.return_value = True
-        mock_cache_class.return_value = mock_cache
-
-        mock_doc = ExtractedDocument(
-            layout_text="test", words=[], meta={"source": str(test_file), "pages": 1}
-        )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
-
-        mock_extract_fields.return_value = {
+        pipeline_mocks.extract_fields.return_value = {
             "nome": {"value": "JOÃO", "details": {"source": "openai"}},
         }
 
@@ -437,8 +200,8 @@ class TestRunExtraction:
         run_extraction(request)
 
         # Verify cache was written
-        mock_cache.set_json.assert_called_once()
-        call_args = mock_cache.set_json.call_args
+        assert pipeline_mocks.cache.set_json.call_count == 2  # Layout + result
+        call_args = pipeline_mocks.cache.set_json.call_args
         cache_key = call_args[0][0]
         cached_data = call_args[0][1]
 
@@ -446,39 +209,27 @@ class TestRunExtraction:
         assert cached_data["label"] == "test"
         assert cached_data["fields"]["nome"] == "JOÃO"
 
-    @patch("src.core.pipeline.CacheClient")
-    @patch("src.core.pipeline.PdfExtractor")
-    @patch("src.core.pipeline.llm_orchestrator.extract_fields")
-    @patch("src.core.pipeline.resolve_pdf_path")
-    @patch("src.core.pipeline.load_pdf_bytes")
-    def test_run_extraction_multiple_fields(
-        self,
-        mock_load_bytes,
-        mock_resolve,
-        mock_extract_fields,
-        mock_extractor_class,
-        mock_cache_class,
-        tmp_path,
-    ):
-        """Test pipeline handles extraction with multiple fields."""
-        # Setup mocks
-        test_file = tmp_path / "test.pdf"
-        test_file.write_bytes(b"fake pdf")
-        mock_resolve.return_value = test_file
-        mock_load_bytes.return_value = b"fake pdf"
-
-        mock_cache = MagicMock()
-        mock_cache.get_json.return_value = None
-        mock_cache_class.return_value = mock_cache
-
-        mock_doc = ExtractedDocument(
-            layout_text="test", words=[], meta={"source": str(test_file), "pages": 1}
+    def test_run_extraction_skips_caching_failed_llm_call(self, pipeline_mocks):
+        """Test a failed OpenAI call is returned but not cached."""
+        pipeline_mocks.extract_fields.return_value = {
+            "nome": {"value": None, "details": {"error": "openai_api_error"}},
+        }
+
+        request = ExtractionRequest(
+            label="test",
+            extraction_schema={"nome": "Nome"},
+            pdf_path="test.pdf",
         )
-        mock_extractor = MagicMock()
-        mock_extractor.load.return_value = mock_doc
-        mock_extractor_class.return_value = mock_extractor
 
-        mock_extract_fields.return_value = {
+        result = run_extraction(request)
+
+        assert result.fields["nome"] is None
+        pipeline_mocks.cache.set_json.assert_called_once()  # Layout only
+        assert pipeline_mocks.cache.set_json.call_args[0][0].startswith("layout:")
+
+    def test_run_extraction_multiple_fields(self, pipeline_mocks):
+        """Test pipeline handles extraction with multiple fields."""
+        pipeline_mocks.extract_fields.return_value = {
             "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
             "inscricao": {"value": "123456", "details": {"source": "openai"}},
             "categoria": {"value": "ADVOGADO", "details": {"source": "openai"}},
@@ -500,3 +251,151 @@ class TestRunExtraction:
         assert result.fields["nome"] == "JOÃO DA SILVA"
         assert result.fields["inscricao"] == "123456"
         assert result.fields["categoria"] == "ADVOGADO"
+
+
+@pytest.mark.asyncio
+class TestRunExtractionAsync:
+    """Test cases for the run_extraction_async pipeline function."""
+
+    async def test_run_extraction_async_cache_miss(self, pipeline_mocks):
+        """Test async pipeline awaits the LLM and caches the result."""
+        pipeline_mocks.extract_fields_async.return_value = {
+            "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
+        }
+
+        request = ExtractionRequest(
+            label="test",
+            extraction_schema={"nome": "Nome"},
+            pdf_path="test.pdf",
+        )
+
+        result = await run_extraction_async(request, use_cache=True)
+
+        assert isinstance(result, ExtractionResult)
+        assert result.fields["nome"] == "JOÃO DA SILVA"
+        assert result.meta["cache_hit"] is False
+        pipeline_mocks.extract_fields_async.assert_awaited_once()
+        assert pipeline_mocks.cache.set_json.call_count == 2  # Layout + result
+
+    async def test_run_extraction_async_cache_hit(self, pipeline_mocks):
+        """Test async pipeline returns cached results without extracting."""
+        pipeline_mocks.cache.get_json.return_value = {
+            "label": "test",
+            "fields": {"nome": "CACHED"},
+            "meta": {},
+        }
+
+        request = ExtractionRequest(
+            label="test",
+            extraction_schema={"nome": "Nome"},
+            pdf_path="test.pdf",
+        )
+
+        result = await run_extraction_async(request)
+
+        assert result.fields["nome"] == "CACHED"
+        assert result.meta["cache_hit"] is True
+
+    async def test_run_extraction_batch_preserves_order(self, pipeline_mocks):
+        """Test batch entrypoint runs every request and keeps input order."""
+        pipeline_mocks.extract_fields_async.return_value = {
+            "nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}},
+        }
+
+        requests = [
+            ExtractionRequest(
+                label=f"label_{i}",
+                extraction_schema={"nome": "Nome"},
+                pdf_path="test.pdf",
+            )
+            for i in range(3)
+        ]
+
+        results = await run_extraction_batch(requests, max_concurrency=2)
+
+        assert [r.label for r in results] == ["label_0", "label_1", "label_2"]
+        assert pipeline_mocks.extract_fields_async.await_count == 3
+
+    @patch("src.core.pipeline.LLM_RETRY_BASE_SECONDS", 0)
+    async def test_run_extraction_batch_retries_failed_llm_calls(self, pipeline_mocks):
+        """Test batch items whose OpenAI call failed are retried with backoff."""
+        pipeline_mocks.extract_fields_async.side_effect = [
+            {"nome": {"value": None, "details": {"error": "openai_api_error"}}},
+            {"nome": {"value": "JOÃO DA SILVA", "details": {"source": "openai"}}},
+        ]
+
+        request = ExtractionRequest(
+            label="test",
+            extraction_schema={"nome": "Nome"},
+            pdf_path="test.pdf",
+        )
+
+        [result] = await run_extraction_batch([request], llm_retries=2)
+
+        assert pipeline_mocks.extract_fields_async.await_count == 2
+        assert result.fields["nome"] == "JOÃO DA SILVA"
+
+    @patch("src.core.pipeline.LLM_RETRY_BASE_SECONDS", 0)
+    async def test_run_extraction_batch_retries_empty_responses(self, pipeline_mocks):
+        """Test any LLM-layer error is retried, and results without details pass."""
+        pipeline_mocks.extract_fields_async.side_effect = [
+            {"nome": {"value": None, "details": {"error": "empty_response"}}},
+            {"nome": {"value": "JOÃO DA SILVA"}},
+        ]
+
+        request = ExtractionRequest(
+            label="test",
+            extraction_schema={"nome": "Nome"},
+            pdf_path="test.pdf",
+        )
+
+        [result] = await run_extraction_batch([request], llm_retries=1)
+
+        assert pipeline_mocks.extract_fields_async.await_count == 2
+        assert result.fields["nome"] == "JOÃO DA SILVA"
+        assert pipeline_mocks.cache.set_json.call_count == 2  # Layout + result
+
+    async def test_run_extraction_async_does_not_retry_by_default(self, pipeline_mocks):
+        """Test single async extractions keep the failed result without retrying."""
+        pipeline_mocks.extract_fields_async.return_value = {
+            "nome": {"value": None, "details": {"error": "openai_api_error"}},
+        }
+
+        request = ExtractionRequest(
+            label="test",
+            extraction_schema={"nome": "Nome"},
+            pdf_path="test.pdf",
+        )
+
+        result = await run_extraction_async(request)
+
+        pipeline_mocks.extract_fields_async.assert_awaited_once()
+        assert result.fields["nome"] is None
+        pipeline_mocks.cache.set_json.assert_called_once()  # Layout only
+
+    async def test_run_extraction_batch_overlaps_extract_and_llm(self, pipeline_mocks):
+        """Test later PDFs are extracted while earlier LLM calls are in flight."""
+        extracted_during_llm = []
+
+        async def slow_llm(**kwargs):
+            await asyncio.sleep(0.05)
+            extracted_during_llm.append(pipeline_mocks.extractor.load.call_count)
+            return {"nome": {"value": "JOÃO", "details": {"source": "openai"}}}
+
+        pipeline_mocks.extract_fields_async.side_effect = slow_llm
+
+        requests = [
+            ExtractionRequest(
+                label=f"label_{i}",
+                extraction_schema={"nome": "Nome"},
+                pdf_path="test.pdf",
+            )
+            for i in range(3)
+        ]
+
+        await run_extraction_batch(requests, max_concurrency=1)
+
+        # With one slot per stage, the next PDFs are extracted during the
+        # first LLM call instead of after the whole first request
+        assert extracted_during_llm[0] > 1
+        assert pipeline_mocks.extractor.load.call_count == 3
@@ -0,0 +1,76 @@
+"""
+Unit tests for src/core/rate_limiter.py
+
+Tests token bucket pacing and the shared OpenAI bucket configuration.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from src.core import rate_limiter
+from src.core.rate_limiter import TokenBucket, get_openai_bucket
+
+
+@pytest.fixture
+def _reset_openai_bucket():
+    """Drop the process-wide bucket before and after the test."""
+    rate_limiter._openai_bucket = None
+    yield
+    rate_limiter._openai_bucket = None
+
+
+class TestTokenBucket:
+    """Test cases for TokenBucket."""
+
+    def test_rejects_non_positive_rate(self):
+        """Test a zero rate is refused instead of blocking forever."""
+        with pytest.raises(ValueError, match="rate must be positive"):
+            TokenBucket(rate=0)
+
+    def test_capacity_defaults_to_one_second_of_tokens(self):
+        """Test the default burst equals the per-second rate (at least 1)."""
+        assert TokenBucket(rate=50).capacity == 50
+        assert TokenBucket(rate=0.5).capacity == 1.0
+
+    async def test_burst_up_to_capacity_does_not_wait(self):
+        """Test a full bucket serves `capacity` acquires immediately."""
+        bucket = TokenBucket(rate=1, capacity=10)
+        loop = asyncio.get_running_loop()
+
+        start = loop.time()
+        for _ in range(10):
+            await bucket.acquire()
+
+        assert loop.time() - start < 0.05
+
+    async def test_sustained_rate_is_enforced(self):
+        """Test 100 concurrent acquires are spread out at `rate` per second."""
+        bucket = TokenBucket(rate=500, capacity=1)
+        loop = asyncio.get_running_loop()
+
+        start = loop.time()
+        await asyncio.gather(*(bucket.acquire() for _ in range(100)))
+        elapsed = loop.time() - start
+
+        # First token is already in the bucket, the other 99 arrive at 500/s
+        assert elapsed == pytest.approx(99 / 500, abs=0.05)
+
+
+@pytest.mark.usefixtures("_reset_openai_bucket")
+class TestGetOpenAIBucket:
+    """Test cases for the shared OpenAI bucket."""
+
+    def test_bucket_rate_follows_openai_rpm(self):
+        """Test the bucket refills at OPENAI_RPM / 60 and is reused."""
+        with patch.object(rate_limiter.settings, "openai_rpm", 600):
+            bucket = get_openai_bucket()
+
+            assert bucket.rate == 10
+            assert get_openai_bucket() is bucket
+
+    def test_zero_rpm_disables_limiting(self):
+        """Test OPENAI_RPM=0 turns client-side rate limiting off."""
+        with patch.object(rate_limiter.settings, "openai_rpm", 0):
+            assert get_openai_bucket() is None